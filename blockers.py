@@ -0,0 +1,150 @@
+import html
+import re
+import sqlite3
+import threading
+
+import metrics
+from digest import NO_BLOCKERS
+
+ITEM_SEPARATOR = re.compile(r"\n|;")
+BULLET = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s*")
+WORD = re.compile(r"\w+", re.UNICODE)
+# Slack markup: <url|label>, <@U123>, <#C123|name>; the label (or the target) stays
+SLACK_LINK = re.compile(r"<([^>|]*)(?:\|([^>]*))?>")
+QUOTED_LINE = re.compile(r"^\s*>.*$", re.MULTILINE)
+
+
+def _plain(text):
+    """Slack message text as typed: markup reduced to labels, entities decoded, quotes dropped."""
+    text = SLACK_LINK.sub(lambda m: m.group(2) or m.group(1), text or "")
+    return QUOTED_LINE.sub("", html.unescape(text))
+
+
+def blocker_items(text):
+    """Split a Blockers section into items: {normalized key: text as written}."""
+    items = {}
+    for part in ITEM_SEPARATOR.split(_plain(text)):
+        item = BULLET.sub("", part).strip()
+        if not item or NO_BLOCKERS.match(item):
+            continue
+        key = " ".join(WORD.findall(item.lower()))
+        if key:
+            items.setdefault(key, item)
+    return items
+
+
+class SqliteBlockerStore:
+    """Open blockers in a local SQLite file."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS open_blockers (
+                user_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                text TEXT NOT NULL,
+                since TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                PRIMARY KEY (user_id, key)
+            )"""
+        )
+
+    def _rows(self, sql, args=()):
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [{"user_id": r[0], "key": r[1], "text": r[2], "since": r[3], "last_seen": r[4]} for r in rows]
+
+    def for_user(self, user_id):
+        return self._rows("SELECT user_id, key, text, since, last_seen FROM open_blockers WHERE user_id = ?", (user_id,))
+
+    def all_open(self):
+        return self._rows("SELECT user_id, key, text, since, last_seen FROM open_blockers ORDER BY since, user_id")
+
+    def upsert(self, rows):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO open_blockers (user_id, key, text, since, last_seen) VALUES (?, ?, ?, ?, ?)",
+                [(r["user_id"], r["key"], r["text"], r["since"], r["last_seen"]) for r in rows],
+            )
+
+    def resolve(self, user_id, keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM open_blockers WHERE user_id = ? AND key = ?", [(user_id, k) for k in keys])
+
+
+@metrics.timed_methods("supabase.store")
+class SupabaseBlockerStore:
+    """Open blockers in the `open_blockers` table (see setup.sql)."""
+
+    COLUMNS = "user_id, key, text, since, last_seen"
+
+    def __init__(self, client):
+        self.client = client
+
+    def for_user(self, user_id):
+        return self.client.table("open_blockers").select(self.COLUMNS).eq("user_id", user_id).execute().data
+
+    def all_open(self):
+        return self.client.table("open_blockers").select(self.COLUMNS).order("since").order("user_id").execute().data
+
+    def upsert(self, rows):
+        self.client.table("open_blockers").upsert(rows, on_conflict="user_id,key").execute()
+
+    def resolve(self, user_id, keys):
+        self.client.table("open_blockers").delete().eq("user_id", user_id).in_("key", list(keys)).execute()
+
+
+class BlockerIndex:
+    """Open blockers per user, updated from each saved report.
+
+    A blocker opens on the first report that lists it and is resolved by
+    the first later report that no longer does. Only open blockers are
+    stored, so reading the index costs O(open blockers).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+    def update(self, user_id, report_date, blockers_text):
+        """Apply the Blockers section of the user's report for `report_date`.
+
+        Returns (opened, resolved) counts. Reports older than what the index
+        has already seen for the user are ignored, and so is a report without
+        a Blockers section (None): it says nothing about the open ones.
+        """
+        if blockers_text is None:
+            return 0, 0
+        items = blocker_items(blockers_text)
+        with self._lock:
+            current = {row["key"]: row for row in self.store.for_user(user_id)}
+            if any(row["last_seen"] > report_date for row in current.values()):
+                return 0, 0
+            resolved = [key for key in current if key not in items]
+            rows = [
+                {
+                    "user_id": user_id,
+                    "key": key,
+                    "text": text,
+                    "since": current[key]["since"] if key in current else report_date,
+                    "last_seen": report_date,
+                }
+                for key, text in items.items()
+            ]
+            if resolved:
+                self.store.resolve(user_id, resolved)
+            if rows:
+                self.store.upsert(rows)
+        opened = sum(1 for key in items if key not in current)
+        metrics.incr("blockers.opened", opened)
+        metrics.incr("blockers.resolved", len(resolved))
+        return opened, len(resolved)
+
+    def open_blockers(self, user_ids=None):
+        """Open blockers, oldest first, optionally only for `user_ids`."""
+        rows = self.store.all_open()
+        if user_ids is not None:
+            rows = [row for row in rows if row["user_id"] in user_ids]
+        return rows
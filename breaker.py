@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric gauge values so the state can be graphed
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one external dependency.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    calls fail fast for `reset_timeout` seconds. Then a single trial call
+    is let through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._trial_running = False
+        self._export()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _export(self):
+        metrics.set_gauge(f"breaker.{self.name}.state", STATE_VALUES[self._state])
+
+    def _transition(self, state):
+        if state != self._state:
+            logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+            metrics.incr(f"breaker.{self.name}.transitions")
+        self._state = state
+        self._export()
+
+    def allow(self):
+        """Return True if a call may go through now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            metrics.incr(f"breaker.{self.name}.rejected")
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def call(self, func, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            with metrics.timed(f"{self.name}.call"):
+                result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures}
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import metrics
+from models import RosterEntry
+
+logger = logging.getLogger(__name__)
+
+SLACK_USER_ID = re.compile(r"^[UW][A-Z0-9]{2,}$")
+TIME = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+SCHEDULE_KEYS = ("timezone", "daily_thread", "reminders", "digest")
+
+# Validated settings plus the indexes derived from them
+Config = namedtuple("Config", [
+    "teams", "excluded", "timezone", "daily_thread", "reminders", "digest",
+    "greetings", "memes",
+    "roster", "team_mapping", "team_user_ids", "name_to_uid",
+])
+
+
+class ConfigError(ValueError):
+    """The config failed validation; the message lists every problem."""
+
+
+def parse_time(value):
+    match = TIME.match(value) if isinstance(value, str) else None
+    if not match:
+        raise ValueError(f"{value!r} is not HH:MM")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _phrases(data, key, errors):
+    value = data[key]
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) and v.strip() for v in value):
+        errors.append(f"{key}: must be a non-empty list of non-empty strings")
+    return tuple(value) if isinstance(value, list) else ()
+
+
+def parse_config(data, defaults):
+    """Validate `data` (a dict, e.g. parsed JSON) over `defaults` and build a Config.
+
+    Top-level keys missing from `data` keep their default; `schedule` is
+    merged key by key. Raises ConfigError listing every problem found.
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("config must be a JSON object")
+    errors = []
+    unknown = set(data) - set(defaults)
+    if unknown:
+        errors.append(f"unknown keys: {', '.join(sorted(unknown))}")
+    merged = dict(defaults, **{k: v for k, v in data.items() if k in defaults})
+    schedule = dict(defaults["schedule"])
+    if isinstance(merged["schedule"], dict):
+        unknown = set(merged["schedule"]) - set(SCHEDULE_KEYS)
+        if unknown:
+            errors.append(f"schedule: unknown keys: {', '.join(sorted(unknown))}")
+        schedule.update(merged["schedule"])
+    else:
+        errors.append("schedule: must be an object")
+
+    teams = merged["teams"]
+    roster = []
+    if not isinstance(teams, dict) or not teams:
+        errors.append("teams: must be a non-empty object of team -> {Slack user ID: name}")
+        teams = {}
+    for team, members in teams.items():
+        if not isinstance(members, dict):
+            errors.append(f"teams.{team}: must be an object of Slack user ID -> name")
+            continue
+        for uid, name in members.items():
+            if not SLACK_USER_ID.match(uid):
+                errors.append(f"teams.{team}: {uid!r} is not a Slack user ID")
+            if not isinstance(name, str) or not name.strip():
+                errors.append(f"teams.{team}.{uid}: name must be a non-empty string")
+            roster.append(RosterEntry(uid, name, team))
+    seen = {}
+    for entry in roster:
+        if entry.user_id in seen and seen[entry.user_id] != entry.team:
+            errors.append(f"{entry.user_id} is in both {seen[entry.user_id]} and {entry.team}")
+        seen[entry.user_id] = entry.team
+
+    excluded = merged["exclude_from_reports"]
+    if not isinstance(excluded, list) or not all(isinstance(uid, str) for uid in excluded):
+        errors.append("exclude_from_reports: must be a list of Slack user IDs")
+        excluded = []
+
+    times = {}
+    for key in ("daily_thread", "digest"):
+        try:
+            times[key] = parse_time(schedule[key])
+        except ValueError as e:
+            errors.append(f"schedule.{key}: {e}")
+    reminders = schedule["reminders"]
+    if not isinstance(reminders, list) or not reminders:
+        errors.append("schedule.reminders: must be a non-empty list of HH:MM")
+        reminders = []
+    parsed_reminders = []
+    for value in reminders:
+        try:
+            parsed_reminders.append(parse_time(value))
+        except ValueError as e:
+            errors.append(f"schedule.reminders: {e}")
+    timezone = schedule["timezone"]
+    try:
+        ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        errors.append(f"schedule.timezone: unknown timezone {timezone!r}")
+
+    greetings = _phrases(merged, "greetings", errors)
+    memes = _phrases(merged, "memes", errors)
+
+    if errors:
+        raise ConfigError("; ".join(errors))
+
+    team_mapping = {entry.user_id: entry.name for entry in roster}
+    return Config(
+        teams={team: dict(members) for team, members in teams.items()},
+        excluded=frozenset(excluded),
+        timezone=timezone,
+        daily_thread=times["daily_thread"],
+        reminders=tuple(parsed_reminders),
+        digest=times["digest"],
+        greetings=greetings,
+        memes=memes,
+        roster=tuple(roster),
+        team_mapping=team_mapping,
+        team_user_ids=[uid for uid in team_mapping if uid not in excluded],
+        name_to_uid={name.lower(): uid for uid, name in team_mapping.items()},
+    )
+
+
+class FileConfigSource:
+    """Config from a JSON file; a missing file means "use the defaults"."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+
+@metrics.timed_methods("supabase.store")
+class SupabaseConfigSource:
+    """Config from the `bot_config` table (see setup.sql), editable without a redeploy."""
+
+    def __init__(self, client, name="standup"):
+        self.client = client
+        self.name = name
+
+    def read(self):
+        rows = self.client.table("bot_config").select("value").eq("name", self.name).execute().data
+        return json.dumps(rows[0]["value"]) if rows else None
+
+
+class ConfigWatcher:
+    """Polls a config source and applies each valid change.
+
+    A change is parsed and validated in full before `apply(config)` is
+    called; an invalid config is logged and the running one is kept.
+    Unchanged content (by hash) is not re-applied.
+    """
+
+    def __init__(self, source, defaults, apply, interval=10):
+        self.source = source
+        self.defaults = defaults
+        self.apply = apply
+        self.interval = interval
+        self._digest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Load the source once; returns True if a new config was applied."""
+        try:
+            raw = self.source.read()
+        except Exception as e:
+            logger.warning(f"Could not read config: {e}")
+            return False
+        digest = hashlib.sha256((raw or "").encode("utf-8")).hexdigest()
+        if digest == self._digest:
+            return False
+        try:
+            config = parse_config(json.loads(raw) if raw else {}, self.defaults)
+        except (ValueError, TypeError) as e:
+            metrics.incr("config.rejected")
+            logger.error(f"Ignoring invalid config, keeping the current one: {e}")
+            self._digest = digest  # don't log the same error every poll
+            return False
+        self.apply(config)
+        self._digest = digest
+        metrics.incr("config.applied")
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="config-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,160 @@
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def parse_times(value):
+    """"11:30,17:00" -> [(11, 30), (17, 0)]"""
+    times = []
+    for part in value.split(","):
+        hour, minute = part.strip().split(":")
+        times.append((int(hour), int(minute)))
+    return times
+
+
+def zone(name, default="UTC"):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        logger.warning(f"Unknown timezone {name!r}, using {default}")
+        return ZoneInfo(default)
+
+
+def local_due_times(day, tz_name, times):
+    """UTC timestamps of the local wall-clock `times` on `day` in `tz_name`.
+
+    Computed per day, so deadlines follow each zone's DST changes.
+    """
+    tz = zone(tz_name)
+    return [datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).timestamp() for hour, minute in times]
+
+
+class TimezoneCache:
+    """Slack users' timezones from `users_info`, cached for `ttl` seconds.
+
+    Holds at most `max_size` users; the least recently fetched is evicted.
+    """
+
+    def __init__(self, default="UTC", ttl=86400, max_size=10000):
+        self.default = default
+        self.ttl = ttl
+        self.max_size = max_size
+        self._zones = OrderedDict()  # user_id -> (tz name, fetched at)
+        self._lock = threading.Lock()
+
+    def get(self, client, user_id):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._zones.get(user_id)
+        if cached and now - cached[1] < self.ttl:
+            return cached[0]
+        try:
+            with metrics.timed("slack.call"):
+                tz = client.users_info(user=user_id)["user"].get("tz") or self.default
+        except Exception as e:
+            logger.warning(f"Could not look up the timezone of {user_id}: {e}")
+            # Keep serving a stale zone rather than guessing
+            return cached[0] if cached else self.default
+        metrics.incr("timezones.fetched")
+        with self._lock:
+            self._zones[user_id] = (tz, now)
+            self._zones.move_to_end(user_id)
+            while len(self._zones) > self.max_size:
+                self._zones.popitem(last=False)
+        return tz
+
+    def __len__(self):
+        return len(self._zones)
+
+
+class DeadlineTimer:
+    """One thread firing batches of items at their due times.
+
+    Items are grouped by due timestamp and the heap holds each distinct due
+    time once, so the loop wakes up once per distinct time however many
+    items share it. `callback(due, items)` gets every item due at that tick.
+    """
+
+    def __init__(self, callback, clock=time.time):
+        self.callback = callback
+        self.clock = clock
+        self._heap = []  # distinct due timestamps
+        self._items = {}  # due timestamp -> set of items
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def schedule(self, due, item):
+        """Add `item` at `due` (a UNIX timestamp); adding the same pair twice is a no-op."""
+        with self._cond:
+            if due not in self._items:
+                self._items[due] = set()
+                heapq.heappush(self._heap, due)
+                if self._heap[0] == due:
+                    self._cond.notify()
+            self._items[due].add(item)
+
+    def pending(self):
+        with self._cond:
+            return sum(len(items) for items in self._items.values())
+
+    def next_due(self):
+        with self._cond:
+            return self._heap[0] if self._heap else None
+
+    def clear(self):
+        """Drop everything scheduled, e.g. before re-planning with new times."""
+        with self._cond:
+            self._heap = []
+            self._items = {}
+            self._cond.notify()
+
+    def pop_due(self, now=None):
+        """Remove and return [(due, items), ...] for every due time <= now."""
+        now = self.clock() if now is None else now
+        batches = []
+        with self._cond:
+            while self._heap and self._heap[0] <= now:
+                due = heapq.heappop(self._heap)
+                batches.append((due, self._items.pop(due)))
+        return batches
+
+    def tick(self, now=None):
+        for due, items in self.pop_due(now):
+            metrics.incr("deadlines.ticks")
+            try:
+                self.callback(due, items)
+            except Exception as e:
+                logger.error(f"Deadline callback for {due} failed: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    wait = self._heap[0] - self.clock() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stopped:
+                    return
+            self.tick()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="deadline-timer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the loop; with `timeout`, also wait for a batch that is being sent."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if timeout and self._thread:
+            self._thread.join(timeout)
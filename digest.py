@@ -0,0 +1,155 @@
+import functools
+import json
+import logging
+import math
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z][a-z0-9_\-]{2,}")
+SLACK_MARKUP = re.compile(r"<[^>]*>|&gt;|&lt;|&amp;|:[a-z0-9_+\-]+:")
+STOPWORDS = frozenset("""
+    about after again all also and any are because been before being but can could did does doing done
+    for from get got had has have having her here him his how into its just let like made make more most
+    much need needs not now off one only other our out over per same should some still such than that the
+    their them then there these they this those through too under until very was way were what when where
+    which while who will with would yet you your yesterday today tomorrow blockers blocker risks risk none
+    addition eod days day left working work worked continue continued continuing finish finished finishing
+    start started starting review reviewed reviewing fix fixed fixing team status update updates
+""".split())
+# Blocker sections that only say there are none
+NO_BLOCKERS = re.compile(r"^\W*(?:no(?:ne)?|nothing|n/?a|nope|-+|no blockers?)\W*$", re.IGNORECASE)
+
+
+def tokenize(text):
+    text = SLACK_MARKUP.sub(" ", (text or "").lower())
+    return [token for token in TOKEN.findall(text) if token not in STOPWORDS]
+
+
+def is_blocker(text):
+    return bool(text and text.strip() and not NO_BLOCKERS.match(text.strip()))
+
+
+class CorpusFrequencies:
+    """Document frequencies of terms across all past reports, cached in a JSON file.
+
+    `through` is the last report date counted, so each day is added once.
+    Past `max_terms` terms, the rarest are dropped: they'd only ever get the
+    top IDF weight, which an unknown term gets anyway.
+    """
+
+    def __init__(self, path, max_terms=50000):
+        self.path = path
+        self.max_terms = max_terms
+        self._lock = threading.Lock()
+        self.docs = 0
+        self.df = {}
+        self.through = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.docs, self.df, self.through = data["docs"], data["df"], data["through"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable corpus cache {path}: {e}")
+
+    def add(self, day, documents):
+        """Count `documents` (token lists) for `day` unless that day is already counted."""
+        with self._lock:
+            if self.through and day <= self.through:
+                return False
+            for tokens in documents:
+                self.docs += 1
+                for token in set(tokens):
+                    self.df[token] = self.df.get(token, 0) + 1
+            if len(self.df) > self.max_terms:
+                keep = sorted(self.df.items(), key=lambda item: -item[1])[:self.max_terms * 9 // 10]
+                self.df = dict(keep)
+            self.through = day
+            return True
+
+    def idf(self, terms):
+        return [math.log((1 + self.docs) / (1 + self.df.get(term, 0))) + 1 for term in terms]
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"docs": self.docs, "df": self.df, "through": self.through})
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+
+@functools.cache
+def load_numpy():
+    """NumPy, imported on the first digest instead of at startup; None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:  # declared in pyproject.toml; the pure-Python path keeps bare checkouts working
+        return None
+    return numpy
+
+
+def top_terms(documents, corpus, per_document=3, overall=6):
+    """TF-IDF weights of the day's documents against the corpus.
+
+    Returns (top terms per document, top terms over all documents).
+    """
+    vocab = {}
+    rows = [[vocab.setdefault(token, len(vocab)) for token in tokens] for tokens in documents]
+    if not vocab:
+        return [[] for _ in documents], []
+    terms = list(vocab)
+    idf = corpus.idf(terms)
+
+    np = load_numpy()
+    if np is not None:
+        counts = np.zeros((len(rows), len(terms)))
+        doc_index = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+        term_index = np.fromiter((i for row in rows for i in row), dtype=np.int64)
+        np.add.at(counts, (doc_index, term_index), 1)
+        weights = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1) * np.asarray(idf)
+        order = np.argsort(-weights, axis=1, kind="stable")[:, :per_document]
+        per_doc = [[terms[j] for j in order[i] if weights[i, j] > 0] for i in range(len(rows))]
+        totals = weights.sum(axis=0)
+        team = [terms[j] for j in np.argsort(-totals, kind="stable")[:overall] if totals[j] > 0]
+        return per_doc, team
+
+    per_doc = []
+    totals = [0.0] * len(terms)
+    for row in rows:
+        weights = {}
+        for j in row:
+            weights[j] = weights.get(j, 0) + 1
+        for j in weights:
+            weights[j] = weights[j] / len(row) * idf[j]
+            totals[j] += weights[j]
+        best = sorted(weights, key=lambda j: (-weights[j], j))[:per_document]
+        per_doc.append([terms[j] for j in best])
+    team = [terms[j] for j in sorted(range(len(terms)), key=lambda j: (-totals[j], j))[:overall] if totals[j] > 0]
+    return per_doc, team
+
+
+def build_digest(rows, corpus, day=None):
+    """Summary text for one day's report rows (user_id, raw_text, today, blockers)."""
+    documents = [tokenize(" ".join(filter(None, [row.get("yesterday"), row.get("today")])) or row["raw_text"]) for row in rows]
+    per_doc, team = top_terms(documents, corpus)
+    if day:
+        corpus.add(day, documents)
+
+    lines = [f"📝 *End-of-day digest* — {len(rows)} report{'s' if len(rows) != 1 else ''}"]
+    if team:
+        lines.append(f"*Topics:* {', '.join(team)}")
+    blockers = [(row["user_id"], row["blockers"]) for row in rows if is_blocker(row.get("blockers"))]
+    if blockers:
+        lines.append("*Blockers:*")
+        lines.extend(f"• <@{user_id}>: {text.strip()}" for user_id, text in blockers)
+    people = [(row["user_id"], terms) for row, terms in zip(rows, per_doc) if terms]
+    if people:
+        lines.append("*By person:*")
+        lines.extend(f"• <@{user_id}>: {', '.join(terms)}" for user_id, terms in people)
+    return "\n".join(lines)
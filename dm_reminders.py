@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by all workers: at most `rate` calls per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(error):
+    """Return the Retry-After delay if `error` is a Slack 429, else None."""
+    response = getattr(error, "response", None)
+    if response is None or getattr(response, "status_code", None) != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class DMReminder:
+    """Sends reminder DMs concurrently through a bounded, rate-limited pool."""
+
+    def __init__(self, max_workers=8, rate_per_sec=10, max_retries=2, max_channels=10000):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.max_channels = max_channels
+        self.limiter = RateLimiter(rate_per_sec)
+        # Slack user ID -> DM channel ID, kept across runs so repeat days skip conversations_open;
+        # least recently used entries are evicted past `max_channels`
+        self._channels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached_channels(self):
+        return len(self._channels)
+
+    def _call(self, func, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                with metrics.timed("slack.call"):
+                    return func(**kwargs)
+            except Exception as e:
+                delay = _retry_after(e)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning(f"Slack rate limited, retrying in {delay}s")
+                time.sleep(delay)
+
+    def _dm_channel(self, client, user_id):
+        """Return (channel_id, was_cached) for the user's DM channel."""
+        with self._lock:
+            channel = self._channels.get(user_id)
+            if channel:
+                self._channels.move_to_end(user_id)
+        if channel:
+            return channel, True
+
+        response = self._call(client.conversations_open, users=user_id)
+        channel = response["channel"]["id"]
+        with self._lock:
+            self._channels[user_id] = channel
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        return channel, False
+
+    def _send_one(self, client, user_id, text):
+        channel, cached = self._dm_channel(client, user_id)
+        self._call(client.chat_postMessage, channel=channel, text=text)
+        return cached
+
+    def send(self, client, user_ids, make_text):
+        """DM every user in `user_ids`; `make_text(uid)` builds the message.
+
+        Returns per-run completion stats.
+        """
+        started = time.monotonic()
+        stats = {"total": len(user_ids), "sent": 0, "failed": 0, "cached": 0, "opened": 0, "failed_users": []}
+        if not user_ids:
+            stats["duration"] = 0.0
+            return stats
+
+        workers = min(self.max_workers, len(user_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dm-reminder") as pool:
+            futures = {uid: pool.submit(self._send_one, client, uid, make_text(uid)) for uid in user_ids}
+            for uid, future in futures.items():
+                try:
+                    cached = future.result()
+                except Exception as e:
+                    logger.error(f"Could not DM reminder to {uid}: {e}")
+                    stats["failed"] += 1
+                    stats["failed_users"].append(uid)
+                    continue
+                stats["sent"] += 1
+                stats["cached" if cached else "opened"] += 1
+
+        stats["duration"] = round(time.monotonic() - started, 3)
+        metrics.incr("dm_reminders.sent", stats["sent"])
+        metrics.incr("dm_reminders.failed", stats["failed"])
+        metrics.incr("dm_reminders.channel_cache_hits", stats["cached"])
+        metrics.set_gauge("dm_reminders.last_run_seconds", stats["duration"])
+        return stats
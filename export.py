@@ -0,0 +1,158 @@
+import argparse
+import csv
+import json
+import logging
+import sys
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ["id", "user_id", "date", "thread_ts", "raw_text", "created_at"]
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def iter_reports(client, since=None, until=None, user_ids=None, page_size=1000, columns=EXPORT_COLUMNS, table="standup_reports"):
+    """Yield report rows in (date, id) order, one page in memory at a time.
+
+    Pages are fetched by keyset on (date, id) rather than OFFSET, so each
+    page is an index range scan no matter how deep the export is. `columns`
+    must include date and id. `table` may also be a view over
+    `standup_reports`, such as `recent_standup_reports`.
+    """
+    if user_ids is not None and not user_ids:
+        return
+    last = None
+    while True:
+        query = client.table(table).select(", ".join(columns))
+        if since:
+            query = query.gte("date", since)
+        if until:
+            query = query.lte("date", until)
+        if user_ids is not None:
+            query = query.in_("user_id", list(user_ids))
+        if last:
+            query = query.or_(f"date.gt.{last[0]},and(date.eq.{last[0]},id.gt.{last[1]})")
+        rows = query.order("date").order("id").limit(page_size).execute().data
+        yield from rows
+        metrics.incr("export.pages")
+        if len(rows) < page_size:
+            return
+        last = (rows[-1]["date"], rows[-1]["id"])
+
+
+def write_csv(rows, out):
+    writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, out):
+    count = 0
+    for row in rows:
+        out.write(json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_parquet(rows, path, batch_size=1000):
+    """Write rows to a Parquet file in row groups of `batch_size`; needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(_parquet_table(pa, schema, batch))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(_parquet_table(pa, schema, batch))
+            count += len(batch)
+    return count
+
+
+def _parquet_table(pa, schema, batch):
+    columns = {
+        column: [None if row.get(column) is None else str(row.get(column)) for row in batch]
+        for column in EXPORT_COLUMNS
+    }
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def export_reports(client, fmt, out, since=None, until=None, user_ids=None, page_size=1000):
+    """Stream reports to `out` (a text stream for csv/jsonl, a path for parquet); returns the row count."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    rows = iter_reports(client, since=since, until=until, user_ids=user_ids, page_size=page_size)
+    if fmt == "csv":
+        count = write_csv(rows, out)
+    elif fmt == "jsonl":
+        count = write_jsonl(rows, out)
+    else:
+        count = write_parquet(rows, out, batch_size=page_size)
+    metrics.incr("export.rows", count)
+    return count
+
+
+def select_users(teams, team_names=None, users=None):
+    """Return the user IDs to export, or None for everyone."""
+    if not team_names and not users:
+        return None
+    selected = set(users or [])
+    for name in team_names or []:
+        if name not in teams:
+            raise ValueError(f"Unknown team: {name} (known: {', '.join(sorted(teams))})")
+        selected.update(teams[name])
+    return sorted(selected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export standup reports from Supabase.")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout; required for parquet)")
+    parser.add_argument("--since", help="First report date, YYYY-MM-DD")
+    parser.add_argument("--until", help="Last report date, YYYY-MM-DD")
+    parser.add_argument("--user", action="append", help="Slack user ID; repeatable")
+    parser.add_argument("--team", action="append", help="Team name from the bot's config (or TEAMS); repeatable")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    import main as bot
+
+    client = bot.get_supabase_client()
+    if not client:
+        parser.error("SUPABASE_URL and SUPABASE_KEY must be set")
+    try:
+        user_ids = select_users(bot.current_teams(client), args.team, args.user)
+    except ValueError as e:
+        parser.error(str(e))
+
+    options = dict(since=args.since, until=args.until, user_ids=user_ids, page_size=args.page_size)
+    if args.format == "parquet":
+        if not args.output:
+            parser.error("--output is required for parquet")
+        count = export_reports(client, "parquet", args.output, **options)
+    elif args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as out:
+            count = export_reports(client, args.format, out, **options)
+    else:
+        count = export_reports(client, args.format, sys.stdout, **options)
+    logger.info(f"Exported {count} report(s)")
+    return count
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,60 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class HealthServer:
+    """Tiny HTTP server for the platform's health checks.
+
+    GET /healthz  200 while the process is up (liveness)
+    GET /readyz   200 when every readiness check passes, else 503
+    GET /status   JSON from `status()`: jobs, latencies, breakers, ...
+
+    `checks()` returns {name: bool}; both callables run on each request.
+    """
+
+    def __init__(self, port, checks, status, host="0.0.0.0"):
+        self.checks = checks
+        self.status = status
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                try:
+                    if path == "/healthz":
+                        code, body = 200, {"status": "ok"}
+                    elif path == "/readyz":
+                        checks = server.checks()
+                        code, body = (200 if all(checks.values()) else 503), checks
+                    elif path == "/status":
+                        code, body = 200, server.status()
+                    else:
+                        code, body = 404, {"error": "not found"}
+                except Exception as e:
+                    logger.error(f"Health endpoint {path} failed: {e}")
+                    code, body = 500, {"error": str(e)}
+                payload = json.dumps(body, default=str).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Health request: {format % args}")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="health-http", daemon=True).start()
+        logger.info(f"Health endpoint listening on :{self.port}")
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,217 @@
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Postgres unique_violation: the run was already claimed by someone else
+UNIQUE_VIOLATION = "23505"
+
+
+def _utc_key(dt):
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def last_fire_time(trigger, now, grace_seconds):
+    """Most recent fire time of `trigger` within (now - grace, now], or None."""
+    fire = trigger.get_next_fire_time(None, now - timedelta(seconds=grace_seconds))
+    last = None
+    while fire is not None and fire <= now:
+        last = fire
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(seconds=1))
+    return last
+
+
+class SqliteJobStore:
+    """Job run history in a local SQLite file."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS job_runs (
+                job_id TEXT NOT NULL,
+                scheduled_for TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT,
+                duration REAL,
+                status TEXT NOT NULL,
+                error TEXT,
+                PRIMARY KEY (job_id, scheduled_for)
+            )"""
+        )
+
+    def claim(self, job_id, scheduled_for):
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO job_runs (job_id, scheduled_for, started_at, status) VALUES (?, ?, ?, 'running')",
+                (job_id, scheduled_for, datetime.now(timezone.utc).isoformat()),
+            )
+            return cur.rowcount == 1
+
+    def finish(self, job_id, scheduled_for, status, duration, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_runs SET finished_at = ?, duration = ?, status = ?, error = ? WHERE job_id = ? AND scheduled_for = ?",
+                (datetime.now(timezone.utc).isoformat(), duration, status, error, job_id, scheduled_for),
+            )
+
+    def history(self, job_id=None, limit=20):
+        query = "SELECT job_id, scheduled_for, started_at, finished_at, duration, status, error FROM job_runs"
+        params = []
+        if job_id:
+            query += " WHERE job_id = ?"
+            params.append(job_id)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            cur = self._conn.execute(query, params)
+            columns = [c[0] for c in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+@metrics.timed_methods("supabase.store")
+class SupabaseJobStore:
+    """Job run history in the `job_runs` table (see setup.sql)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def claim(self, job_id, scheduled_for):
+        try:
+            self.client.table("job_runs").insert({
+                "job_id": job_id,
+                "scheduled_for": scheduled_for,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "status": "running",
+            }).execute()
+            return True
+        except Exception as e:
+            if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                return False
+            raise
+
+    def finish(self, job_id, scheduled_for, status, duration, error=None):
+        self.client.table("job_runs").update({
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration": duration,
+            "status": status,
+            "error": error,
+        }).eq("job_id", job_id).eq("scheduled_for", scheduled_for).execute()
+
+    def history(self, job_id=None, limit=20):
+        query = self.client.table("job_runs").select("*")
+        if job_id:
+            query = query.eq("job_id", job_id)
+        return query.order("started_at", desc=True).limit(limit).execute().data
+
+
+class DurableJobs:
+    """Runs scheduler jobs at most once per scheduled fire time.
+
+    Every run claims `(job_id, scheduled_for)` in the store first, so a
+    missed fire is caught up exactly once after a restart and the run
+    history (status, duration) survives redeploys.
+    """
+
+    def __init__(self, store, misfire_grace_time=3600, gate=None):
+        self.store = store
+        self.misfire_grace_time = misfire_grace_time
+        # Optional callable; jobs only run while it returns True (e.g. leader election)
+        self.gate = gate
+        self.jobs = {}
+        # job_id -> outcome of the latest run in this process, for the health endpoint
+        self.last_runs = {}
+
+    def add(self, scheduler, job_id, func, trigger):
+        self.jobs[job_id] = (func, trigger)
+        scheduler.add_job(
+            self.run,
+            trigger,
+            args=[job_id],
+            id=job_id,
+            misfire_grace_time=self.misfire_grace_time,
+            coalesce=True,
+            replace_existing=True,
+        )
+
+    def reschedule(self, scheduler, job_id, trigger):
+        """Move a job to a new trigger in place; its run history is kept."""
+        func, _ = self.jobs[job_id]
+        self.jobs[job_id] = (func, trigger)
+        scheduler.reschedule_job(job_id, trigger=trigger)
+
+    def remove(self, scheduler, job_id):
+        self.jobs.pop(job_id, None)
+        scheduler.remove_job(job_id)
+
+    def run(self, job_id, scheduled_for=None):
+        if self.gate and not self.gate():
+            logger.info(f"Not the leader, skipping job {job_id}")
+            return
+        func, trigger = self.jobs[job_id]
+        if scheduled_for is None:
+            now = datetime.now(timezone.utc)
+            scheduled_for = last_fire_time(trigger, now, self.misfire_grace_time) or now
+        self._execute(job_id, _utc_key(scheduled_for), func)
+
+    def run_once(self, job_id, scheduled_for, func):
+        """Run `func` for a fire time that is not on a trigger (e.g. a per-user deadline).
+
+        Claimed like scheduled runs, so it runs once across restarts and replicas.
+        """
+        if self.gate and not self.gate():
+            logger.info(f"Not the leader, skipping job {job_id}")
+            return
+        self._execute(job_id, _utc_key(scheduled_for), func)
+
+    def _execute(self, job_id, key, func):
+        try:
+            claimed = self.store.claim(job_id, key)
+        except Exception as e:
+            # Prefer running the job over silently skipping the day
+            logger.warning(f"Could not claim job {job_id}@{key}, running anyway: {e}")
+            claimed = True
+        if not claimed:
+            logger.info(f"Job {job_id}@{key} already ran, skipping")
+            return
+
+        started = time.monotonic()
+        status, error = "success", None
+        try:
+            func()
+        except Exception as e:
+            status, error = "error", str(e)
+            logger.error(f"Job {job_id} failed: {e}")
+        duration = round(time.monotonic() - started, 3)
+        logger.info(f"Job {job_id}@{key} finished: {status} in {duration}s")
+        self.last_runs[job_id] = {
+            "scheduled_for": key,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "status": status,
+            "duration": duration,
+            "error": error,
+        }
+
+        try:
+            self.store.finish(job_id, key, status, duration, error)
+        except Exception as e:
+            logger.warning(f"Could not record run of {job_id}: {e}")
+
+    def catch_up(self, now=None):
+        """Run each job whose latest fire time was missed within the grace period."""
+        now = now or datetime.now(timezone.utc)
+        for job_id, (func, trigger) in self.jobs.items():
+            try:
+                missed = last_fire_time(trigger, now, self.misfire_grace_time)
+            except Exception as e:
+                logger.error(f"Could not compute missed runs for {job_id}: {e}")
+                continue
+            if missed is not None:
+                logger.info(f"Catching up job {job_id} scheduled for {missed.isoformat()}")
+                self.run(job_id, missed)
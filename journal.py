@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ReportJournal:
+    """Append-only local journal for reports the database could not take.
+
+    Entries are JSON lines, fsync'd before `append` returns. The journal is
+    split into numbered segments that rotate at `max_segment_bytes`;
+    `replay` feeds entries to an idempotent writer and compacts each
+    segment down to whatever is still unsaved.
+    """
+
+    def __init__(self, directory, max_segment_bytes=1024 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._file = None
+        self._segment = None
+        self._open_segment(self._next_segment_number())
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(numbers)
+
+    def _next_segment_number(self):
+        numbers = self._segment_numbers()
+        return numbers[-1] + 1 if numbers else 1
+
+    def _open_segment(self, number):
+        if self._file:
+            self._file.close()
+        self._segment = number
+        self._file = open(self._segment_path(number), "ab")
+        _fsync_dir(self.directory)
+
+    def append(self, entry):
+        """Durably record one report entry."""
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._file.tell() >= self.max_segment_bytes:
+                self._open_segment(self._segment + 1)
+        metrics.incr("journal.appended")
+
+    def pending_count(self):
+        count = 0
+        for number in self._segment_numbers():
+            with open(self._segment_path(number), "rb") as f:
+                count += sum(1 for line in f if line.strip())
+        return count
+
+    def _read_segment(self, number):
+        entries = []
+        with open(self._segment_path(number), "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn write from a crash mid-append; nothing to recover
+                    logger.warning(f"Skipping corrupt journal line in segment {number}")
+        return entries
+
+    def _rewrite_segment(self, number, entries):
+        path = self._segment_path(number)
+        if not entries:
+            os.remove(path)
+        else:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                for entry in entries:
+                    f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        _fsync_dir(self.directory)
+
+    def replay(self, apply):
+        """Feed every journaled entry to `apply` in order and compact the journal.
+
+        Stops at the first failure (the database is probably still down) and
+        keeps that entry and everything after it. Returns the number replayed.
+        """
+        with self._replay_lock:
+            # Seal the live segment so new appends don't race with compaction
+            with self._lock:
+                if self._file.tell() > 0:
+                    self._open_segment(self._segment + 1)
+                live = self._segment
+
+            replayed = 0
+            seen = set()
+            for number in self._segment_numbers():
+                if number == live:
+                    continue
+                entries = self._read_segment(number)
+                remaining = []
+                failed = False
+                for entry in entries:
+                    # The same reply journaled twice is applied once; edits differ in op or text
+                    key = (entry.get("op"), entry.get("user_id"), entry.get("ts"), entry.get("text"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if failed:
+                        remaining.append(entry)
+                        continue
+                    try:
+                        apply(entry)
+                        replayed += 1
+                    except Exception as e:
+                        logger.warning(f"Journal replay paused: {e}")
+                        failed = True
+                        remaining.append(entry)
+                self._rewrite_segment(number, remaining)
+                if failed:
+                    break
+
+        if replayed:
+            metrics.incr("journal.replayed", replayed)
+            logger.info(f"Replayed {replayed} journaled report(s)")
+        return replayed
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class JournalReplayer:
+    """Background thread that drains the journal once the database is back."""
+
+    def __init__(self, journal, apply, interval=15, ready=None):
+        self.journal = journal
+        self.apply = apply
+        self.interval = interval
+        # Optional callable; skip a round while it returns False (e.g. breaker open)
+        self.ready = ready
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            if self.ready and not self.ready():
+                continue
+            try:
+                self.journal.replay(self.apply)
+            except Exception as e:
+                logger.error(f"Journal replay failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="journal-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
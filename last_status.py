@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+from models import ReportEntry
+
+
+class LastStatusCache:
+    """Each user's most recent reports, kept in memory for instant lookups.
+
+    Holds the entries of the user's last `depth` report dates, newest first,
+    so yesterday's report is still at hand once today's has been posted.
+    At most `max_users` users are kept; the one written longest ago is
+    evicted first. Writers replace a user's list under a lock; readers
+    never block.
+    """
+
+    def __init__(self, depth=2, max_users=5000):
+        self.depth = depth
+        self.max_users = max_users
+        self._reports = OrderedDict()  # user_id -> ((date, (ReportEntry, ...)), ...), newest first
+        self._lock = threading.Lock()
+
+    def _store(self, user_id, reports):
+        reports.sort(key=lambda report: report[0], reverse=True)
+        if reports:
+            self._reports[user_id] = tuple(reports[:self.depth])
+            self._reports.move_to_end(user_id)
+            while len(self._reports) > self.max_users:
+                self._reports.popitem(last=False)
+        else:
+            self._reports.pop(user_id, None)
+
+    @staticmethod
+    def _entries(entries):
+        return tuple(sorted((ReportEntry(e["ts"], e["text"]) for e in entries), key=lambda e: float(e.ts)))
+
+    def load(self, user_id, report_date, entries):
+        """Set a whole report, e.g. from the database at startup."""
+        with self._lock:
+            reports = [r for r in self._reports.get(user_id, ()) if r[0] != report_date]
+            reports.append((report_date, self._entries(entries)))
+            self._store(user_id, reports)
+
+    def record(self, user_id, report_date, ts, text):
+        """Add a reply to the user's report for `report_date`, or replace it if `ts` is known."""
+        with self._lock:
+            reports = list(self._reports.get(user_id, ()))
+            for i, (day, entries) in enumerate(reports):
+                if day == report_date:
+                    entries = [e for e in entries if e.ts != ts] + [ReportEntry(ts, text)]
+                    reports[i] = (day, tuple(sorted(entries, key=lambda e: float(e.ts))))
+                    break
+            else:
+                reports.append((report_date, (ReportEntry(ts, text),)))
+            self._store(user_id, reports)
+
+    def remove(self, user_id, ts):
+        """Drop one reply; a report left without replies is dropped too."""
+        with self._lock:
+            reports = []
+            for day, entries in self._reports.get(user_id, ()):
+                entries = tuple(e for e in entries if e.ts != ts)
+                if entries:
+                    reports.append((day, entries))
+            self._store(user_id, reports)
+
+    def report(self, user_id, report_date):
+        """Entries of the user's cached report for `report_date`, or None."""
+        for day, entries in self._reports.get(user_id, ()):
+            if day == report_date:
+                return [e._asdict() for e in entries]
+        return None
+
+    def last(self, user_id, before=None):
+        """Return (date, entries) of the user's latest report, optionally dated before `before`."""
+        for day, entries in self._reports.get(user_id, ()):
+            if before is None or day < before:
+                return day, [e._asdict() for e in entries]
+        return None
+
+    def __len__(self):
+        return len(self._reports)
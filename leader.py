@@ -0,0 +1,203 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class SqliteLeaseStore:
+    """Lease table in SQLite; a local stand-in for the shared database."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS bot_leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                token INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+
+    def acquire(self, name, holder, ttl, now=None):
+        """Take or renew the lease; returns the fencing token or None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT holder, token, expires_at FROM bot_leases WHERE name = ?", (name,)
+                ).fetchone()
+                if row is None:
+                    token = 1
+                    self._conn.execute(
+                        "INSERT INTO bot_leases (name, holder, token, expires_at) VALUES (?, ?, ?, ?)",
+                        (name, holder, token, now + ttl),
+                    )
+                elif row[0] == holder and row[2] > now:
+                    token = row[1]
+                    self._conn.execute("UPDATE bot_leases SET expires_at = ? WHERE name = ?", (now + ttl, name))
+                elif row[2] <= now:
+                    token = row[1] + 1
+                    self._conn.execute(
+                        "UPDATE bot_leases SET holder = ?, token = ?, expires_at = ? WHERE name = ?",
+                        (holder, token, now + ttl, name),
+                    )
+                else:
+                    token = None
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return token
+
+    def current(self, name):
+        """Return (holder, token, expires_at) of the lease, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT holder, token, expires_at FROM bot_leases WHERE name = ?", (name,)
+            ).fetchone()
+
+    def release(self, name, holder):
+        with self._lock:
+            self._conn.execute("UPDATE bot_leases SET expires_at = 0 WHERE name = ? AND holder = ?", (name, holder))
+
+
+@metrics.timed_methods("supabase.store")
+class SupabaseLeaseStore:
+    """Lease in the `bot_leases` table (see setup.sql).
+
+    Every write is a compare-and-set on the fencing token, so two replicas
+    can never both win the same term.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, name, holder, ttl, now=None):
+        now = time.time() if now is None else now
+        table = self.client.table("bot_leases")
+        rows = table.select("holder, token, expires_at").eq("name", name).execute().data
+        if not rows:
+            try:
+                table.insert({"name": name, "holder": holder, "token": 1, "expires_at": now + ttl}).execute()
+                return 1
+            except Exception as e:
+                logger.info(f"Lease {name} taken concurrently: {e}")
+                return None
+
+        row = rows[0]
+        if row["holder"] == holder and row["expires_at"] > now:
+            token = row["token"]
+        elif row["expires_at"] <= now:
+            token = row["token"] + 1
+        else:
+            return None
+
+        updated = (
+            table.update({"holder": holder, "token": token, "expires_at": now + ttl})
+            .eq("name", name)
+            .eq("token", row["token"])
+            .eq("holder", row["holder"])
+            .execute()
+        )
+        return token if updated.data else None
+
+    def current(self, name):
+        rows = self.client.table("bot_leases").select("holder, token, expires_at").eq("name", name).execute().data
+        if not rows:
+            return None
+        return rows[0]["holder"], rows[0]["token"], rows[0]["expires_at"]
+
+    def release(self, name, holder):
+        self.client.table("bot_leases").update({"expires_at": 0}).eq("name", name).eq("holder", holder).execute()
+
+
+class LeaderElector:
+    """Keeps a lease alive with a heartbeat; only the holder runs scheduled jobs."""
+
+    def __init__(self, store, name="scheduler", holder=None, ttl=30, heartbeat=10, on_elected=None):
+        self.store = store
+        self.name = name
+        self.holder = holder or default_holder_id()
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.on_elected = on_elected
+        self.token = None
+        self._valid_until = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def try_acquire(self):
+        started = time.monotonic()
+        try:
+            token = self.store.acquire(self.name, self.holder, self.ttl)
+        except Exception as e:
+            logger.warning(f"Lease heartbeat failed: {e}")
+            token = None
+
+        with self._lock:
+            was_leader = self.token is not None
+            if token is not None:
+                self.token = token
+                # Stop acting as leader a bit before the lease can be taken over
+                self._valid_until = started + self.ttl * 0.8
+            elif time.monotonic() >= self._valid_until:
+                self.token = None
+            is_leader = self.token is not None
+
+        if is_leader and not was_leader:
+            logger.info(f"Became leader for {self.name} (token {self.token})")
+            if self.on_elected:
+                self.on_elected()
+        elif was_leader and not is_leader:
+            logger.warning(f"Lost leadership for {self.name}")
+        metrics.set_gauge(f"leader.{self.name}", 1 if is_leader else 0)
+        return is_leader
+
+    def is_leader(self):
+        with self._lock:
+            return self.token is not None and time.monotonic() < self._valid_until
+
+    def check_fencing(self):
+        """True only if we hold the lease and the stored token is still ours."""
+        if not self.is_leader():
+            return False
+        try:
+            current = self.store.current(self.name)
+        except Exception as e:
+            logger.warning(f"Could not verify lease {self.name}: {e}")
+            return False
+        return current is not None and current[0] == self.holder and current[1] == self.token
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.try_acquire()
+            self._stop.wait(self.heartbeat)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat)
+        if self.token is not None:
+            try:
+                self.store.release(self.name, self.holder)
+            except Exception as e:
+                logger.warning(f"Could not release lease {self.name}: {e}")
+        self.token = None
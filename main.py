@@ -1,21 +1,54 @@
+import time
+
+_process_started = time.perf_counter()
+
 import os
 import logging
 import re
 import json
-from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 import random
-import time
+import threading
 
-# Third-party imports
+# Third-party imports. slack_bolt, supabase and apscheduler are slow to
+# import, so they are loaded on first use (see load_slack & co. below).
 import requests
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
-from supabase import create_client, Client
-from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
 
 # Local imports
-from phrases import OPENING_PHRASES
+import metrics
+from dm_reminders import DMReminder
+from jobstore import DurableJobs, SqliteJobStore, SupabaseJobStore, UNIQUE_VIOLATION
+from leader import LeaderElector, SqliteLeaseStore, SupabaseLeaseStore
+from threads import StandupSession, ThreadRegistry
+from outbox import Outbox, SqliteOutboxStore, SupabaseOutboxStore
+from breaker import OPEN, CircuitBreaker, CircuitOpenError
+from journal import JournalReplayer, ReportJournal
+from socket_pool import EventDeduplicator, SocketModePool
+from stats import SqliteStatsStore, StandupStats, SupabaseStatsStore, week_start
+from search import SearchIndex
+from export import iter_reports
+from sections import parse_sections
+from reports import report_text, row_entries
+from near_duplicates import NearDuplicateIndex
+from digest import CorpusFrequencies, build_digest, tokenize
+from last_status import LastStatusCache
+from blockers import BlockerIndex, SqliteBlockerStore, SupabaseBlockerStore
+from deadlines import DeadlineTimer, TimezoneCache, local_due_times, parse_times
+from shutdown import InFlight, ShutdownCoordinator
+from health import HealthServer
+from models import Leave, RosterEntry
+from memprofile import MemoryProfiler, rss_bytes
+from config import ConfigWatcher, FileConfigSource, SupabaseConfigSource, parse_config
+
+# Lazily imported third-party names
+App = None
+SocketModeHandler = None
+create_client = None
+ClientOptions = None
+BackgroundScheduler = None
+CronTrigger = None
 
 # Load environment variables
 load_dotenv()
@@ -28,73 +61,314 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 CHANNEL_ID = os.environ.get("CHANNEL_ID")
 ALERT_CHANNEL_ID = os.environ.get("ALERT_CHANNEL_ID")  # Optional: mirror alerts to a test/monitoring channel
 VACATION_TRACKER_API_KEY = os.environ.get("VACATION_TRACKER_API_KEY")
+DM_REMINDERS_ENABLED = os.environ.get("DM_REMINDERS", "").lower() in ("1", "true", "yes")
+DM_REMINDER_WORKERS = int(os.environ.get("DM_REMINDER_WORKERS", "8"))
+DM_REMINDER_RATE = float(os.environ.get("DM_REMINDER_RATE", "10"))  # messages per second
+STATE_STORE = os.environ.get("STATE_STORE", "supabase")  # where job runs, leases and the outbox live: "supabase" or "sqlite"
+OUTBOX_ENABLED = os.environ.get("OUTBOX", "true").lower() in ("1", "true", "yes")
+LOCAL_DB_PATH = os.environ.get("LOCAL_DB_PATH", "bot_local.db")
+MISFIRE_GRACE_SECONDS = int(os.environ.get("MISFIRE_GRACE_SECONDS", "3600"))
+LEADER_ELECTION = os.environ.get("LEADER_ELECTION", "").lower() in ("1", "true", "yes")
+LEASE_TTL_SECONDS = int(os.environ.get("LEASE_TTL_SECONDS", "30"))
+THREAD_RETENTION_DAYS = int(os.environ.get("THREAD_RETENTION_DAYS", "2"))  # days a thread keeps accepting reports
+STANDUP_TEAM = os.environ.get("STANDUP_TEAM", "all")
+STANDUP_DEADLINE = os.environ.get("STANDUP_DEADLINE", "12:00")
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_SECONDS = int(os.environ.get("BREAKER_RESET_SECONDS", "60"))
+JOURNAL_DIR = os.environ.get("JOURNAL_DIR", "journal")  # empty to disable the local report journal
+JOURNAL_SEGMENT_BYTES = int(os.environ.get("JOURNAL_SEGMENT_BYTES", str(1024 * 1024)))
+JOURNAL_REPLAY_SECONDS = int(os.environ.get("JOURNAL_REPLAY_SECONDS", "15"))
+REGISTRY_REFRESH_SECONDS = float(os.environ.get("REGISTRY_REFRESH_SECONDS", "5"))  # min gap between re-reads on a thread miss
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "5"))  # seconds per database request before it counts as failed
+STATE_READY_TIMEOUT = float(os.environ.get("STATE_READY_TIMEOUT", "10"))  # seconds handlers wait for restored state
+SOCKET_MODE_CONNECTIONS = int(os.environ.get("SOCKET_MODE_CONNECTIONS", "1"))  # Slack allows up to 10
+SOCKET_REFRESH_SECONDS = int(os.environ.get("SOCKET_REFRESH_SECONDS", "3600"))
+STATS_ENABLED = os.environ.get("STATS", "true").lower() in ("1", "true", "yes")
+SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", "search_index.db")  # empty to disable /standup-search
+SEARCH_PAGE_SIZE = 10
+NEAR_DUPLICATE_REACTION = os.environ.get("NEAR_DUPLICATE_REACTION", "repeat")  # empty to disable detection
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+NEAR_DUPLICATE_DAYS = int(os.environ.get("NEAR_DUPLICATE_DAYS", "14"))
+DIGEST_ENABLED = os.environ.get("DIGEST", "true").lower() in ("1", "true", "yes")
+DIGEST_CORPUS_PATH = os.environ.get("DIGEST_CORPUS_PATH", "digest_corpus.json")
+LOCAL_REMINDERS = os.environ.get("LOCAL_REMINDERS", "true").lower() in ("1", "true", "yes")  # per-user local reminder times
+REMINDER_TIMES = parse_times(os.environ.get("REMINDER_TIMES", "11:30,17:00"))  # local wall-clock times
+STANDUP_TIMEZONE = os.environ.get("STANDUP_TIMEZONE", "Europe/Berlin")  # scheduled posts, and users without a timezone
+DAILY_THREAD_TIME = (9, 4)
+DIGEST_TIME = (17, 30)
+# Teams, schedule and phrases can be changed without a redeploy: "file" (CONFIG_PATH), "supabase" (bot_config table) or empty
+CONFIG_SOURCE = os.environ.get("CONFIG_SOURCE", "file")
+CONFIG_PATH = os.environ.get("CONFIG_PATH", "standup_config.json")
+CONFIG_POLL_SECONDS = float(os.environ.get("CONFIG_POLL_SECONDS", "10"))
+# Optional per-team override of Slack profile timezones: "eng-team=Europe/Berlin,brand-team=America/New_York"
+TEAM_TIMEZONES = dict(item.split("=", 1) for item in os.environ.get("TEAM_TIMEZONES", "").split(",") if "=" in item)
+HEALTH_PORT = os.environ.get("HEALTH_PORT", os.environ.get("PORT", "8080"))  # empty to disable /healthz, /readyz, /status
+# Slack user IDs allowed to run /standup-memory; empty disables the command
+ADMIN_USER_IDS = {uid for uid in os.environ.get("ADMIN_USER_IDS", "").split(",") if uid}
+SHUTDOWN_TIMEOUT = float(os.environ.get("SHUTDOWN_TIMEOUT", "25"))  # seconds to drain on SIGTERM, below the platform's kill timeout
+BLOCKERS_ENABLED = os.environ.get("BLOCKERS", "true").lower() in ("1", "true", "yes")
+BLOCKERS_IN_THREAD = int(os.environ.get("BLOCKERS_IN_THREAD", "15"))  # carried-over blockers listed in the morning post
 
-# Global state to track the daily thread timestamp
-daily_thread_ts = None
+# Open standup threads: (channel, thread_ts) -> session
+thread_registry = ThreadRegistry(retention_days=THREAD_RETENTION_DAYS)
+registry_refreshed_at = 0.0  # wall-clock time of the last re-read on a miss
+registry_refresh_lock = threading.Lock()
 
-# Mapping: Slack User ID -> Name as it appears in Vacation Tracker
-TEAM_MAPPING = {
-    # == @eng-team ==
-    "U02H9RXPKGT": "Alexey Leshchuk",
-    "U08SKHD45U2": "Anastasia Kondratyuk",
-    "U06A6MV64R2": "andrei",
-    "U035U3KTFL5": "Anton Tyutin",
-    "U08MW9K5K0U": "Ban Markovic",
-    "UEXNGPDTR": "Boris Romanov",
-    "U0AD8TDM4DQ": "Constantin Chopin",
-    "U097GKF641M": "Cristian Matzov",
-    "U085J8B5TJ6": "Ed",
-    "U097GKK3UUX": "Georgi Todorov",
-    "U011Q8J1PDK": "Georgii Andrianov",
-    "U09QE0E0HHQ": "Giorgio Sarno",
-    "U088WHYP2P6": "Gvantsa Nebadze",
-    "U0965UA3XQ8": "maksim",
-    "U08EFQCMJ3U": "Paweł",
-    "U09T69U1Y5V": "Sebastian",
-    "USMQ8CRU6": "Semyon Vlasov",
-    "U04SBH53P9C": "Sergei Mironov",
-    "U0821BRMJ4R": "Stan Khvo",
-    "U098DPA85PY": "Wojciech Klarowski",
-    "U09MF4SB7C2": "Xhonino (John)",
-    
-    # == @brand-team ==
-    "U07SR89J8NA": "Artiom Zverev",
-    "U089EU49X7B": "Minju Song",
-    
-    # == Others ==
-    "U068KKKNP9R": "dmytro 'kino' klochko"
+# Team -> {Slack User ID: Name as it appears in Vacation Tracker}
+TEAMS = {
+    "eng-team": {
+        "U02H9RXPKGT": "Alexey Leshchuk",
+        "U08SKHD45U2": "Anastasia Kondratyuk",
+        "U06A6MV64R2": "andrei",
+        "U035U3KTFL5": "Anton Tyutin",
+        "U08MW9K5K0U": "Ban Markovic",
+        "UEXNGPDTR": "Boris Romanov",
+        "U0AD8TDM4DQ": "Constantin Chopin",
+        "U097GKF641M": "Cristian Matzov",
+        "U085J8B5TJ6": "Ed",
+        "U097GKK3UUX": "Georgi Todorov",
+        "U011Q8J1PDK": "Georgii Andrianov",
+        "U09QE0E0HHQ": "Giorgio Sarno",
+        "U088WHYP2P6": "Gvantsa Nebadze",
+        "U0965UA3XQ8": "maksim",
+        "U08EFQCMJ3U": "Paweł",
+        "U09T69U1Y5V": "Sebastian",
+        "USMQ8CRU6": "Semyon Vlasov",
+        "U04SBH53P9C": "Sergei Mironov",
+        "U0821BRMJ4R": "Stan Khvo",
+        "U098DPA85PY": "Wojciech Klarowski",
+        "U09MF4SB7C2": "Xhonino (John)",
+    },
+    "brand-team": {
+        "U07SR89J8NA": "Artiom Zverev",
+        "U089EU49X7B": "Minju Song",
+    },
+    "others": {
+        "U068KKKNP9R": "dmytro 'kino' klochko",
+    },
 }
 
+# Every team member, as compact records
+ROSTER = tuple(RosterEntry(uid, name, team) for team, members in TEAMS.items() for uid, name in members.items())
+
+# Mapping: Slack User ID -> Name as it appears in Vacation Tracker
+TEAM_MAPPING = {entry.user_id: entry.name for entry in ROSTER}
+
 # Collect all user IDs for report tracking, excluding CEO (@dk - U068KKKNP9R)
-TEAM_USER_IDS = [uid for uid in TEAM_MAPPING.keys() if uid != "U068KKKNP9R"]
+EXCLUDED_USER_IDS = frozenset({"U068KKKNP9R"})
+TEAM_USER_IDS = [uid for uid in TEAM_MAPPING.keys() if uid not in EXCLUDED_USER_IDS]
+
+# Reverse mapping: lowercase name -> Slack user ID, for Vacation Tracker leaves
+NAME_TO_UID = {name.lower(): uid for uid, name in TEAM_MAPPING.items()}
+
+# Michael Scott greetings for a cheerful morning
+GREETINGS = (
+    "Good morning, Dunder Mifflin! ☕",
+    "“You miss 100% of the shots you don't take. – Wayne Gretzky” – Michael Scott. Time for standup! 🏒",
+    "I’m an early bird, and I’m a night owl, so I’m wise, and I have worms. Morning team! 🦉",
+    "Well, well, well, how the turntables... It's standup time! 💿",
+    "Dunder Mifflin, this is Michael. Drop your daily updates! 🏢",
+    "I am Beyoncé, always. And you are my favorite team. Standup time! 👑"
+)
+
+# Reminder memes
+MEMES = (
+    "I DECLARE... STANDUP! 📢\nhttps://media.giphy.com/media/8nM6YNtvjuezzD7DNh/giphy.gif",
+
+    "NO GOD! PLEASE NO! Forgot to write your status? 😱\nhttps://media.giphy.com/media/vyTnNTrs3wqQ0UIvwE/giphy.gif",
+
+    "Would I rather be feared or loved? Easy. Both. I want people to be afraid of how much they love my standup reminders. ☕\nhttps://media.giphy.com/media/hTfhyOtBcBWLeGnMpp/giphy.gif",
+
+    "Prison Mike says: in prison you are somebody's b*tch. Here, you just need to write your status! 🧣\nhttps://media.giphy.com/media/aZeFIjI9hNcJ2/giphy.gif",
+
+    "Me waiting for your updates past 12:00... 🕒\nhttps://media.giphy.com/media/ui1hpJSyBDWlG/giphy.gif",
+
+    "If I don't have some updates soon, I might die. 🍰\nhttps://media.giphy.com/media/5wWf7H89PisM6An8UAU/giphy.gif"
+)
+
+# Everything above as the external config's defaults (see config.py and
+# standup_config.example.json); keys missing from the config keep these values
+DEFAULT_CONFIG = {
+    "teams": TEAMS,
+    "exclude_from_reports": sorted(EXCLUDED_USER_IDS),
+    "schedule": {
+        "timezone": STANDUP_TIMEZONE,
+        "daily_thread": "%02d:%02d" % DAILY_THREAD_TIME,
+        "reminders": ["%02d:%02d" % hour_minute for hour_minute in REMINDER_TIMES],
+        "digest": "%02d:%02d" % DIGEST_TIME,
+    },
+    "greetings": list(GREETINGS),
+    "memes": list(MEMES),
+}
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Startup step -> milliseconds, logged once the bot is ready
+startup_timings = {"import.main": round((time.perf_counter() - _process_started) * 1000, 1)}
+
+# Set once open threads are restored; handlers wait for it after a cold start
+state_ready = threading.Event()
+state_ready.set()
+
+# Set once the caches are warm too; /readyz waits for it, handlers don't
+caches_warm = threading.Event()
+caches_warm.set()
+
+
+def timed(step, func, *args, **kwargs):
+    """Run `func` and record how long it took under `step` in startup_timings."""
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        startup_timings[step] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def load_slack():
+    global App, SocketModeHandler
+    if App is None:
+        from slack_bolt import App as BoltApp
+        App = BoltApp
+    if SocketModeHandler is None:
+        from slack_bolt.adapter.socket_mode import SocketModeHandler as BoltSocketModeHandler
+        SocketModeHandler = BoltSocketModeHandler
+
+
+def load_supabase():
+    global create_client, ClientOptions
+    if create_client is None:
+        from supabase import create_client as supabase_create_client
+        create_client = supabase_create_client
+    if ClientOptions is None:
+        from supabase import ClientOptions as SupabaseClientOptions
+        ClientOptions = SupabaseClientOptions
+
+
+def load_scheduler():
+    global BackgroundScheduler, CronTrigger
+    if BackgroundScheduler is None:
+        from apscheduler.schedulers.background import BackgroundScheduler as APBackgroundScheduler
+        BackgroundScheduler = APBackgroundScheduler
+    if CronTrigger is None:
+        from apscheduler.triggers.cron import CronTrigger as APCronTrigger
+        CronTrigger = APCronTrigger
+
+
 def get_supabase_client():
     if not SUPABASE_URL or not SUPABASE_KEY:
         return None
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    timed("import.supabase", load_supabase)
+    # Without a timeout a hung request blocks the event handler, and with it the journal fallback
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT))
 
 # Initialize clients
 app = None
 supabase = None
+durable_jobs = None
+leader = None
+outbox = None
+journal = None
+standup_stats = None
+stats_worker = None  # single thread for rollup writes, so handlers don't wait on them
+search_index = None
+digest_corpus = None
+blocker_index = None
+reminder_timer = None
+shutdown_coordinator = None
+socket_mode = None
+health_server = None
+scheduler = None
+config_watcher = None
+
+# Held while a new config is swapped in
+config_lock = threading.Lock()
 
 VACATION_TRACKER_API_URL = "https://api.vacationtracker.io"
 
+# Circuit breakers: fail fast while a dependency is down
+vacation_breaker = CircuitBreaker("vacation_tracker", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+supabase_breaker = CircuitBreaker("supabase", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+
+# Last known good data, served while a breaker is open
+last_good_vacations = None  # (date, set of user IDs)
+reported_cache = {}  # date -> user IDs known to have reported
+reported_cache_lock = threading.Lock()
+
+# Event IDs seen recently, to drop events redelivered on another connection
+event_dedup = EventDeduplicator()
+
+# Recent reports per user, to flag statuses pasted unchanged from an earlier day
+near_duplicates = NearDuplicateIndex(threshold=NEAR_DUPLICATE_THRESHOLD, retention_days=NEAR_DUPLICATE_DAYS)
+
+# Each user's latest reports, behind /laststatus
+last_status = LastStatusCache()
+
+# Slack profile timezones, for per-user reminder times
+user_timezones = TimezoneCache(default=STANDUP_TIMEZONE)
+
+# Message handlers still running, drained on shutdown
+in_flight = InFlight()
+
+# tracemalloc snapshots behind /standup-memory
+memory_profiler = MemoryProfiler()
+
+# Reminder DMs: DM channel IDs are cached here between runs
+dm_reminder = DMReminder(max_workers=DM_REMINDER_WORKERS, rate_per_sec=DM_REMINDER_RATE)
+
+
+def thread_permalink(channel, ts):
+    return f"https://slack.com/archives/{channel}/p{ts.replace('.', '')}"
+
+
+def send_slack(client, method, key, kind=None, **kwargs):
+    """Deliver a Slack Web API call through the outbox, or directly if it is disabled.
+
+    `key` identifies the side effect: the same key is never delivered twice.
+    If the outbox can't take it (e.g. its Supabase table is down), the call
+    is made directly instead, so the user still sees it.
+    """
+    if outbox:
+        try:
+            if isinstance(outbox.store, SupabaseOutboxStore):
+                supabase_breaker.call(outbox.enqueue, method, key, kind=kind, **kwargs)
+            else:
+                outbox.enqueue(method, key, kind=kind, **kwargs)
+            return None
+        except Exception as e:
+            logger.warning(f"Outbox unavailable, calling Slack directly for {key}: {e}")
+            metrics.incr("outbox.bypassed")
+    with metrics.timed("slack.call"):
+        return getattr(client, method)(**kwargs)
+
 
 def send_alert(text):
     """Send a short notification to the monitoring/test channel (if configured)."""
     if not app or not ALERT_CHANNEL_ID:
         return
     try:
-        app.client.chat_postMessage(channel=ALERT_CHANNEL_ID, text=text)
+        with metrics.timed("slack.call"):
+            app.client.chat_postMessage(channel=ALERT_CHANNEL_ID, text=text)
     except Exception as e:
         logger.warning(f"Could not send alert: {e}")
 
 
+def breaker_states():
+    return {b.name: b.snapshot() for b in (vacation_breaker, supabase_breaker)}
+
+
+def remember_reporters(report_date, user_ids):
+    """Record users who reported on `report_date`, for use while Supabase is down."""
+    oldest = (date.today() - timedelta(days=THREAD_RETENTION_DAYS)).isoformat()
+    with reported_cache_lock:
+        reported_cache.setdefault(report_date, set()).update(user_ids)
+        for day in [d for d in reported_cache if d < oldest]:
+            del reported_cache[day]
+
+
 def get_vacation_users():
     """Get users currently on vacation via the Vacation Tracker API."""
+    global last_good_vacations
     vacation_users = set()
 
     if not VACATION_TRACKER_API_KEY:
@@ -103,8 +377,17 @@ def get_vacation_users():
 
     today = date.today().isoformat()
 
-    # Reverse mapping: lowercase name -> Slack user ID
-    name_to_uid = {name.lower(): uid for uid, name in TEAM_MAPPING.items()}
+    # While the API is failing, don't wait on it: serve the last known good set
+    if not vacation_breaker.allow():
+        if last_good_vacations is None:
+            logger.error("Vacation Tracker circuit open and no cached vacations")
+            return "error"
+        cached_day, cached_users = last_good_vacations
+        logger.warning(f"Vacation Tracker circuit open, serving vacations from {cached_day}")
+        return set(cached_users)
+
+    name_to_uid = NAME_TO_UID  # one snapshot for every page, even if the config changes meanwhile
+    leaves = []
 
     try:
         headers = {
@@ -126,12 +409,13 @@ def get_vacation_users():
             if next_token:
                 params["nextToken"] = next_token
 
-            resp = requests.get(
-                f"{VACATION_TRACKER_API_URL}/v1/leaves",
-                headers=headers,
-                params=params,
-                timeout=10,
-            )
+            with metrics.timed("vacation_tracker.call"):
+                resp = requests.get(
+                    f"{VACATION_TRACKER_API_URL}/v1/leaves",
+                    headers=headers,
+                    params=params,
+                    timeout=10,
+                )
             resp.raise_for_status()
             data = resp.json()
 
@@ -145,7 +429,7 @@ def get_vacation_users():
                 user_name = user_info.get("name", "").lower()
 
                 if user_name in name_to_uid:
-                    vacation_users.add(name_to_uid[user_name])
+                    leaves.append(Leave(name_to_uid[user_name], user_info.get("name"), leave.get("startDate"), leave.get("endDate")))
                     logger.info(f"Found vacationer (API): {user_info.get('name')}")
 
             next_token = data.get("nextToken")
@@ -157,95 +441,205 @@ def get_vacation_users():
                 logger.warning("Vacation API: hit pagination limit (10 pages)")
                 break
 
+        vacation_users = {leave.user_id for leave in leaves}
         logger.info(f"Users on vacation today: {vacation_users}")
+        vacation_breaker.record_success()
+        last_good_vacations = (today, frozenset(vacation_users))
         return vacation_users
 
     except requests.exceptions.HTTPError as e:
+        vacation_breaker.record_failure()
         logger.error(f"Vacation Tracker API HTTP error: {e.response.status_code} — {e.response.text[:200]}")
         return "error"
     except Exception as e:
+        vacation_breaker.record_failure()
         logger.error(f"Error fetching vacations from API: {e}")
         return "error"
 
+def current_thread_ts():
+    """Timestamp of today's standup thread in CHANNEL_ID, or None."""
+    session = thread_registry.for_date(date.today().isoformat(), CHANNEL_ID)
+    return session.thread_ts if session else None
+
+
+def save_thread_registry():
+    """Persist all open threads as a single bot_state row (one atomic upsert)."""
+    if not supabase:
+        return
+    try:
+        supabase.table("bot_state").upsert({"key": "thread_registry", "value": thread_registry.to_json()}).execute()
+    except Exception as e:
+        logger.warning(f"Could not save bot state: {e}")
+
+
+def restore_thread_registry(merge=False):
+    if not supabase:
+        return
+    try:
+        result = supabase.table("bot_state").select("key, value").in_("key", ["thread_registry", "daily_thread_ts"]).execute()
+        state = {row["key"]: row["value"] for row in result.data}
+        if "thread_registry" in state:
+            thread_registry.load_json(state["thread_registry"], merge=merge)
+        elif "daily_thread_ts" in state:
+            # Pre-registry deployments stored only the latest thread
+            thread_ts = state["daily_thread_ts"]
+            thread_registry.register(StandupSession(
+                CHANNEL_ID, thread_ts, STANDUP_TEAM, date.fromtimestamp(float(thread_ts)).isoformat(), STANDUP_DEADLINE,
+            ))
+        logger.info(f"Restored {len(thread_registry.sessions())} standup thread(s)")
+    except Exception as e:
+        logger.warning(f"Could not restore bot state: {e}")
+
+
+def lookup_session(channel, thread_ts):
+    """Open standup session for a reply, re-reading bot_state on a miss.
+
+    Only the leader posts (and registers) the daily thread, so the other
+    replicas learn about it here. A re-read happens only for threads started
+    after (or shortly before) the previous re-read, and at most once every
+    REGISTRY_REFRESH_SECONDS.
+    """
+    global registry_refreshed_at
+    session = thread_registry.lookup(channel, thread_ts)
+    if session or not thread_ts or not supabase:
+        return session
+    with registry_refresh_lock:
+        now = time.time()
+        try:
+            started = float(thread_ts)
+        except ValueError:
+            return None
+        # The leader saves the registry right after posting; allow for that lag
+        if started < registry_refreshed_at - 60 or now - registry_refreshed_at < REGISTRY_REFRESH_SECONDS:
+            logger.debug(f"Thread {thread_ts} is not an open standup thread")
+            return None
+        registry_refreshed_at = now
+        restore_thread_registry(merge=True)
+    session = thread_registry.lookup(channel, thread_ts)
+    if session:
+        logger.info(f"Picked up standup thread {thread_ts} posted by another replica")
+        metrics.incr("thread_registry.refreshed")
+    else:
+        logger.debug(f"Thread {thread_ts} is not an open standup thread")
+    return session
+
+
 def post_daily_thread():
-    global daily_thread_ts
-    
     if not app or not CHANNEL_ID:
         logger.error("App or CHANNEL_ID not initialized")
         return
 
-    # Michael Scott greetings for a cheerful morning
-    MICHAEL_SCOTT_GREETINGS = [
-        "Good morning, Dunder Mifflin! ☕",
-        "“You miss 100% of the shots you don't take. – Wayne Gretzky” – Michael Scott. Time for standup! 🏒",
-        "I’m an early bird, and I’m a night owl, so I’m wise, and I have worms. Morning team! 🦉",
-        "Well, well, well, how the turntables... It's standup time! 💿",
-        "Dunder Mifflin, this is Michael. Drop your daily updates! 🏢",
-        "I am Beyoncé, always. And you are my favorite team. Standup time! 👑"
-    ]
-    phrase = random.choice(MICHAEL_SCOTT_GREETINGS)
+    phrase = random.choice(GREETINGS)
     
+    # Removed "12:00 sync" mention, kept just the deadline
+    standup_text = (
+        f"{phrase} <!subteam^S074DP77Q9H> <!subteam^S08EJBE5Q4X>\n\n"
+        "*Daily — status thread* 💥\n"
+        f"*Please reply here before {STANDUP_DEADLINE} with:*\n"
+        "*Yesterday:* what shipped / merged. Make sure you quote your last reply and update it with statuses.\n"
+        "*Today (by EOD or days remaining):* what you'll complete / how many days left\n"
+        "*Blockers / Risks:* who/what is needed to unblock\n"
+        "*Status-only here; move discussion to subthreads*\n"
+        "*If you can't finish something today, state the time remaining*\n\n"
+        "cc: <@U068KKKNP9R>"
+    )
+    standup_text += carried_over_blockers()
+
     try:
-        # Removed "12:00 sync" mention, kept just the deadline
-        standup_text = (
-            f"{phrase} <!subteam^S074DP77Q9H> <!subteam^S08EJBE5Q4X>\n\n"
-            "*Daily — status thread* 💥\n"
-            "*Please reply here before 12:00 with:*\n"
-            "*Yesterday:* what shipped / merged. Make sure you quote your last reply and update it with statuses.\n"
-            "*Today (by EOD or days remaining):* what you'll complete / how many days left\n"
-            "*Blockers / Risks:* who/what is needed to unblock\n"
-            "*Status-only here; move discussion to subthreads*\n"
-            "*If you can't finish something today, state the time remaining*\n\n"
-            "cc: <@U068KKKNP9R>"
-        )
-        
-        response = app.client.chat_postMessage(
-            channel=CHANNEL_ID,
-            text=standup_text
-        )
-        daily_thread_ts = response["ts"]
-        logger.info(f"Posted daily thread: {daily_thread_ts}")
+        with metrics.timed("slack.call"):
+            response = app.client.chat_postMessage(
+                channel=CHANNEL_ID,
+                text=standup_text
+            )
+    except Exception as e:
+        logger.error(f"Error posting daily thread: {e}")
+        # Keep retrying in the background; the rest happens once it is delivered
+        if outbox:
+            outbox.enqueue(
+                "chat_postMessage", f"daily_thread:{CHANNEL_ID}:{date.today().isoformat()}",
+                kind="daily_thread", channel=CHANNEL_ID, text=standup_text,
+            )
+        return
+
+    on_daily_thread_posted(response["ts"])
+
+
+def carried_over_blockers():
+    """Open blockers for the morning post, oldest first; empty when there are none."""
+    if not blocker_index:
+        return ""
+    try:
+        rows = blocker_index.open_blockers()
+    except Exception as e:
+        logger.error(f"Error reading open blockers: {e}")
+        return ""
+    if not rows:
+        return ""
+    lines = ["\n\n*Carried-over blockers:*"]
+    lines.extend(f"• <@{row['user_id']}>: {row['text']} (since {row['since']})" for row in rows[:BLOCKERS_IN_THREAD])
+    if len(rows) > BLOCKERS_IN_THREAD:
+        lines.append(f"…and {len(rows) - BLOCKERS_IN_THREAD} more, see /blockers")
+    return "\n".join(lines)
+
+
+def on_daily_thread_posted(thread_ts):
+    """Register a freshly posted standup thread and post the vacation status in it."""
+    try:
+        thread_registry.register(StandupSession(
+            CHANNEL_ID, thread_ts, STANDUP_TEAM, date.today().isoformat(), STANDUP_DEADLINE,
+        ))
+        logger.info(f"Posted daily thread: {thread_ts}")
 
         # Alert to monitoring channel
-        thread_link = f"https://slack.com/archives/{CHANNEL_ID}/p{daily_thread_ts.replace('.', '')}"
+        thread_link = thread_permalink(CHANNEL_ID, thread_ts)
         send_alert(f"✅ Daily standup thread posted → <{thread_link}|open thread>")
         
-        # Save thread timestamp to database
-        if supabase:
-            try:
-                supabase.table("bot_state").upsert({"key": "daily_thread_ts", "value": daily_thread_ts}).execute()
-            except Exception as e:
-                logger.warning(f"Could not save bot state: {e}")
+        # Save open threads to database
+        save_thread_registry()
+
+        # Today's per-user reminders (timezone lookups may take a while)
+        if reminder_timer:
+            threading.Thread(target=plan_reminders, name="plan-reminders", daemon=True).start()
         
         # Post vacation status right after the thread
         vacations = get_vacation_users()
         
         if vacations == "error":
-            app.client.chat_postMessage(
-                channel=CHANNEL_ID,
-                thread_ts=daily_thread_ts,
-                text="⚠️ _Failed to check vacations (channel or API access error)._"
-            )
+            text = "⚠️ _Failed to check vacations (channel or API access error)._"
         elif vacations:
             mentions = ", ".join([f"<@{uid}>" for uid in vacations])
-            app.client.chat_postMessage(
-                channel=CHANNEL_ID,
-                thread_ts=daily_thread_ts,
-                text=f"🌴 *Out today (Vacation/Off):* {mentions}\n_Enjoy your time off!_"
-            )
+            text = f"🌴 *Out today (Vacation/Off):* {mentions}\n_Enjoy your time off!_"
         else:
-            app.client.chat_postMessage(
-                channel=CHANNEL_ID,
-                thread_ts=daily_thread_ts,
-                text="🌴 *Everyone's in today!* (No one on vacation)"
-            )
+            text = "🌴 *Everyone's in today!* (No one on vacation)"
+        send_slack(app.client, "chat_postMessage", f"vacations:{thread_ts}", channel=CHANNEL_ID, thread_ts=thread_ts, text=text)
             
     except Exception as e:
         logger.error(f"Error posting daily thread: {e}")
 
-def check_missing_reports():
-    global daily_thread_ts
-    if not daily_thread_ts:
+def send_dm_reminders(missing_users, thread_ts):
+    """DM each missing user a link to today's thread."""
+    thread_link = thread_permalink(CHANNEL_ID, thread_ts)
+    stats = dm_reminder.send(
+        app.client,
+        missing_users,
+        lambda uid: f"Hey <@{uid}>, waiting for your standup update! ⏳ <{thread_link}|Reply in today's thread>",
+    )
+    logger.info(
+        f"DM reminders: {stats['sent']}/{stats['total']} sent in {stats['duration']}s "
+        f"({stats['cached']} cached channels, {stats['failed']} failed)"
+    )
+    return stats
+
+
+def check_missing_reports(dm=None, user_ids=None, due=None):
+    """Remind `user_ids` (default: everyone) who haven't reported today.
+
+    `due` is the deadline being enforced, when called from the reminder timer.
+    """
+    if dm is None:
+        dm = DM_REMINDERS_ENABLED
+    thread_ts = current_thread_ts()
+    if not thread_ts:
         logger.warning("No daily thread found for today. Skipping check.")
         return
     
@@ -257,8 +651,19 @@ def check_missing_reports():
     
     try:
         # 1. Get users who already reported
-        response = supabase.table("standup_reports").select("user_id").eq("date", today).execute()
-        reported_users = {row["user_id"] for row in response.data}
+        try:
+            response = supabase_breaker.call(
+                lambda: supabase.table("standup_reports").select("user_id").eq("date", today).execute()
+            )
+            reported_users = {row["user_id"] for row in response.data}
+            remember_reporters(today, reported_users)
+        except CircuitOpenError:
+            with reported_cache_lock:
+                reported_users = set(reported_cache.get(today, ()))
+            if not reported_users:
+                logger.error("Supabase circuit open and no cached reports, skipping reminders")
+                return
+            logger.warning(f"Supabase circuit open, using {len(reported_users)} cached reporters")
         
         # 2. Get users on vacation
         vacation_users = get_vacation_users()
@@ -266,55 +671,608 @@ def check_missing_reports():
             vacation_users = set()  # On error, assume no vacations to avoid breaking the flow
 
         # 3. Find users who haven't reported (TEAM_USER_IDS already excludes CEO)
+        candidates = TEAM_USER_IDS if user_ids is None else user_ids
         missing_users = [
-            uid for uid in TEAM_USER_IDS 
+            uid for uid in candidates
             if uid not in reported_users and uid not in vacation_users
         ]
         
         # 4. Send reminder with a meme
         if missing_users:
-            MEMES = [
-                "I DECLARE... STANDUP! 📢\nhttps://media.giphy.com/media/8nM6YNtvjuezzD7DNh/giphy.gif",
-
-                "NO GOD! PLEASE NO! Forgot to write your status? 😱\nhttps://media.giphy.com/media/vyTnNTrs3wqQ0UIvwE/giphy.gif",
-
-                "Would I rather be feared or loved? Easy. Both. I want people to be afraid of how much they love my standup reminders. ☕\nhttps://media.giphy.com/media/hTfhyOtBcBWLeGnMpp/giphy.gif",
-
-                "Prison Mike says: in prison you are somebody's b*tch. Here, you just need to write your status! 🧣\nhttps://media.giphy.com/media/aZeFIjI9hNcJ2/giphy.gif",
-
-                "Me waiting for your updates past 12:00... 🕒\nhttps://media.giphy.com/media/ui1hpJSyBDWlG/giphy.gif",
-
-                "If I don't have some updates soon, I might die. 🍰\nhttps://media.giphy.com/media/5wWf7H89PisM6An8UAU/giphy.gif"
-            ]
             meme = random.choice(MEMES)
             mentions = " ".join([f"<@{uid}>" for uid in missing_users])
+            run_key = int(due) if due else f"{datetime.now():%Y%m%d%H}"
             
-            app.client.chat_postMessage(
+            send_slack(
+                app.client, "chat_postMessage",
+                f"reminder:{thread_ts}:{run_key}",
                 channel=CHANNEL_ID,
-                thread_ts=daily_thread_ts,
+                thread_ts=thread_ts,
                 text=f"Hey {mentions}! {meme}"
             )
             logger.info(f"Reminded missing users: {missing_users}")
             send_alert(f"⏰ Reminder sent to {len(missing_users)} people who haven't reported yet")
+
+            # Optionally nudge each missing user directly as well
+            if dm:
+                stats = send_dm_reminders(missing_users, thread_ts)
+                send_alert(f"✉️ DM reminders: {stats['sent']}/{stats['total']} delivered in {stats['duration']}s")
         else:
             logger.info("All active users have reported. No reminders needed!")
             send_alert("🎉 All team members have reported — no reminders needed!")
+
+        # 5. Stats rollups, after the reminder so they never delay it
+        if standup_stats:
+            expected_users = [uid for uid in candidates if uid not in vacation_users]
+            update_stats(standup_stats.record_expected, today, expected_users, reported_users)
             
     except Exception as e:
         logger.error(f"Error checking missing reports: {e}")
 
+def user_timezone(user_id):
+    for team, tz in TEAM_TIMEZONES.items():
+        if user_id in TEAMS.get(team, ()):
+            return tz
+    return user_timezones.get(app.client, user_id)
+
+
+def plan_reminders(day=None, now=None):
+    """Put today's local reminder times of every team member on the reminder timer.
+
+    Times missed by less than the misfire grace (e.g. during a restart) fire
+    right away; the run claim keeps each one from firing twice.
+    """
+    if not reminder_timer:
+        return 0
+    day = day or date.today()
+    now = time.time() if now is None else now
+    planned = 0
+    for uid in TEAM_USER_IDS:
+        try:
+            dues = local_due_times(day, user_timezone(uid), REMINDER_TIMES)
+        except Exception as e:
+            logger.error(f"Could not plan reminders for {uid}: {e}")
+            continue
+        for due in dues:
+            if due >= now - MISFIRE_GRACE_SECONDS:
+                reminder_timer.schedule(due, uid)
+                planned += 1
+    logger.info(f"Planned {planned} reminder(s), next at {reminder_timer.next_due()}")
+    return planned
+
+
+def remind_due(due, user_ids):
+    """Reminder timer callback: one reminder for everyone whose deadline is `due`."""
+    run = lambda: check_missing_reports(user_ids=sorted(user_ids), due=due)
+    if durable_jobs:
+        durable_jobs.run_once("reminder", datetime.fromtimestamp(due, timezone.utc), run)
+    else:
+        run()
+
+
+def load_digest_corpus():
+    """Load the term frequency cache, counting all past reports on first use."""
+    corpus = CorpusFrequencies(DIGEST_CORPUS_PATH)
+    if corpus.through is not None or not supabase:
+        return corpus
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    day, documents = None, []
+    for row in iter_reports(supabase, until=yesterday, columns=["id", "date", "raw_text", "yesterday", "today"]):
+        if row["date"] != day:
+            if documents:
+                corpus.add(day, documents)
+            day, documents = row["date"], []
+        documents.append(tokenize(" ".join(filter(None, [row.get("yesterday"), row.get("today")])) or row["raw_text"]))
+    if documents:
+        corpus.add(day, documents)
+    corpus.save()
+    logger.info(f"Digest corpus built from {corpus.docs} past reports")
+    return corpus
+
+
+def post_daily_digest():
+    """Post a summary of today's reports (topics, blockers, per person) in the thread."""
+    global digest_corpus
+    session = thread_registry.for_date(date.today().isoformat(), CHANNEL_ID)
+    if not session:
+        logger.warning("No daily thread found for today. Skipping digest.")
+        return
+    if not supabase:
+        logger.error("Supabase client not initialized")
+        return
+
+    started = time.perf_counter()
+    today = date.today().isoformat()
+    try:
+        rows = supabase_breaker.call(
+            lambda: supabase.table("standup_reports").select("user_id, raw_text, yesterday, today, blockers").eq("date", today).execute()
+        ).data
+        if not rows:
+            logger.info("No reports today, skipping digest")
+            return
+        for row in rows:
+            # Rows saved before sections were parsed at ingest
+            if not any(row.get(section) for section in ("yesterday", "today", "blockers")):
+                row.update(parse_sections(row["raw_text"]))
+
+        if digest_corpus is None:
+            digest_corpus = load_digest_corpus()
+        text = build_digest(rows, digest_corpus, today)
+        digest_corpus.save()
+
+        send_slack(
+            app.client, "chat_postMessage",
+            f"digest:{session.thread_ts}",
+            channel=session.channel,
+            thread_ts=session.thread_ts,
+            text=text
+        )
+        logger.info(f"Posted digest of {len(rows)} reports in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"Error posting daily digest: {e}")
+
+
+def get_job_store():
+    """Job run history lives in Supabase when available, else in a local SQLite file."""
+    if STATE_STORE == "supabase" and supabase:
+        return SupabaseJobStore(supabase)
+    return SqliteJobStore(LOCAL_DB_PATH)
+
+
+def get_outbox_store():
+    if STATE_STORE == "supabase" and supabase:
+        return SupabaseOutboxStore(supabase)
+    return SqliteOutboxStore(LOCAL_DB_PATH)
+
+
+def get_stats_store():
+    if STATE_STORE == "supabase" and supabase:
+        return SupabaseStatsStore(supabase)
+    return SqliteStatsStore(LOCAL_DB_PATH)
+
+
+def get_blocker_store():
+    if STATE_STORE == "supabase" and supabase:
+        return SupabaseBlockerStore(supabase)
+    return SqliteBlockerStore(LOCAL_DB_PATH)
+
+
+def get_lease_store():
+    """The lease must be shared by all replicas: Supabase, or SQLite on a shared volume."""
+    if STATE_STORE == "supabase" and supabase:
+        return SupabaseLeaseStore(supabase)
+    return SqliteLeaseStore(LOCAL_DB_PATH)
+
+
+def save_report(user_id, text, ts, report_date):
+    """Create or extend the user's report for `report_date` with one thread reply.
+
+    Idempotent per message `ts`: a redelivered event, or the same event handled
+    by another replica, does not append the text twice. Returns (result,
+    entries) where result is "inserted", "updated" or "duplicate" and entries
+    are the row's replies as stored after this call.
+    """
+    existing_record = supabase.table("standup_reports").select("raw_text, thread_ts, entries").eq("user_id", user_id).eq("date", report_date).execute()
+
+    if not existing_record.data:
+        data = {
+            "user_id": user_id,
+            "date": report_date,
+            "raw_text": text,
+            "thread_ts": ts,
+            "entries": [{"ts": ts, "text": text}],
+            **parse_sections(text),
+        }
+        try:
+            supabase.table("standup_reports").insert(data).execute()
+            return "inserted", data["entries"]
+        except Exception as e:
+            # (user_id, date) is unique: another replica inserted first, so append instead
+            if getattr(e, "code", None) != UNIQUE_VIOLATION:
+                raise
+            existing_record = supabase.table("standup_reports").select("raw_text, thread_ts, entries").eq("user_id", user_id).eq("date", report_date).execute()
+
+    entries = row_entries(existing_record.data[0])
+    if any(entry["ts"] == ts for entry in entries):
+        return "duplicate", entries
+
+    entries.append({"ts": ts, "text": text})
+    raw_text = report_text(entries)
+    supabase.table("standup_reports").update(
+        {"raw_text": raw_text, "entries": entries, **parse_sections(raw_text)}
+    ).eq("user_id", user_id).eq("date", report_date).execute()
+    return "updated", entries
+
+
+def apply_report_change(user_id, ts, text=None, report_date=None):
+    """Replace the text of the stored entry `ts`, or delete it when `text` is None.
+
+    Only the one report row holding that entry is read and written. Returns
+    (result, report_date, entries) where result is "updated", "deleted",
+    "unchanged" or "missing" (no stored report has that reply) and entries are
+    the row's replies as stored after this call.
+    """
+    query = supabase.table("standup_reports").select("id, date, raw_text, thread_ts, entries").eq("user_id", user_id)
+    if report_date:
+        query = query.eq("date", report_date)
+    else:
+        query = query.contains("entries", json.dumps([{"ts": ts}]))
+    row = next((r for r in query.execute().data if any(e["ts"] == ts for e in row_entries(r))), None)
+    if not row:
+        return "missing", report_date, None
+
+    entries = row_entries(row)
+    if text is None:
+        entries = [e for e in entries if e["ts"] != ts]
+    elif any(e["ts"] == ts and e["text"] == text for e in entries):
+        return "unchanged", row["date"], entries
+    else:
+        entries = [{"ts": ts, "text": text} if e["ts"] == ts else e for e in entries]
+
+    if not entries:
+        supabase.table("standup_reports").delete().eq("id", row["id"]).execute()
+        return "deleted", row["date"], []
+    raw_text = report_text(entries)
+    supabase.table("standup_reports").update(
+        {"raw_text": raw_text, "entries": entries, "thread_ts": entries[0]["ts"], **parse_sections(raw_text)}
+    ).eq("id", row["id"]).execute()
+    return "updated", row["date"], entries
+
+
+def replay_journal_entry(entry):
+    """Save one journaled report; save_report is idempotent, so replays are safe."""
+    if entry.get("op") in ("edit", "delete"):
+        result, report_date, entries = supabase_breaker.call(
+            apply_report_change, entry["user_id"], entry["ts"], entry.get("text"), entry.get("date")
+        )
+        after_report_changed(entry["user_id"], report_date, entry["ts"], entry.get("text"), result, entries)
+        return
+    _, entries = supabase_breaker.call(save_report, entry["user_id"], entry["text"], entry["ts"], entry["date"])
+    after_report_saved(entry["user_id"], entry["date"], entry["ts"], entry["text"], entry.get("thread_ts"), entries=entries)
+
+
+def after_report_saved(user_id, report_date, ts, text, thread_ts=None, journaled=False, entries=None):
+    """Update caches and derived data after a report reply was saved (or journaled).
+
+    Called again for redelivered and replayed replies, so everything here must
+    be idempotent per message `ts`. A `journaled` reply only updates local
+    state: open blockers and stats may live in the database that is down, and
+    the replay catches them up. `entries` are the day's replies as save_report
+    stored them; open blockers are derived from those.
+    """
+    remember_reporters(report_date, [user_id])
+    last_status.record(user_id, report_date, ts, text)
+    if not journaled:
+        update_blockers(user_id, report_date, entries)
+    if standup_stats and not journaled:
+        reply_seconds = float(ts) - float(thread_ts) if thread_ts else None
+        update_stats(standup_stats.record_report, user_id, report_date, reply_seconds)
+    if search_index:
+        try:
+            search_index.index(user_id, report_date, ts, text)
+        except Exception as e:
+            logger.error(f"Error indexing report {ts}: {e}")
+
+
+def update_stats(func, *args):
+    """Run a stats rollup update on the stats worker (inline without one); errors are logged."""
+    def run():
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(f"Error updating stats: {e}")
+    if stats_worker:
+        stats_worker.submit(run)
+    else:
+        run()
+
+
+def update_blockers(user_id, report_date, entries):
+    """Feed the Blockers section of the user's whole stored report for `report_date` to the index.
+
+    `entries` come from the row as written to the database, not from the
+    in-memory cache, which only knows replies this replica has seen.
+    """
+    if not blocker_index or not entries:
+        return
+    try:
+        blocker_index.update(user_id, report_date, parse_sections(report_text(entries))["blockers"])
+    except Exception as e:
+        logger.error(f"Error updating open blockers for {user_id}: {e}")
+
+
+def after_report_changed(user_id, report_date, ts, text, result, entries=None):
+    """Bring caches and derived data in line with an edited (text) or deleted (text=None) reply."""
+    if result in ("missing", "unchanged"):
+        return
+    if text is not None:
+        after_report_saved(user_id, report_date, ts, text, entries=entries)
+        return
+    last_status.remove(user_id, ts)
+    update_blockers(user_id, report_date, entries)
+    if search_index:
+        try:
+            search_index.remove(ts)
+        except Exception as e:
+            logger.error(f"Error removing report {ts} from the search index: {e}")
+
+
+def handle_report_change(event):
+    """Apply a message_changed / message_deleted event to the stored entry with the same ts."""
+    if event["subtype"] == "message_changed":
+        message = event.get("message") or {}
+        text = message.get("text")
+        if text == (event.get("previous_message") or {}).get("text"):
+            return  # e.g. a link unfurl, not an edit
+    else:
+        message = event.get("previous_message") or {}
+        text = None
+    user_id, ts, thread_ts = message.get("user"), message.get("ts"), message.get("thread_ts")
+    if not user_id or not ts or not thread_ts or thread_ts == ts or message.get("bot_id"):
+        return  # only replies by people can be reports
+
+    channel = event.get("channel", CHANNEL_ID)
+    session = lookup_session(channel, thread_ts)
+    if not session and channel != CHANNEL_ID:
+        return
+    if not supabase:
+        logger.error("Supabase client not initialized, cannot update report")
+        return
+
+    report_date = session.date if session else None
+    op = "edit" if text is not None else "delete"
+    try:
+        result, report_date, entries = supabase_breaker.call(apply_report_change, user_id, ts, text, report_date)
+    except Exception as e:
+        logger.error(f"Error applying report {op}: {e}")
+        if journal:
+            try:
+                journal.append({"op": op, "user_id": user_id, "date": report_date, "text": text, "ts": ts})
+            except Exception as e:
+                logger.error(f"Error journaling report {op}: {e}")
+        return
+    if result != "missing":
+        logger.info(f"Report {ts} from {user_id}: {op} {result}")
+    after_report_changed(user_id, report_date, ts, text, result, entries)
+
+
+def build_search_index(batch_size=1000):
+    """Index every saved reply, paging through the report history by keyset."""
+    started = time.perf_counter()
+    docs = []
+    total = 0
+    try:
+        for row in iter_reports(supabase, columns=["id", "user_id", "date", "raw_text", "thread_ts", "entries"]):
+            for entry in row_entries(row):
+                docs.append((row["user_id"], row["date"], entry["ts"], entry["text"]))
+            if len(docs) >= batch_size:
+                total += search_index.index_many(docs)
+                docs = []
+        if docs:
+            total += search_index.index_many(docs)
+    except Exception as e:
+        logger.error(f"Error building search index after {total} replies: {e}")
+        return total
+    logger.info(f"Search index built: {total} replies in {time.perf_counter() - started:.1f}s")
+    return total
+
+
+def dedupe_events(body, next):
+    """Bolt middleware: drop events Slack already delivered on another Socket Mode connection."""
+    event_id = body.get("event_id")
+    if event_id and event_dedup.is_duplicate(event_id):
+        metrics.incr("socket_mode.duplicate_events")
+        logger.info(f"Dropping duplicate event {event_id}")
+        from slack_bolt import BoltResponse
+        return BoltResponse(status=200, body="")
+    next()
+
+
+STATS_PERIODS = ("week", "month", "quarter", "year")
+
+
+def stats_period(period, today=None):
+    """Return (since, until) ISO dates for the current week, month, quarter or year."""
+    today = today or date.today()
+    if period == "week":
+        since = date.fromisoformat(week_start(today.isoformat()))
+    elif period == "month":
+        since = today.replace(day=1)
+    elif period == "year":
+        since = today.replace(month=1, day=1)
+    else:
+        since = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+    return since.isoformat(), today.isoformat()
+
+
+def format_stats(summary, period, since, until, team=None):
+    lines = [f"📊 *Standup stats* for this {period}{f' ({team})' if team else ''}: {since} – {until}"]
+    if summary["participation"] is None:
+        lines.append("No standups recorded yet.")
+        return "\n".join(lines)
+    lines.append(
+        f"Participation: {summary['participation']:.0%} "
+        f"({summary['expected'] - summary['missed']}/{summary['expected']} expected reports)"
+    )
+    if summary["median_reply_seconds"] is not None:
+        lines.append(f"Median reply time: {round(summary['median_reply_seconds'] / 60)} min after the thread")
+    if summary["most_missed"]:
+        lines.append("Most missed: " + ", ".join(f"<@{uid}> {count}" for uid, count in summary["most_missed"]))
+    if summary["streaks"]:
+        lines.append("Streaks: " + ", ".join(
+            f"<@{uid}> {streak} (best {longest})" for uid, streak, longest in summary["streaks"]
+        ))
+    return "\n".join(lines)
+
+
+def handle_stats_command(ack, command, respond):
+    """/standup-stats [week|month|quarter|year] [team], answered from the rollup tables only."""
+    ack()
+    args = (command.get("text") or "").split()
+    period = next((a for a in args if a in STATS_PERIODS), "quarter")
+    team = next((a for a in args if a not in STATS_PERIODS), None)
+    if not standup_stats:
+        respond("Stats are not enabled.")
+        return
+    if team and team not in TEAMS:
+        respond(f"Unknown team {team}. Teams: {', '.join(TEAMS)}")
+        return
+    since, until = stats_period(period)
+    try:
+        summary = standup_stats.summary(since, until, user_ids=set(TEAMS[team]) if team else None)
+    except Exception as e:
+        logger.error(f"Error reading stats: {e}")
+        respond("Could not load stats, try again later.")
+        return
+    respond(format_stats(summary, period, since, until, team))
+
+
+def handle_search_command(ack, command, respond):
+    """/standup-search <words> [page:N], ranked by relevance."""
+    ack()
+    text = command.get("text") or ""
+    page = 1
+    match = re.search(r"\bpage:(\d+)\s*$", text)
+    if match:
+        page = max(1, int(match.group(1)))
+        text = text[:match.start()]
+    if not search_index:
+        respond("Search is not enabled.")
+        return
+    if not text.strip():
+        respond("Usage: /standup-search <words> [page:N]")
+        return
+    try:
+        results, has_more = search_index.search(text, limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE)
+    except Exception as e:
+        logger.error(f"Error searching reports: {e}")
+        respond("Search failed, try again later.")
+        return
+    if not results:
+        respond(f"No reports match “{text.strip()}”." if page == 1 else "No more results.")
+        return
+    lines = [f"🔎 Reports matching “{text.strip()}” (page {page}):"]
+    for result in results:
+        lines.append(f"• {result['date']} <@{result['user_id']}>: {result['snippet']}")
+    if has_more:
+        lines.append(f"More: /standup-search {text.strip()} page:{page + 1}")
+    respond("\n".join(lines))
+
+
+def quote(text):
+    return "\n".join(f"> {line}" for line in text.splitlines())
+
+
+def handle_laststatus_command(ack, command, respond):
+    """/laststatus [@user ...] [team]: previous reports from the in-memory cache, ready to quote."""
+    ack()
+    text = command.get("text") or ""
+    user_ids = re.findall(r"<@(\w+)(?:\|[^>]*)?>", text)
+    for word in re.sub(r"<[^>]*>", " ", text).split():
+        if word not in TEAMS:
+            respond(f"Unknown team {word}. Teams: {', '.join(TEAMS)}")
+            return
+        user_ids.extend(TEAMS[word])
+    if not user_ids:
+        user_ids = [command["user_id"]]
+
+    today = date.today().isoformat()
+    blocks = []
+    for user_id in dict.fromkeys(user_ids):
+        report = last_status.last(user_id, before=today) or last_status.last(user_id)
+        if report:
+            day, entries = report
+            blocks.append(f"*<@{user_id}>* — {day}\n{quote(report_text(entries))}")
+    if not blocks:
+        respond("No previous reports found.")
+        return
+    respond("\n\n".join(blocks))
+
+
+def handle_blockers_command(ack, command, respond):
+    """/blockers [team]: blockers still open, oldest first."""
+    ack()
+    team = (command.get("text") or "").strip() or None
+    if team and team not in TEAMS:
+        respond(f"Unknown team {team}. Teams: {', '.join(TEAMS)}")
+        return
+    if not blocker_index:
+        respond("Blocker tracking is turned off.")
+        return
+    try:
+        rows = blocker_index.open_blockers(user_ids=set(TEAMS[team]) if team else None)
+    except Exception as e:
+        logger.error(f"Error reading open blockers: {e}")
+        respond("Couldn't read open blockers right now, please try again later.")
+        return
+    if not rows:
+        respond(f"No open blockers{f' in {team}' if team else ''}. 🎉")
+        return
+    lines = [f"*Open blockers{f' — {team}' if team else ''}:*"]
+    lines.extend(f"• <@{row['user_id']}>: {row['text']} (since {row['since']}, last seen {row['last_seen']})" for row in rows)
+    respond("\n".join(lines))
+
+
+def handle_memory_command(ack, command, respond):
+    """/standup-memory [snapshot|diff|stop]: top allocation sites, or growth since the last snapshot."""
+    ack()
+    if not ADMIN_USER_IDS:
+        respond("Memory profiling is off: set ADMIN_USER_IDS to allow it.")
+        return
+    if command["user_id"] not in ADMIN_USER_IDS:
+        respond("Only bot admins can profile memory.")
+        return
+    action = (command.get("text") or "").strip() or "snapshot"
+    rss = rss_bytes()
+    header = f"RSS: {rss / 1024 / 1024:.1f} MiB" if rss else "RSS: unknown"
+    if action == "snapshot":
+        lines = memory_profiler.snapshot()
+    elif action == "diff":
+        lines = memory_profiler.diff()
+        if lines is None:
+            respond("No snapshot yet. Run `/standup-memory snapshot` first.")
+            return
+    elif action == "stop":
+        memory_profiler.stop()
+        respond(f"{header}\nTracing stopped.")
+        return
+    else:
+        respond("Usage: /standup-memory [snapshot|diff|stop]")
+        return
+    respond(header + "\n```\n" + "\n".join(lines) + "\n```")
+
+
 def register_events(app_instance):
-    @app_instance.event("message")
-    def handle_message_events(body, logger):
-        global daily_thread_ts
+    app_instance.middleware(dedupe_events)
+    app_instance.command("/standup-stats")(handle_stats_command)
+    app_instance.command("/standup-search")(handle_search_command)
+    app_instance.command("/laststatus")(handle_laststatus_command)
+    app_instance.command("/blockers")(handle_blockers_command)
+    app_instance.command("/standup-memory")(handle_memory_command)
+
+    def handle_message(body, logger):
         event = body["event"]
+
+        # Right after a cold start, wait for the thread registry to be restored
+        if not state_ready.wait(STATE_READY_TIMEOUT):
+            logger.warning("State not restored yet, handling event without it")
+        if "first_event" not in startup_timings:
+            startup_timings["first_event"] = round((time.perf_counter() - _process_started) * 1000, 1)
+            logger.info(f"First event handled {startup_timings['first_event']}ms after process start")
         
-        # Check if it's a reply in the daily thread
-        if daily_thread_ts and event.get("thread_ts") == daily_thread_ts:
+        # Edits and deletions change the stored entry, they are not new reports
+        if event.get("subtype") in ("message_changed", "message_deleted"):
+            handle_report_change(event)
+            return
+
+        # Check if it's a reply in an open standup thread (today's or a recent one)
+        session = lookup_session(event.get("channel", CHANNEL_ID), event.get("thread_ts"))
+        if session:
             user_id = event["user"]
             text = event["text"]
             ts = event["ts"]
-            today = date.today().isoformat()
+            # Late replies count towards the day the thread was posted for
+            report_date = session.date
             
             # Skip bot messages
             if event.get("bot_id"):
@@ -327,75 +1285,462 @@ def register_events(app_instance):
                 return
 
             try:
-                # 1. Check if this user already reported today
-                existing_record = supabase.table("standup_reports").select("raw_text").eq("user_id", user_id).eq("date", today).execute()
-                
-                if existing_record.data:
-                    # Report exists — append new text to existing
-                    old_text = existing_record.data[0]["raw_text"]
-                    final_text = f"{old_text}\n\n[Addition:]:\n{text}"
-                    
-                    # Update existing record
-                    supabase.table("standup_reports").update({"raw_text": final_text}).eq("user_id", user_id).eq("date", today).execute()
-                    logger.info(f"Updated existing report for {user_id}")
-                else:
-                    # No report yet — create new record
-                    data = {
-                        "user_id": user_id,
-                        "date": today,
-                        "raw_text": text,
-                        "thread_ts": ts
-                    }
-                    supabase.table("standup_reports").insert(data).execute()
-                    logger.info(f"Inserted new report for {user_id}")
-                
-                # Add checkmark reaction to the message
-                app_instance.client.reactions_add(
-                    channel=CHANNEL_ID,
+                result, entries = supabase_breaker.call(save_report, user_id, text, ts, report_date)
+            except Exception as e:
+                logger.error(f"Error saving report: {e}")
+                if not journal:
+                    return
+                # Keep the report on local disk; the replayer saves it once the DB is back
+                try:
+                    journal.append({"user_id": user_id, "date": report_date, "text": text, "ts": ts, "thread_ts": session.thread_ts})
+                except Exception as e:
+                    logger.error(f"Error journaling report: {e}")
+                    return
+                result, entries = "journaled", None
+
+            after_report_saved(user_id, report_date, ts, text, session.thread_ts, journaled=result == "journaled", entries=entries)
+            if result == "duplicate":
+                logger.info(f"Report {ts} from {user_id} already saved")
+                return
+            if result == "updated":
+                logger.info(f"Updated existing report for {user_id}")
+            elif result == "journaled":
+                logger.info(f"Journaled report from {user_id} for later replay")
+            else:
+                logger.info(f"Inserted new report for {user_id}")
+
+            # Add checkmark reaction to the message
+            try:
+                send_slack(
+                    app_instance.client, "reactions_add",
+                    f"reaction:{session.channel}:{ts}:blue_heart",
+                    channel=session.channel,
                     name="blue_heart",
                     timestamp=ts
                 )
-                
             except Exception as e:
-                logger.error(f"Error saving report: {e}")
+                logger.error(f"Error adding reaction: {e}")
+
+            # Flag a status pasted unchanged from an earlier day
+            if NEAR_DUPLICATE_REACTION:
+                try:
+                    repeat = near_duplicates.add(user_id, report_date, ts, text)
+                    if repeat:
+                        logger.info(f"Report {ts} from {user_id} repeats their report from {repeat[1]} ({repeat[2]:.0%} similar)")
+                        send_slack(
+                            app_instance.client, "reactions_add",
+                            f"reaction:{session.channel}:{ts}:{NEAR_DUPLICATE_REACTION}",
+                            channel=session.channel,
+                            name=NEAR_DUPLICATE_REACTION,
+                            timestamp=ts
+                        )
+                except Exception as e:
+                    logger.error(f"Error checking for a repeated report: {e}")
+
+    @app_instance.event("message")
+    def handle_message_events(body, logger):
+        # Counted, so a shutdown waits for replies that are still being saved
+        with in_flight.track(), metrics.timed("handler.message"):
+            handle_message(body, logger)
+
+
+def warm_reporters():
+    """Load today's reporters so reminders work even if Supabase goes down later."""
+    if not supabase:
+        return
+    today = date.today().isoformat()
+    try:
+        response = supabase_breaker.call(
+            lambda: supabase.table("standup_reports").select("user_id").eq("date", today).execute()
+        )
+        remember_reporters(today, {row["user_id"] for row in response.data})
+    except Exception as e:
+        logger.warning(f"Could not warm reporters cache: {e}")
+
+
+def warm_near_duplicates():
+    """Index recent reports so repeats are caught right after a restart."""
+    if not supabase or not NEAR_DUPLICATE_REACTION:
+        return
+    since = (date.today() - timedelta(days=NEAR_DUPLICATE_DAYS)).isoformat()
+
+    def load():
+        # One page in memory at a time, however many reports the window holds
+        for row in iter_reports(supabase, since=since, columns=["id", "user_id", "date", "raw_text", "thread_ts", "entries"]):
+            for entry in row_entries(row):
+                near_duplicates.add(row["user_id"], row["date"], entry["ts"], entry["text"])
+
+    try:
+        supabase_breaker.call(load)
+    except Exception as e:
+        logger.warning(f"Could not warm near-duplicate index: {e}")
+
+
+def warm_last_status():
+    """Load every user's latest reports from the recent_standup_reports view (see setup.sql), page by page."""
+    if not supabase:
+        return
+
+    def load():
+        columns = ["id", "user_id", "date", "raw_text", "thread_ts", "entries"]
+        for row in iter_reports(supabase, columns=columns, table="recent_standup_reports"):
+            last_status.load(row["user_id"], row["date"], row_entries(row))
+
+    try:
+        supabase_breaker.call(load)
+    except Exception as e:
+        logger.warning(f"Could not warm last status cache: {e}")
+
+
+def take_over_scheduling():
+    """Run missed jobs and plan today's reminders after this replica wins the lease.
+
+    The previous leader posted today's thread and held its reminder timer, so
+    the registry is re-read first; a follower only learns about new threads
+    when someone replies in them.
+    """
+    durable_jobs.catch_up()
+    restore_thread_registry(merge=True)
+    if reminder_timer and current_thread_ts():
+        plan_reminders()
+
+
+def restore_state():
+    """Restore open threads and warm caches concurrently, then start scheduled work.
+
+    Handlers only need the thread registry, so they are released as soon as
+    it is loaded; the slower cache warm-ups finish in the background.
+    """
+    started = time.perf_counter()
+
+    def restore_threads():
+        try:
+            timed("restore.threads", restore_thread_registry)
+        finally:
+            state_ready.set()
+            startup_timings["state_ready"] = round((time.perf_counter() - _process_started) * 1000, 1)
+
+    with ThreadPoolExecutor(max_workers=5, thread_name_prefix="restore") as pool:
+        pool.submit(restore_threads)
+        pool.submit(timed, "warm.vacations", get_vacation_users)
+        pool.submit(timed, "warm.reporters", warm_reporters)
+        pool.submit(timed, "warm.near_duplicates", warm_near_duplicates)
+        pool.submit(timed, "warm.last_status", warm_last_status)
+    caches_warm.set()
+    startup_timings["restore"] = round((time.perf_counter() - started) * 1000, 1)
+    startup_timings["ready"] = round((time.perf_counter() - _process_started) * 1000, 1)
+    logger.info(f"Startup timings (ms): {startup_timings}")
+
+    # Run jobs missed while the worker was down (after state is restored).
+    # A replica that wins the lease catches up (and plans reminders) when it is elected.
+    if leader:
+        leader.start()
+    else:
+        durable_jobs.catch_up()
+
+    # Reminders for a thread that was already open before the restart
+    if reminder_timer and current_thread_ts():
+        plan_reminders()
+
+
+def socket_mode_connected():
+    if isinstance(socket_mode, SocketModePool):
+        handlers = socket_mode.handlers
+    else:
+        handlers = [socket_mode] if socket_mode else []
+    try:
+        return any(handler.client.is_connected() for handler in handlers)
+    except Exception as e:
+        logger.warning(f"Could not check the Socket Mode connection: {e}")
+        return False
+
+
+def readiness():
+    """Readiness checks for /readyz: all must be true to take traffic."""
+    return {
+        "socket_mode": socket_mode_connected(),
+        "database": bool(supabase) and supabase_breaker.state != OPEN,
+        "caches": caches_warm.is_set(),
+        "running": not (shutdown_coordinator and shutdown_coordinator.stopping),
+    }
+
+
+def health_status():
+    """Everything /status reports."""
+    return {
+        "ready": readiness(),
+        "uptime_seconds": round(time.perf_counter() - _process_started, 1),
+        "startup_timings": startup_timings,
+        "jobs": dict(durable_jobs.last_runs) if durable_jobs else {},
+        "latencies": metrics.latencies(),
+        "breakers": breaker_states(),
+        "in_flight": len(in_flight),
+        "reminders_pending": reminder_timer.pending() if reminder_timer else 0,
+        "memory": {
+            "rss_bytes": rss_bytes(),
+            "tracing": memory_profiler.tracing,
+            "last_status_users": len(last_status),
+            "near_duplicate_reports": near_duplicates.size(),
+            "timezones": len(user_timezones),
+            "reminder_channels": dm_reminder.cached_channels(),
+        },
+        "metrics": metrics.snapshot(),
+    }
+
+
+def job_triggers():
+    """Cron triggers of the scheduled jobs for the current schedule, by job ID."""
+    def weekdays_at(hour_minute):
+        hour, minute = hour_minute
+        return CronTrigger(day_of_week='mon-fri', hour=hour, minute=minute, timezone=STANDUP_TIMEZONE)
+
+    triggers = {"post_daily_thread": weekdays_at(DAILY_THREAD_TIME)}
+    if not LOCAL_REMINDERS:
+        names = ["first_reminder", "second_reminder"] + [f"reminder_{i}" for i in range(3, len(REMINDER_TIMES) + 1)]
+        for name, hour_minute in zip(names, REMINDER_TIMES):
+            triggers[name] = weekdays_at(hour_minute)
+    if DIGEST_ENABLED:
+        triggers["daily_digest"] = weekdays_at(DIGEST_TIME)
+    return triggers
+
+
+def reschedule_jobs():
+    """Move the running scheduler's jobs to the current schedule, without restarting it."""
+    if not scheduler or not durable_jobs:
+        return
+    triggers = job_triggers()
+    for job_id, trigger in triggers.items():
+        if job_id in durable_jobs.jobs:
+            durable_jobs.reschedule(scheduler, job_id, trigger)
+        else:
+            durable_jobs.add(scheduler, job_id, check_missing_reports, trigger)
+    for job_id in [job_id for job_id in durable_jobs.jobs if job_id not in triggers]:
+        durable_jobs.remove(scheduler, job_id)
+
+
+def replan_reminders():
+    """Re-plan today's local reminders after the times, timezone or team changed."""
+    if not reminder_timer:
+        return
+    reminder_timer.clear()
+    if current_thread_ts():
+        plan_reminders()
+
+
+def apply_config(config):
+    """Swap in a validated config: rebind settings and indexes, then move the schedule.
+
+    Each setting is rebound in one assignment, so a handler running
+    meanwhile sees either the old or the new value, never a half-built one.
+    """
+    global TEAMS, ROSTER, TEAM_MAPPING, EXCLUDED_USER_IDS, TEAM_USER_IDS, NAME_TO_UID
+    global GREETINGS, MEMES, STANDUP_TIMEZONE, DAILY_THREAD_TIME, REMINDER_TIMES, DIGEST_TIME
+    with config_lock:
+        schedule_changed = (config.timezone, config.daily_thread, config.reminders, config.digest) != (
+            STANDUP_TIMEZONE, DAILY_THREAD_TIME, tuple(REMINDER_TIMES), DIGEST_TIME)
+        reminders_changed = (config.timezone, config.reminders, config.team_user_ids) != (
+            STANDUP_TIMEZONE, tuple(REMINDER_TIMES), TEAM_USER_IDS)
+
+        TEAMS = config.teams
+        ROSTER = config.roster
+        TEAM_MAPPING = config.team_mapping
+        EXCLUDED_USER_IDS = config.excluded
+        TEAM_USER_IDS = config.team_user_ids
+        NAME_TO_UID = config.name_to_uid
+        GREETINGS = config.greetings
+        MEMES = config.memes
+        STANDUP_TIMEZONE = config.timezone
+        DAILY_THREAD_TIME = config.daily_thread
+        REMINDER_TIMES = config.reminders
+        DIGEST_TIME = config.digest
+        user_timezones.default = config.timezone
+
+        if schedule_changed:
+            reschedule_jobs()
+        if reminders_changed:
+            replan_reminders()
+    logger.info(f"Config applied: {len(ROSTER)} people in {len(TEAMS)} teams, schedule in {STANDUP_TIMEZONE}")
+
+
+def get_config_source(client=None):
+    client = client or supabase
+    if CONFIG_SOURCE == "supabase" and client:
+        return SupabaseConfigSource(client)
+    if CONFIG_SOURCE == "file":
+        return FileConfigSource(CONFIG_PATH)
+    return None
+
+
+def current_teams(client=None):
+    """TEAMS as the running bot has them: from the external config if there is one, else built in.
+
+    For the command-line tools, which don't run the config watcher. Raises
+    ConfigError if the config is invalid.
+    """
+    source = get_config_source(client)
+    if not source:
+        return TEAMS
+    raw = source.read()
+    return parse_config(json.loads(raw) if raw else {}, DEFAULT_CONFIG).teams
+
+
+def build_shutdown(socket_mode, scheduler, replayer=None):
+    """Shutdown steps, in order: stop taking events, let running work finish, flush, hand over."""
+    coordinator = ShutdownCoordinator(timeout=SHUTDOWN_TIMEOUT)
+
+    # 1. No new events: Slack redelivers unacknowledged ones to the next process
+    coordinator.add("socket_mode", lambda left: socket_mode.close())
+    if config_watcher:
+        coordinator.add("config", lambda left: config_watcher.stop())
+
+    # 2. Replies being saved, reminders being sent and scheduled jobs finish;
+    #    each gets at most a quarter of the budget so the flushes still run
+    drain = SHUTDOWN_TIMEOUT / 4
+
+    def drain_handlers(left):
+        if not in_flight.wait(left):
+            logger.warning(f"{len(in_flight)} message handler(s) still running at shutdown")
+    coordinator.add("handlers", drain_handlers, timeout=drain)
+    if reminder_timer:
+        coordinator.add("reminders", lambda left: reminder_timer.stop(timeout=left), timeout=drain)
+    coordinator.add("scheduler", lambda left: scheduler.shutdown(wait=True), timeout=drain)
+    if stats_worker:
+        coordinator.add("stats", lambda left: stats_worker.shutdown(wait=True), timeout=drain)
+
+    # 3. Flush queues and local files
+    if outbox:
+        def flush_outbox(left):
+            outbox.stop(timeout=left)
+            if not outbox.gate or outbox.gate():
+                outbox.drain_once()
+        coordinator.add("outbox", flush_outbox)
+    if journal:
+        def flush_journal(left):
+            if replayer:
+                replayer.stop(timeout=left)
+            journal.close()
+        coordinator.add("journal", flush_journal)
+    if search_index:
+        coordinator.add("search_index", lambda left: search_index.close())
+
+    # 4. Let another replica take over scheduled work right away
+    if leader:
+        coordinator.add("leader", lambda left: leader.stop())
+    if health_server:
+        coordinator.add("health", lambda left: health_server.close())
+    return coordinator
+
 
 def main():
-    global app, supabase, daily_thread_ts
+    global app, supabase, durable_jobs, leader, outbox, journal, standup_stats, search_index, blocker_index, reminder_timer, shutdown_coordinator
+    global socket_mode, health_server, scheduler, config_watcher, stats_worker
     
     if not SLACK_BOT_TOKEN or not SLACK_APP_TOKEN:
         logger.error("SLACK_BOT_TOKEN or SLACK_APP_TOKEN not set")
         return
-        
-    app = App(token=SLACK_BOT_TOKEN)
-    supabase = get_supabase_client()
+
+    state_ready.clear()
+    caches_warm.clear()
+
+    # Import dependencies and build clients concurrently
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup") as pool:
+        supabase_future = pool.submit(timed, "supabase_client", get_supabase_client)
+        scheduler_future = pool.submit(timed, "import.apscheduler", load_scheduler)
+        timed("import.slack_bolt", load_slack)
+        app = timed("slack_app", App, token=SLACK_BOT_TOKEN)
+        supabase = supabase_future.result()
+        scheduler_future.result()
+
+    # Health checks answer from here on; /readyz says ready once Socket Mode is up and state is restored
+    if HEALTH_PORT:
+        try:
+            health_server = HealthServer(int(HEALTH_PORT), readiness, health_status)
+            health_server.start()
+        except Exception as e:
+            logger.error(f"Could not start the health endpoint on port {HEALTH_PORT}: {e}")
+
+    # Participation rollups, kept up to date as reports arrive and reminders run
+    if STATS_ENABLED:
+        standup_stats = StandupStats(get_stats_store())
+        stats_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats")
+
+    # Open blockers per user, carried over into the morning post
+    if BLOCKERS_ENABLED:
+        blocker_index = BlockerIndex(get_blocker_store())
+
+    # Local full-text index behind /standup-search; built from history on first start
+    if SEARCH_INDEX_PATH:
+        search_index = SearchIndex(SEARCH_INDEX_PATH)
+        if supabase and not search_index.count():
+            threading.Thread(target=build_search_index, name="search-index", daemon=True).start()
+
+    # Reports that can't reach the database are journaled locally and replayed later
+    replayer = None
+    if JOURNAL_DIR and supabase:
+        journal = ReportJournal(JOURNAL_DIR, max_segment_bytes=JOURNAL_SEGMENT_BYTES)
+        replayer = JournalReplayer(journal, replay_journal_entry, interval=JOURNAL_REPLAY_SECONDS)
+        replayer.start()
     
     register_events(app)
 
-    # Schedule jobs
-    scheduler = BackgroundScheduler()
-    # Using 'cron' triggers
-    # 1. Daily standup thread at 09:04 CET (08:04 UTC), weekdays only
-    scheduler.add_job(post_daily_thread, 'cron', day_of_week='mon-fri', hour=8, minute=4)
+    # Teams, schedule and phrases from the external config; later changes are
+    # picked up by polling and applied in place (jobs rescheduled, not restarted)
+    source = get_config_source()
+    if source:
+        config_watcher = ConfigWatcher(source, DEFAULT_CONFIG, apply_config, interval=CONFIG_POLL_SECONDS)
+        config_watcher.check()
+
+    # Schedule jobs. Every run is claimed in the job store, so a job missed
+    # during a restart is caught up exactly once (within the grace period).
+    # With several replicas, only the lease holder runs scheduled jobs;
+    # every replica still handles Socket Mode events.
+    if LEADER_ELECTION:
+        leader = LeaderElector(
+            get_lease_store(),
+            ttl=LEASE_TTL_SECONDS,
+            heartbeat=LEASE_TTL_SECONDS / 3,
+            on_elected=lambda: threading.Thread(target=take_over_scheduling, name="leader-takeover", daemon=True).start(),
+        )
+    durable_jobs = DurableJobs(
+        get_job_store(),
+        misfire_grace_time=MISFIRE_GRACE_SECONDS,
+        gate=leader.check_fencing if leader else None,
+    )
 
-    # 2. First reminder at 11:30 CET (10:30 UTC), weekdays only
-    scheduler.add_job(check_missing_reports, 'cron', day_of_week='mon-fri', hour=10, minute=30)
+    # Slack side effects are queued durably and delivered by a background worker
+    if OUTBOX_ENABLED:
+        outbox = Outbox(get_outbox_store(), app.client, gate=leader.is_leader if leader else None)
+        outbox.on_delivered("daily_thread", lambda payload, response: on_daily_thread_posted(response["ts"]))
+        outbox.start()
+    scheduler = BackgroundScheduler(job_defaults={"coalesce": True, "misfire_grace_time": MISFIRE_GRACE_SECONDS})
+    # Using 'cron' triggers in STANDUP_TIMEZONE, so the times hold across DST;
+    # a config change moves them in place (see job_triggers and reschedule_jobs)
+    triggers = job_triggers()
+    digest_trigger = triggers.pop("daily_digest", None)
+    # 1. Daily standup thread at DAILY_THREAD_TIME (09:04), weekdays only
+    durable_jobs.add(scheduler, "post_daily_thread", post_daily_thread, triggers.pop("post_daily_thread"))
 
-    # 3. Second reminder at 17:00 CET (16:00 UTC), weekdays only
-    scheduler.add_job(check_missing_reports, 'cron', day_of_week='mon-fri', hour=16, minute=0)
+    # 2. Reminders at REMINDER_TIMES: in each person's own timezone, planned
+    #    when the thread is posted and fired by one timer thread; or at fixed
+    #    times for everyone
+    if LOCAL_REMINDERS:
+        reminder_timer = DeadlineTimer(remind_due)
+        reminder_timer.start()
+    for name, trigger in triggers.items():
+        durable_jobs.add(scheduler, name, check_missing_reports, trigger)
+
+    # 3. End-of-day digest at DIGEST_TIME (17:30), weekdays only
+    if digest_trigger:
+        durable_jobs.add(scheduler, "daily_digest", post_daily_digest, digest_trigger)
     
     scheduler.start()
+    if config_watcher:
+        config_watcher.start()
     
     logger.info("Bot started! 🤖")
 
-    # Restore daily_thread_ts from Supabase if available
-    if supabase:
-        try:
-            result = supabase.table("bot_state").select("value").eq("key", "daily_thread_ts").execute()
-            if result.data:
-                daily_thread_ts = result.data[0]["value"]
-                logger.info(f"Restored daily_thread_ts: {daily_thread_ts}")
-        except Exception as e:
-            logger.warning(f"Could not restore bot state: {e}")
+    # Restore open standup threads and warm caches while Socket Mode connects
+    threading.Thread(target=restore_state, name="restore-state", daemon=True).start()
 
     # -------- TEST LINES --------
     # post_daily_thread()
@@ -403,9 +1748,22 @@ def main():
     # check_missing_reports()
     # -----------------------------------
 
-    # Start Slack Socket Mode
-    handler = SocketModeHandler(app, SLACK_APP_TOKEN)
-    handler.start()
+    # Start Slack Socket Mode. Several connections keep events flowing while
+    # one of them reconnects; duplicates are dropped by dedupe_events.
+    startup_timings["socket_mode_start"] = round((time.perf_counter() - _process_started) * 1000, 1)
+    if SOCKET_MODE_CONNECTIONS > 1:
+        socket_mode = SocketModePool(
+            lambda: SocketModeHandler(app, SLACK_APP_TOKEN),
+            size=SOCKET_MODE_CONNECTIONS,
+            refresh_interval=SOCKET_REFRESH_SECONDS,
+        )
+    else:
+        socket_mode = SocketModeHandler(app, SLACK_APP_TOKEN)
+
+    # On SIGTERM (a redeploy), drain before exiting so no reply is lost
+    shutdown_coordinator = build_shutdown(socket_mode, scheduler, replayer)
+    shutdown_coordinator.install()
+    socket_mode.start()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import threading
+import tracemalloc
+
+import metrics
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _format_size(size):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class MemoryProfiler:
+    """On-demand tracemalloc snapshots and diffs.
+
+    Tracing is off until the first snapshot (it slows allocations down),
+    and stays on until `stop()`. Each snapshot becomes the baseline the
+    next diff compares against.
+    """
+
+    def __init__(self, frames=5):
+        self.frames = frames
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def _take(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        metrics.incr("memory.snapshots")
+        return snapshot
+
+    def snapshot(self, limit=10):
+        """Top `limit` allocation sites by size, as text lines; starts tracing if needed."""
+        with self._lock:
+            started = not tracemalloc.is_tracing()
+            snapshot = self._take()
+            self._baseline = snapshot
+        stats = snapshot.statistics("lineno")
+        total = sum(stat.size for stat in stats)
+        lines = [f"Traced: {_format_size(total)} in {sum(stat.count for stat in stats)} blocks"]
+        if started:
+            lines[0] += " (tracing just started: only allocations from now on are traced)"
+        lines.extend(f"{_format_size(stat.size)} in {stat.count} blocks: {stat.traceback[0]}" for stat in stats[:limit])
+        return lines
+
+    def diff(self, limit=10):
+        """Top `limit` growth sites since the last snapshot or diff, as text lines."""
+        with self._lock:
+            if self._baseline is None:
+                return None
+            snapshot = self._take()
+            stats = snapshot.compare_to(self._baseline, "lineno")
+            self._baseline = snapshot
+        growth = sum(stat.size_diff for stat in stats)
+        lines = [f"Change since last snapshot: {_format_size(growth)}"]
+        lines.extend(
+            f"{_format_size(stat.size_diff)} ({stat.count_diff:+d} blocks): {stat.traceback[0]}"
+            for stat in stats[:limit] if stat.size_diff
+        )
+        return lines
+
+    def stop(self):
+        with self._lock:
+            self._baseline = None
+            tracemalloc.stop()
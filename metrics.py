@@ -0,0 +1,81 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from sketch import RollingQuantiles
+
+# Simple in-process metrics shared by the bot's jobs and handlers
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_latencies = {}  # name -> RollingQuantiles of seconds
+
+
+def incr(name, value=1):
+    """Increase a counter by `value`."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """Set a gauge to the latest observed value."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, seconds):
+    """Record one latency sample (in seconds)."""
+    with _lock:
+        quantiles = _latencies.get(name)
+        if quantiles is None:
+            quantiles = _latencies[name] = RollingQuantiles()
+    quantiles.add(seconds)
+
+
+@contextmanager
+def timed(name):
+    """Observe how long the block takes, whether or not it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+def timed_methods(name):
+    """Class decorator: observe every public method call as latency `name`."""
+    def wrap(func):
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return call
+
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if callable(value) and not attr.startswith("_"):
+                setattr(cls, attr, wrap(value))
+        return cls
+    return decorate
+
+
+def latencies():
+    """Rolling p50/p99 (seconds) and sample count per latency."""
+    with _lock:
+        items = list(_latencies.items())
+    return {name: quantiles.quantiles() for name, quantiles in items}
+
+
+def snapshot():
+    """Return a copy of all counters and gauges."""
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
+
+
+def reset():
+    """Clear all metrics (used by tests)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _latencies.clear()
@@ -0,0 +1,14 @@
+from collections import namedtuple
+
+# Compact, immutable records for data kept in memory for a long time.
+# namedtuples have no per-instance __dict__, so each costs about as much
+# as a plain tuple.
+
+# One thread reply of a report
+ReportEntry = namedtuple("ReportEntry", ["ts", "text"])
+
+# One team member: Slack user ID, name as in Vacation Tracker, team
+RosterEntry = namedtuple("RosterEntry", ["user_id", "name", "team"])
+
+# One approved leave from Vacation Tracker (dates as YYYY-MM-DD, may be None)
+Leave = namedtuple("Leave", ["user_id", "name", "start", "end"])
@@ -0,0 +1,155 @@
+import random
+import re
+import threading
+import zlib
+from collections import defaultdict, deque
+from datetime import date
+
+import metrics
+
+# Mersenne prime for the universal hash family (a * x + b) mod p
+PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+QUOTED_LINE = re.compile(r"^\s*(?:>|&gt;).*$", re.MULTILINE)
+SLACK_MARKUP = re.compile(r"<[^>]*>|[*_~`]")
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def report_words(text):
+    """Lowercased words of a report, ignoring quoted lines and Slack markup.
+
+    Quoted lines are the previous status people are asked to quote, so
+    only the new text counts.
+    """
+    return WORD.findall(SLACK_MARKUP.sub(" ", QUOTED_LINE.sub("", text or "")).lower())
+
+
+def shingles(words, size=3):
+    """Word `size`-grams."""
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures from a fixed, seeded family of hash functions."""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, PRIME), rng.randrange(0, PRIME)) for _ in range(num_perm)]
+
+    def signature(self, tokens):
+        hashes = [zlib.crc32(token.encode("utf-8")) for token in tokens]
+        if not hashes:
+            return None
+        return tuple(min((a * h + b) % PRIME for h in hashes) & MAX_HASH for a, b in self.params)
+
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """LSH index of each user's recent reports for near-duplicate lookups.
+
+    Signatures are cut into `bands` bands; a report is a candidate if any
+    band hashes to the same bucket as one of the user's earlier reports.
+    Lookups touch only those buckets, so the cost does not grow with
+    history. Candidates are confirmed by estimated Jaccard similarity.
+    Reports older than `retention_days` are pruned per user as they post;
+    past `max_docs` the oldest indexed reports are evicted, so users who
+    stopped posting don't hold memory forever.
+    """
+
+    def __init__(self, num_perm=64, bands=8, threshold=0.8, retention_days=14, min_words=5, max_docs=20000):
+        assert num_perm % bands == 0
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.retention_days = retention_days
+        self.min_words = min_words
+        self.max_docs = max_docs
+        self._lock = threading.Lock()
+        self._buckets = defaultdict(set)  # (user_id, band, band values) -> report ts
+        self._docs = {}  # ts -> (user_id, date, signature)
+        self._by_user = defaultdict(list)  # user_id -> ts of indexed reports, oldest first
+        self._order = deque()  # ts in insertion order, for eviction (may hold already pruned ts)
+
+    def _band_keys(self, user_id, signature):
+        for band in range(self.bands):
+            yield (user_id, band, signature[band * self.rows:(band + 1) * self.rows])
+
+    def _drop(self, ts):
+        user_id, _, signature = self._docs.pop(ts)
+        for key in self._band_keys(user_id, signature):
+            self._buckets[key].discard(ts)
+            if not self._buckets[key]:
+                del self._buckets[key]
+
+    def _prune(self, user_id, today):
+        keep = []
+        for ts in self._by_user[user_id]:
+            report_date = self._docs[ts][1]
+            if (date.fromisoformat(today) - date.fromisoformat(report_date)).days > self.retention_days:
+                self._drop(ts)
+            else:
+                keep.append(ts)
+        if keep:
+            self._by_user[user_id] = keep
+        else:
+            self._by_user.pop(user_id, None)
+
+    def _evict(self):
+        while len(self._docs) > self.max_docs:
+            ts = self._order.popleft()
+            if ts not in self._docs:
+                continue
+            user_id = self._docs[ts][0]
+            self._drop(ts)
+            self._by_user[user_id].remove(ts)
+            if not self._by_user[user_id]:
+                del self._by_user[user_id]
+            metrics.incr("near_duplicates.evicted")
+        # Pruned ts pile up in the queue; rebuild it once they outnumber live ones
+        if len(self._order) > 2 * max(len(self._docs), 1):
+            self._order = deque(ts for ts in self._order if ts in self._docs)
+
+    def add(self, user_id, report_date, ts, text):
+        """Index a reply and return the earlier report it nearly duplicates.
+
+        Returns (ts, date, similarity) of the most similar report the user
+        posted on an earlier day, or None. Adding the same ts again is a no-op.
+        """
+        words = report_words(text)
+        if len(words) < self.min_words:
+            return None
+        signature = self.hasher.signature(shingles(words))
+        with self._lock:
+            if ts in self._docs:
+                return None
+            self._prune(user_id, report_date)
+            best = None
+            candidates = set()
+            for key in self._band_keys(user_id, signature):
+                candidates.update(self._buckets.get(key, ()))
+            for candidate in candidates:
+                _, candidate_date, candidate_signature = self._docs[candidate]
+                if candidate_date >= report_date:
+                    continue
+                similarity = estimated_similarity(signature, candidate_signature)
+                if similarity >= self.threshold and (best is None or similarity > best[2]):
+                    best = (candidate, candidate_date, similarity)
+            for key in self._band_keys(user_id, signature):
+                self._buckets[key].add(ts)
+            self._docs[ts] = (user_id, report_date, signature)
+            self._by_user[user_id].append(ts)
+            self._order.append(ts)
+            self._evict()
+        if best:
+            metrics.incr("near_duplicates.detected")
+        return best
+
+    def size(self):
+        return len(self._docs)
@@ -0,0 +1,272 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import metrics
+from jobstore import UNIQUE_VIOLATION
+
+logger = logging.getLogger(__name__)
+
+# Slack errors that mean the side effect already happened (or never can)
+ALREADY_DONE_ERRORS = {"already_reacted", "message_not_found", "channel_not_found", "is_archived"}
+
+
+def _slack_error(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return response.get("error")
+    except Exception:
+        return None
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SqliteOutboxStore:
+    """Outbox rows in a local SQLite file."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS slack_outbox (
+                key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                kind TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )"""
+        )
+
+    def enqueue(self, key, method, payload, kind=None):
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO slack_outbox (key, method, payload, kind, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, json.dumps(payload), kind, now, now),
+            )
+            return cur.rowcount == 1
+
+    def due(self, limit=50, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, method, payload, kind, attempts FROM slack_outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+        return [
+            {"key": r[0], "method": r[1], "payload": json.loads(r[2]), "kind": r[3], "attempts": r[4]}
+            for r in rows
+        ]
+
+    def mark_delivered(self, key):
+        with self._lock:
+            self._conn.execute("UPDATE slack_outbox SET status = 'delivered', last_error = NULL WHERE key = ?", (key,))
+
+    def mark_failed(self, key, attempts, next_attempt_at, error, dead=False):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE slack_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE key = ?",
+                ("dead" if dead else "pending", attempts, next_attempt_at, error, key),
+            )
+
+    def prune(self, before):
+        """Delete delivered rows created before `before`; returns how many."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM slack_outbox WHERE status = 'delivered' AND created_at < ?", (before,)
+            ).rowcount
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM slack_outbox WHERE status = 'pending'").fetchone()[0]
+
+
+@metrics.timed_methods("supabase.store")
+class SupabaseOutboxStore:
+    """Outbox rows in the `slack_outbox` table (see setup.sql)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def enqueue(self, key, method, payload, kind=None):
+        now = time.time()
+        try:
+            self.client.table("slack_outbox").insert({
+                "key": key,
+                "method": method,
+                "payload": payload,
+                "kind": kind,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }).execute()
+            return True
+        except Exception as e:
+            if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                return False
+            raise
+
+    def due(self, limit=50, now=None):
+        now = time.time() if now is None else now
+        return (
+            self.client.table("slack_outbox")
+            .select("key, method, payload, kind, attempts")
+            .eq("status", "pending")
+            .lte("next_attempt_at", now)
+            .order("created_at")
+            .limit(limit)
+            .execute()
+            .data
+        )
+
+    def mark_delivered(self, key):
+        self.client.table("slack_outbox").update({"status": "delivered", "last_error": None}).eq("key", key).execute()
+
+    def mark_failed(self, key, attempts, next_attempt_at, error, dead=False):
+        self.client.table("slack_outbox").update({
+            "status": "dead" if dead else "pending",
+            "attempts": attempts,
+            "next_attempt_at": next_attempt_at,
+            "last_error": error,
+        }).eq("key", key).execute()
+
+    def prune(self, before):
+        result = self.client.table("slack_outbox").delete().eq("status", "delivered").lt("created_at", before).execute()
+        return len(result.data or [])
+
+    def pending_count(self):
+        result = self.client.table("slack_outbox").select("key", count="exact").eq("status", "pending").execute()
+        return result.count or 0
+
+
+class Outbox:
+    """Durable queue of Slack Web API calls with a background drain worker.
+
+    Each call has an idempotency key: enqueueing the same key twice is a
+    no-op, and a call is marked delivered only after Slack accepted it.
+    Failed calls are retried with exponential backoff (honouring
+    Retry-After) until `max_attempts`. Delivered rows are kept for
+    `retention` seconds, so a redelivered event or a re-run job still finds
+    its key, and are then pruned by the drain loop.
+    """
+
+    def __init__(self, store, client, max_attempts=12, base_delay=5, max_delay=900, poll_interval=2, gate=None,
+                 retention=7 * 86400, prune_interval=3600):
+        self.store = store
+        self.client = client
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pruned_at = None
+        # Optional callable; only drain while it returns True (e.g. leader election)
+        self.gate = gate
+        # kind -> callback(payload, response), run after delivery
+        self.handlers = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on_delivered(self, kind, callback):
+        self.handlers[kind] = callback
+
+    def enqueue(self, method, key, kind=None, **payload):
+        """Queue `client.<method>(**payload)`; returns False if `key` was already queued."""
+        added = self.store.enqueue(key, method, payload, kind)
+        if added:
+            metrics.incr("outbox.enqueued")
+            self._wake.set()
+        return added
+
+    def _deliver(self, row):
+        with metrics.timed("slack.call"):
+            response = getattr(self.client, row["method"])(**row["payload"])
+        self.store.mark_delivered(row["key"])
+        metrics.incr("outbox.delivered")
+        handler = self.handlers.get(row["kind"])
+        if handler:
+            try:
+                handler(row["payload"], response)
+            except Exception as e:
+                logger.error(f"Outbox callback for {row['key']} failed: {e}")
+
+    def drain_once(self):
+        """Deliver every due call once; returns the number delivered."""
+        delivered = 0
+        for row in self.store.due():
+            try:
+                self._deliver(row)
+                delivered += 1
+            except Exception as e:
+                error = _slack_error(e)
+                if error in ALREADY_DONE_ERRORS:
+                    logger.info(f"Outbox {row['key']}: {error}, nothing to retry")
+                    self.store.mark_delivered(row["key"])
+                    continue
+                attempts = row["attempts"] + 1
+                delay = _retry_after(e) or min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                dead = attempts >= self.max_attempts
+                self.store.mark_failed(row["key"], attempts, time.time() + delay, str(e), dead=dead)
+                metrics.incr("outbox.dead" if dead else "outbox.retried")
+                if dead:
+                    logger.error(f"Outbox {row['key']} gave up after {attempts} attempts: {e}")
+                else:
+                    logger.warning(f"Outbox {row['key']} failed (attempt {attempts}), retrying in {delay}s: {e}")
+        self.prune()
+        return delivered
+
+    def prune(self, now=None):
+        """Delete delivered rows past the retention window, at most once per `prune_interval`."""
+        now = time.time() if now is None else now
+        if self._pruned_at is not None and now - self._pruned_at < self.prune_interval:
+            return 0
+        self._pruned_at = now
+        try:
+            pruned = self.store.prune(now - self.retention)
+        except Exception as e:
+            logger.warning(f"Could not prune the outbox: {e}")
+            return 0
+        if pruned:
+            metrics.incr("outbox.pruned", pruned)
+            logger.info(f"Pruned {pruned} delivered outbox row(s)")
+        return pruned
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self.gate or self.gate():
+                try:
+                    self.drain_once()
+                except Exception as e:
+                    logger.error(f"Outbox drain failed: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="outbox-drain", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
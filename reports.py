@@ -0,0 +1,12 @@
+# How a report row stores its thread replies. Shared by the bot and the
+# offline tools (slack_import.py), which must not import main.
+
+
+def report_text(entries):
+    """Join report entries the same way appended replies have always been joined."""
+    return "\n\n[Addition:]:\n".join(entry["text"] for entry in entries)
+
+
+def row_entries(row):
+    """Return a report row's entries; rows saved before `entries` existed hold a single merged entry."""
+    return row.get("entries") or [{"ts": row["thread_ts"], "text": row["raw_text"]}]
@@ -0,0 +1,117 @@
+import logging
+import re
+import sqlite3
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def match_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = WORD.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """Full-text index over report replies in a local SQLite FTS5 table.
+
+    One document per thread reply, keyed by its message ts, so indexing
+    the same reply again replaces it instead of adding a duplicate.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_docs (
+                id INTEGER PRIMARY KEY,
+                ts TEXT NOT NULL UNIQUE,
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def _index(self, user_id, report_date, ts, text):
+        row = self._conn.execute("SELECT id FROM search_docs WHERE ts = ?", (ts,)).fetchone()
+        if row:
+            doc_id = row[0]
+            self._conn.execute("UPDATE search_docs SET user_id = ?, date = ? WHERE id = ?", (user_id, report_date, doc_id))
+            self._conn.execute("DELETE FROM search_fts WHERE rowid = ?", (doc_id,))
+        else:
+            doc_id = self._conn.execute(
+                "INSERT INTO search_docs (ts, user_id, date) VALUES (?, ?, ?)", (ts, user_id, report_date)
+            ).lastrowid
+        self._conn.execute("INSERT INTO search_fts (rowid, text) VALUES (?, ?)", (doc_id, text))
+
+    def index(self, user_id, report_date, ts, text):
+        """Add or replace one reply."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._index(user_id, report_date, ts, text)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        metrics.incr("search.indexed")
+
+    def index_many(self, docs):
+        """Add or replace (user_id, date, ts, text) tuples in one transaction."""
+        count = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for user_id, report_date, ts, text in docs:
+                    self._index(user_id, report_date, ts, text)
+                    count += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        metrics.incr("search.indexed", count)
+        return count
+
+    def remove(self, ts):
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM search_docs WHERE ts = ?", (ts,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM search_fts WHERE rowid = ?", (row[0],))
+                self._conn.execute("DELETE FROM search_docs WHERE id = ?", (row[0],))
+
+    def close(self):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM search_docs").fetchone()[0]
+
+    def search(self, text, limit=10, offset=0):
+        """Return (results, has_more); results are dicts ranked best first."""
+        query = match_query(text)
+        if not query:
+            return [], False
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT d.user_id, d.date, d.ts, snippet(search_fts, 0, '*', '*', '…', 16)
+                   FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid
+                   WHERE search_fts MATCH ?
+                   ORDER BY rank, d.date DESC
+                   LIMIT ? OFFSET ?""",
+                (query, limit + 1, offset),
+            ).fetchall()
+        metrics.incr("search.queries")
+        results = [{"user_id": r[0], "date": r[1], "ts": r[2], "snippet": r[3]} for r in rows[:limit]]
+        return results, len(rows) > limit
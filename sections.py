@@ -0,0 +1,117 @@
+import argparse
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from export import iter_reports
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("yesterday", "today", "blockers")
+
+# A section header starts a line, may be wrapped in Slack formatting or a
+# bullet, may carry a "(...)" or "/ ..." qualifier, and ends at a colon:
+# "*Yesterday:*", "- Today (by EOD):", "Blockers / Risks:". The rest of the
+# line is already section content.
+HEADER = re.compile(
+    r"^[ \t>*_~•\-]*"
+    r"(?:(?P<yesterday>yesterday|done|shipped)"
+    r"|(?P<today>today|plan(?:ned)?)"
+    r"|(?P<blockers>blockers?|risks?|impediments?))"
+    r"\b[*_~]*(?:[ \t]*(?:\([^)\n]{0,60}\)|/[ \t]*[\w ]{1,20}?))*[*_~]*[ \t]*:[*_~ \t]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+# A quoted line: the previous status pasted back for reference, not today's report
+QUOTED_LINE = re.compile(r"^[ \t]*(?:>|&gt;).*(?:\n|$)", re.MULTILINE)
+# Separator save_report puts between appended replies
+ADDITION = re.compile(r"^\[Addition:\]:$", re.MULTILINE)
+
+
+def parse_sections(text):
+    """Split a report into its Yesterday / Today / Blockers sections.
+
+    Returns a dict with a key per section, None where the section is absent.
+    Text before the first header is not assigned to any section; a section
+    that appears more than once (e.g. in an appended reply) is joined.
+    Quoted lines are skipped.
+    """
+    parts = {section: [] for section in SECTIONS}
+    for chunk in ADDITION.split(text or ""):
+        chunk = QUOTED_LINE.sub("", chunk)
+        matches = list(HEADER.finditer(chunk))
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(chunk)
+            content = chunk[match.end():end].strip()
+            if content:
+                parts[match.lastgroup].append(content)
+    return {section: "\n".join(values) if values else None for section, values in parts.items()}
+
+
+def parse_rows(rows):
+    """Worker: add parsed sections to a batch of report rows."""
+    return [dict(row, **parse_sections(row["raw_text"])) for row in rows]
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reparse_reports(client, since=None, until=None, batch_size=500, workers=None):
+    """Re-parse the sections of every stored report; returns the number of rows written.
+
+    Batches are read by keyset, parsed in a process pool and written back
+    with one upsert each. Reading, parsing and writing overlap, with at most
+    two batches per worker in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    columns = ["id", "user_id", "date", "raw_text", "thread_ts"]
+    written = 0
+    pending = deque()
+
+    def write(future):
+        rows = future.result()
+        client.table("standup_reports").upsert(rows, on_conflict="id").execute()
+        metrics.incr("sections.reparsed", len(rows))
+        return len(rows)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reports = iter_reports(client, since=since, until=until, page_size=batch_size, columns=columns)
+        for batch in _batches(reports, batch_size):
+            pending.append(pool.submit(parse_rows, batch))
+            if len(pending) >= workers * 2:
+                written += write(pending.popleft())
+        while pending:
+            written += write(pending.popleft())
+    logger.info(f"Re-parsed sections of {written} report(s)")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-parse Yesterday / Today / Blockers sections of stored reports.")
+    parser.add_argument("--since", help="First report date, YYYY-MM-DD")
+    parser.add_argument("--until", help="Last report date, YYYY-MM-DD")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    import main as bot
+
+    client = bot.get_supabase_client()
+    if not client:
+        parser.error("SUPABASE_URL and SUPABASE_KEY must be set")
+    return reparse_reports(client, since=args.since, until=args.until, batch_size=args.batch_size, workers=args.workers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
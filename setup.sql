@@ -6,3 +6,109 @@ create table standup_reports (
   thread_ts text not null,
   created_at timestamp with time zone default timezone('utc'::text, now()) not null
 );
+
+-- Scheduler run history; the primary key makes each scheduled run claimable once
+create table job_runs (
+  job_id text not null,
+  scheduled_for text not null,
+  started_at timestamp with time zone not null,
+  finished_at timestamp with time zone,
+  duration double precision,
+  status text not null,
+  error text,
+  primary key (job_id, scheduled_for)
+);
+
+-- One report per user per day; individual thread replies are kept in `entries`
+-- as [{"ts": ..., "text": ...}] so redelivered events can be deduplicated
+alter table standup_reports add column entries jsonb;
+create unique index standup_reports_user_date on standup_reports (user_id, date);
+
+-- Scheduler leader lease; `token` is the fencing token, bumped on every takeover
+create table bot_leases (
+  name text primary key,
+  holder text not null,
+  token bigint not null,
+  expires_at double precision not null
+);
+
+-- Durable queue of Slack Web API calls; `key` is the idempotency key
+create table slack_outbox (
+  key text primary key,
+  method text not null,
+  payload jsonb not null,
+  kind text,
+  status text not null default 'pending',
+  attempts integer not null default 0,
+  next_attempt_at double precision not null,
+  last_error text,
+  created_at double precision not null
+);
+create index slack_outbox_due on slack_outbox (status, next_attempt_at);
+
+-- Participation rollups, maintained incrementally by the bot (see stats.py)
+create table stats_user_days (
+  user_id text not null,
+  date text not null,
+  expected integer not null default 0,
+  reported integer not null default 0,
+  reply_seconds double precision,
+  primary key (user_id, date)
+);
+
+create table stats_user_weeks (
+  user_id text not null,
+  week text not null,
+  expected integer not null default 0,
+  reported integer not null default 0,
+  missed integer not null default 0,
+  reply_histogram jsonb not null default '{}',
+  primary key (user_id, week)
+);
+create index stats_user_weeks_week on stats_user_weeks (week);
+
+create table stats_users (
+  user_id text primary key,
+  reported_days integer not null default 0,
+  missed_days integer not null default 0,
+  streak integer not null default 0,
+  longest_streak integer not null default 0,
+  streak_end text
+);
+
+-- Report sections, parsed from raw_text at ingest (see sections.py)
+alter table standup_reports add column yesterday text;
+alter table standup_reports add column today text;
+alter table standup_reports add column blockers text;
+
+-- Each user's two latest reports, read once at startup to warm /laststatus;
+-- `id` (last, so `create or replace` works on existing views) is the paging key
+create or replace view recent_standup_reports as
+select user_id, date, raw_text, thread_ts, entries, id
+from (
+  select user_id, date, raw_text, thread_ts, entries, id,
+         row_number() over (partition by user_id order by date desc) as recency
+  from standup_reports
+) ranked
+where recency <= 2;
+
+-- Blockers still open per user, updated as reports are saved (see blockers.py)
+create table open_blockers (
+  user_id text not null,
+  key text not null,
+  text text not null,
+  since text not null,
+  last_seen text not null,
+  primary key (user_id, key)
+);
+create index open_blockers_since on open_blockers (since);
+
+-- Teams, schedule and phrases, watched by the running bot (CONFIG_SOURCE=supabase, see config.py)
+create table bot_config (
+  name text primary key,
+  value jsonb not null,
+  updated_at timestamptz not null default now()
+);
+
+-- Delivered outbox rows are pruned after 7 days (see Outbox.prune)
+create index slack_outbox_created on slack_outbox (status, created_at);
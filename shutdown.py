@@ -0,0 +1,111 @@
+import logging
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InFlight:
+    """Counts handlers that are still running, so shutdown can wait for them."""
+
+    def __init__(self):
+        self._count = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def track(self):
+        with self._cond:
+            self._count += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._count -= 1
+                if not self._count:
+                    self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until no handler is running; returns False if `timeout` ran out first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._count, timeout)
+
+    def __len__(self):
+        return self._count
+
+
+class ShutdownCoordinator:
+    """Runs shutdown steps in order within one overall deadline.
+
+    Each step runs in its own thread and is called with the seconds it may
+    take: what is left of the deadline, capped by the step's own `timeout`.
+    A step that overruns is abandoned, so capping the draining steps leaves
+    time for the flushes and the lease release after them. Shutting down
+    twice is a no-op.
+    """
+
+    def __init__(self, timeout=20):
+        self.timeout = timeout
+        self.steps = []  # (name, func(seconds), cap)
+        self._lock = threading.Lock()
+        self._started = False
+        self.done = threading.Event()
+
+    @property
+    def stopping(self):
+        return self._started
+
+    def add(self, name, func, timeout=None):
+        self.steps.append((name, func, timeout))
+
+    def shutdown(self, reason="shutdown"):
+        """Run every step; returns {step: "ok" | "error" | "timeout" | "skipped"}."""
+        with self._lock:
+            if self._started:
+                return None
+            self._started = True
+        logger.info(f"Shutting down ({reason}), {self.timeout}s to drain")
+        deadline = time.monotonic() + self.timeout
+        results = {}
+        for name, func, cap in self.steps:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                results[name] = "skipped"
+                continue
+            if cap is not None:
+                left = min(left, cap)
+            outcome = {}
+
+            def run(func=func, left=left, outcome=outcome):
+                try:
+                    func(left)
+                    outcome["status"] = "ok"
+                except Exception as e:
+                    logger.error(f"Shutdown step {name} failed: {e}")
+                    outcome["status"] = "error"
+
+            started = time.monotonic()
+            thread = threading.Thread(target=run, name=f"shutdown-{name}", daemon=True)
+            thread.start()
+            thread.join(left)
+            results[name] = outcome.get("status", "timeout")
+            logger.info(f"Shutdown step {name}: {results[name]} in {time.monotonic() - started:.2f}s")
+        metrics.incr("shutdown.runs")
+        logger.info(f"Shutdown finished: {results}")
+        self.done.set()
+        return results
+
+    def install(self, signals=(signal.SIGTERM, signal.SIGINT)):
+        """Shut down on `signals`, then exit. Must be called from the main thread."""
+        def handle(signum, frame):
+            if self._started:
+                logger.info(f"Already shutting down, ignoring {signal.Signals(signum).name}")
+                return
+            self.shutdown(signal.Signals(signum).name)
+            raise SystemExit(0)
+
+        for signum in signals:
+            signal.signal(signum, handle)
@@ -0,0 +1,100 @@
+import math
+import threading
+import time
+
+# Values at or below this are counted as zero (log buckets need positive values)
+MIN_VALUE = 1e-9
+
+
+class QuantileSketch:
+    """Streaming quantiles in fixed memory (a DDSketch-style log histogram).
+
+    A value lands in bucket ceil(log_gamma(value)), so any quantile is
+    returned within `accuracy` relative error. At most `max_buckets`
+    buckets are kept; past that the two lowest are merged, which only
+    costs accuracy on the smallest values.
+    """
+
+    def __init__(self, accuracy=0.01, max_buckets=512):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}  # bucket index -> count
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= MIN_VALUE:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            lowest, second = sorted(self.buckets)[:2]
+            self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other):
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            lowest, second = sorted(self.buckets)[:2]
+            self.buckets[second] += self.buckets.pop(lowest)
+
+    def quantile(self, q):
+        """Value at quantile `q` (0..1), or None if nothing was added."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i]
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RollingQuantiles:
+    """Quantiles over roughly the last `window` seconds.
+
+    The window is split into `slots` sketches that are reused in turn, so
+    memory stays fixed; a query merges the sketches still in the window.
+    """
+
+    def __init__(self, window=300, slots=5, accuracy=0.01, max_buckets=512, clock=time.monotonic):
+        self.slot_seconds = window / slots
+        self.accuracy = accuracy
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self._epochs = [None] * slots
+        self._sketches = [None] * slots
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        epoch = int(self.clock() // self.slot_seconds)
+        slot = epoch % len(self._sketches)
+        with self._lock:
+            if self._epochs[slot] != epoch:
+                self._epochs[slot] = epoch
+                self._sketches[slot] = QuantileSketch(self.accuracy, self.max_buckets)
+            self._sketches[slot].add(value)
+
+    def quantiles(self, qs=(0.5, 0.99)):
+        """{"count": n, "p50": ..., "p99": ...} over the current window."""
+        epoch = int(self.clock() // self.slot_seconds)
+        merged = QuantileSketch(self.accuracy, self.max_buckets)
+        with self._lock:
+            for slot_epoch, sketch in zip(self._epochs, self._sketches):
+                if slot_epoch is not None and epoch - slot_epoch < len(self._sketches):
+                    merged.merge(sketch)
+        result = {"count": merged.count}
+        for q in qs:
+            value = merged.quantile(q)
+            result[f"p{q * 100:g}"] = round(value, 4) if value is not None else None
+        return result
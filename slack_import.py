@@ -0,0 +1,233 @@
+import argparse
+import json
+import logging
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import metrics
+from reports import report_text, row_entries
+from sections import parse_sections
+
+logger = logging.getLogger(__name__)
+
+DAY_FILE = re.compile(r"^(?P<channel>[^/]+)/(?P<date>\d{4}-\d{2}-\d{2})\.json$")
+
+# The heading of the bot's daily post (see post_daily_thread); other threads in the channel are not standups
+STANDUP_THREAD_PATTERN = r"Daily — status thread"
+
+# Replies with these subtypes are still a person writing in the thread
+REPLY_SUBTYPES = {None, "thread_broadcast"}
+
+# Per-process cache of open archives, so workers don't re-read the central directory
+_archives = {}
+
+
+def _archive(path):
+    if path not in _archives:
+        _archives[path] = zipfile.ZipFile(path)
+    return _archives[path]
+
+
+def find_channel_dir(archive, channel):
+    """Return the archive folder for `channel`, given as a channel ID or name."""
+    names = {m.split("/", 1)[0] for m in archive.namelist() if "/" in m}
+    if channel in names:
+        return channel
+    if "channels.json" in archive.namelist():
+        with archive.open("channels.json") as f:
+            for item in json.load(f):
+                if item.get("id") == channel and item.get("name") in names:
+                    return item["name"]
+    raise ValueError(f"Channel {channel} not found in the archive")
+
+
+def day_files(archive, channel_dir):
+    """Return (date, member name) for the channel's day files, oldest first."""
+    files = []
+    for name in archive.namelist():
+        match = DAY_FILE.match(name)
+        if match and match.group("channel") == channel_dir:
+            files.append((match.group("date"), name))
+    return sorted(files)
+
+
+def parse_day_file(args):
+    """Worker: read one day file and keep only what the import needs.
+
+    Returns (day, parents, replies): the ts of each thread starter matching
+    `pattern`, and (thread_ts, user_id, ts, text) for each reply by a person.
+    Replies of other subtypes (file shares, ...) are not imported but still
+    exist, so they come with text None.
+    """
+    path, member, day, pattern = args
+    with _archive(path).open(member) as f:
+        messages = json.load(f)
+
+    parents = []
+    replies = []
+    for message in messages:
+        ts = message.get("ts")
+        thread_ts = message.get("thread_ts")
+        if not ts or not thread_ts:
+            continue
+        if thread_ts == ts:
+            if pattern is None or re.search(pattern, message.get("text") or ""):
+                parents.append(ts)
+            continue
+        if message.get("bot_id") or not message.get("user"):
+            continue
+        text = (message.get("text") or "") if message.get("subtype") in REPLY_SUBTYPES else None
+        replies.append((thread_ts, message["user"], ts, text))
+    return day, parents, replies
+
+
+def merge_rows(existing, collected, archived_until=None):
+    """Merge collected reports into existing rows the way the bot would.
+
+    `existing` maps (user_id, date) to a stored row, `collected` maps it to
+    {ts: text}: every current reply of the user in that day's thread (text
+    None for replies that are not imported). Stored entries missing from it
+    were deleted in Slack and are dropped, unless they are newer than
+    `archived_until` (the latest ts the archive covers).
+    Returns the rows that changed, ready to upsert.
+    """
+    rows = []
+    for (user_id, report_date), replies in collected.items():
+        row = existing.get((user_id, report_date))
+        entries = row_entries(row) if row else []
+        known = {entry["ts"]: entry["text"] for entry in entries}
+        # The export holds the final text of edited replies: replace those, add new ones
+        changed = {ts: text for ts, text in replies.items() if text is not None and known.get(ts) != text}
+        deleted = {
+            ts for ts in known
+            if ts not in replies and (archived_until is None or float(ts) <= archived_until)
+        }
+        if not changed and not deleted:
+            continue
+        entries = [entry for entry in entries if entry["ts"] not in changed and entry["ts"] not in deleted]
+        entries += [{"ts": ts, "text": text} for ts, text in changed.items()]
+        entries = sorted(entries, key=lambda entry: float(entry["ts"]))
+        raw_text = report_text(entries)
+        rows.append({
+            "user_id": user_id,
+            "date": report_date,
+            "raw_text": raw_text,
+            "thread_ts": row["thread_ts"] if row and row["thread_ts"] not in deleted else entries[0]["ts"],
+            "entries": entries,
+            **parse_sections(raw_text),
+        })
+    return rows
+
+
+def write_batch(client, collected, archived_until=None):
+    """Upsert one batch of collected reports; returns the number of rows written."""
+    users = sorted({user_id for user_id, _ in collected})
+    dates = sorted({report_date for _, report_date in collected})
+    response = (
+        client.table("standup_reports")
+        .select("user_id, date, raw_text, thread_ts, entries")
+        .in_("user_id", users)
+        .in_("date", dates)
+        .execute()
+    )
+    existing = {(row["user_id"], row["date"]): row for row in response.data}
+    rows = merge_rows(existing, collected, archived_until)
+    if rows:
+        client.table("standup_reports").upsert(rows, on_conflict="user_id,date").execute()
+    metrics.incr("import.rows", len(rows))
+    return len(rows)
+
+
+def import_archive(client, path, channel, pattern=None, retention_days=2, batch_size=500, workers=None, dry_run=False):
+    """Import standup threads for `channel` from a Slack export ZIP.
+
+    Day files are parsed in a process pool and consumed in date order. A
+    thread's replies are held only until it is older than `retention_days`
+    (the same window the bot accepts replies in), then written in batches,
+    so memory stays bounded by a few days of threads.
+    """
+    with zipfile.ZipFile(path) as archive:
+        channel_dir = find_channel_dir(archive, channel)
+        files = day_files(archive, channel_dir)
+    logger.info(f"Importing {len(files)} day file(s) from {channel_dir}")
+
+    threads = {}  # thread_ts -> date the thread was posted for
+    open_reports = {}  # (user_id, date) -> {ts: text}
+    ready = {}
+    stats = {"days": 0, "threads": 0, "replies": 0, "written": 0}
+    archived_until = 0.0  # latest ts read so far; stored replies after it are not judged deleted
+
+    def flush(batch):
+        if batch and not dry_run:
+            stats["written"] += write_batch(client, batch, archived_until)
+
+    def close_before(day):
+        for key in [key for key in open_reports if (date.fromisoformat(day) - date.fromisoformat(key[1])).days >= retention_days]:
+            ready[key] = open_reports.pop(key)
+        for ts in [ts for ts, posted in threads.items() if (date.fromisoformat(day) - date.fromisoformat(posted)).days >= retention_days]:
+            del threads[ts]
+
+    jobs = [(path, member, day, pattern) for day, member in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for day, parents, replies in pool.map(parse_day_file, jobs, chunksize=8):
+            stats["days"] += 1
+            archived_until = max([archived_until, *map(float, parents), *(float(reply[2]) for reply in replies)])
+            close_before(day)
+            if len(ready) >= batch_size:
+                flush(ready)
+                ready = {}
+            for ts in parents:
+                threads[ts] = day
+            stats["threads"] += len(parents)
+            for thread_ts, user_id, ts, text in replies:
+                posted = threads.get(thread_ts)
+                if posted is None:
+                    continue
+                open_reports.setdefault((user_id, posted), {})[ts] = text
+                stats["replies"] += text is not None
+
+    ready.update(open_reports)
+    keys = list(ready)
+    for start in range(0, len(keys), batch_size):
+        flush({key: ready[key] for key in keys[start:start + batch_size]})
+    logger.info(f"Import finished: {stats}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import standup threads from a Slack export ZIP.")
+    parser.add_argument("archive", help="Path to the Slack export .zip")
+    parser.add_argument("--channel", help="Channel ID or name (default: CHANNEL_ID)")
+    parser.add_argument("--thread-pattern", default=STANDUP_THREAD_PATTERN,
+                        help=f"Regex a thread's first message must match (default: {STANDUP_THREAD_PATTERN!r}; '.' for every thread)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--dry-run", action="store_true", help="Parse and count without writing")
+    args = parser.parse_args(argv)
+
+    import main as bot
+
+    channel = args.channel or bot.CHANNEL_ID
+    if not channel:
+        parser.error("--channel or CHANNEL_ID is required")
+    client = None
+    if not args.dry_run:
+        client = bot.get_supabase_client()
+        if not client:
+            parser.error("SUPABASE_URL and SUPABASE_KEY must be set")
+    return import_archive(
+        client, args.archive, channel,
+        pattern=args.thread_pattern,
+        retention_days=bot.THREAD_RETENTION_DAYS,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,85 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class EventDeduplicator:
+    """Remembers the most recent event IDs to drop redelivered events."""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, event_id):
+        """Return True if `event_id` was seen before; otherwise remember it."""
+        with self._lock:
+            if event_id in self._seen:
+                self._seen.move_to_end(event_id)
+                return True
+            self._seen[event_id] = True
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            return False
+
+
+class SocketModePool:
+    """Keeps several Socket Mode connections open for one app.
+
+    Slack spreads events across all open connections, so while one
+    connection is refreshed the others keep receiving. Refreshes are
+    staggered: every `refresh_interval / size` seconds the next connection
+    in turn reconnects to a new endpoint.
+    """
+
+    def __init__(self, handler_factory, size=2, refresh_interval=3600):
+        self.handler_factory = handler_factory
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.handlers = []
+        self._stop = threading.Event()
+        self._next_refresh = 0
+
+    def connect(self):
+        for i in range(self.size):
+            handler = self.handler_factory()
+            handler.connect()
+            self.handlers.append(handler)
+            logger.info(f"Socket Mode connection {i + 1}/{self.size} open")
+        metrics.set_gauge("socket_mode.connections", len(self.handlers))
+
+    def refresh_next(self):
+        """Reconnect one connection; the rest stay up meanwhile."""
+        if not self.handlers:
+            return
+        index = self._next_refresh % len(self.handlers)
+        self._next_refresh += 1
+        try:
+            self.handlers[index].client.connect_to_new_endpoint(force=True)
+            metrics.incr("socket_mode.refreshes")
+            logger.info(f"Refreshed Socket Mode connection {index + 1}/{len(self.handlers)}")
+        except Exception as e:
+            logger.error(f"Could not refresh Socket Mode connection {index + 1}: {e}")
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval / max(1, self.size)):
+            self.refresh_next()
+
+    def start(self):
+        """Open all connections and block until `close()` is called."""
+        self.connect()
+        threading.Thread(target=self._refresh_loop, name="socket-refresh", daemon=True).start()
+        self._stop.wait()
+
+    def close(self):
+        self._stop.set()
+        for handler in self.handlers:
+            try:
+                handler.close()
+            except Exception as e:
+                logger.warning(f"Error closing Socket Mode connection: {e}")
+        metrics.set_gauge("socket_mode.connections", 0)
@@ -0,0 +1,421 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Reply delays are kept as histograms of BUCKET_SECONDS-wide buckets, so
+# medians over any range of weeks come from merging a few small dicts
+BUCKET_SECONDS = 300
+
+
+def week_start(day):
+    """ISO date of the Monday of `day`'s week."""
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def histogram_median(histogram):
+    """Approximate median in seconds from a {bucket: count} histogram, or None."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(histogram, key=int):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            return (int(bucket) + 0.5) * BUCKET_SECONDS
+    return None
+
+
+class SqliteStatsStore:
+    """Rollup tables in a local SQLite file."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS stats_user_days (
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                expected INTEGER NOT NULL DEFAULT 0,
+                reported INTEGER NOT NULL DEFAULT 0,
+                reply_seconds REAL,
+                PRIMARY KEY (user_id, date)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS stats_user_weeks (
+                user_id TEXT NOT NULL,
+                week TEXT NOT NULL,
+                expected INTEGER NOT NULL DEFAULT 0,
+                reported INTEGER NOT NULL DEFAULT 0,
+                missed INTEGER NOT NULL DEFAULT 0,
+                reply_histogram TEXT NOT NULL DEFAULT '{}',
+                PRIMARY KEY (user_id, week)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS stats_user_weeks_week ON stats_user_weeks (week)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS stats_users (
+                user_id TEXT PRIMARY KEY,
+                reported_days INTEGER NOT NULL DEFAULT 0,
+                missed_days INTEGER NOT NULL DEFAULT 0,
+                streak INTEGER NOT NULL DEFAULT 0,
+                longest_streak INTEGER NOT NULL DEFAULT 0,
+                streak_end TEXT
+            )"""
+        )
+
+    def _one(self, sql, args):
+        with self._lock:
+            cur = self._conn.execute(sql, args)
+            row = cur.fetchone()
+            return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+    def _all(self, sql, args):
+        with self._lock:
+            cur = self._conn.execute(sql, args)
+            names = [c[0] for c in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def _put(self, table, rows):
+        if not rows:
+            return
+        columns = list(rows[0])
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [[row[c] for c in columns] for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _for_users(self, sql, args, user_ids):
+        return self._all(f"{sql} AND user_id IN ({', '.join('?' * len(user_ids))})", (*args, *user_ids))
+
+    def get_days(self, day, user_ids):
+        return self._for_users("SELECT * FROM stats_user_days WHERE date = ?", (day,), user_ids)
+
+    def put_days(self, rows):
+        self._put("stats_user_days", rows)
+
+    def count_missed(self, user_id, after, before):
+        """Days strictly between `after` and `before` the user was expected but did not report."""
+        row = self._one(
+            "SELECT count(*) AS n FROM stats_user_days WHERE user_id = ? AND date > ? AND date < ? AND expected = 1 AND reported = 0",
+            (user_id, after, before),
+        )
+        return row["n"]
+
+    def days(self, first, last):
+        return self._all("SELECT * FROM stats_user_days WHERE date >= ? AND date <= ?", (first, last))
+
+    def missed_days(self, after, before):
+        """Every user's missed days strictly between `after` and `before`, in one query."""
+        return self._all(
+            "SELECT user_id, date FROM stats_user_days WHERE date > ? AND date < ? AND expected = 1 AND reported = 0",
+            (after, before),
+        )
+
+    def get_week(self, user_id, week):
+        row = self._one("SELECT * FROM stats_user_weeks WHERE user_id = ? AND week = ?", (user_id, week))
+        if row:
+            row["reply_histogram"] = json.loads(row["reply_histogram"])
+        return row
+
+    def get_weeks(self, week, user_ids):
+        rows = self._for_users("SELECT * FROM stats_user_weeks WHERE week = ?", (week,), user_ids)
+        for row in rows:
+            row["reply_histogram"] = json.loads(row["reply_histogram"])
+        return rows
+
+    def put_weeks(self, rows):
+        self._put("stats_user_weeks", [dict(row, reply_histogram=json.dumps(row["reply_histogram"])) for row in rows])
+
+    def weeks(self, first, last):
+        rows = self._all("SELECT * FROM stats_user_weeks WHERE week >= ? AND week <= ?", (first, last))
+        for row in rows:
+            row["reply_histogram"] = json.loads(row["reply_histogram"])
+        return rows
+
+    def get_user(self, user_id):
+        return self._one("SELECT * FROM stats_users WHERE user_id = ?", (user_id,))
+
+    def get_users(self, user_ids):
+        return self._for_users("SELECT * FROM stats_users WHERE 1 = 1", (), user_ids)
+
+    def put_users(self, rows):
+        self._put("stats_users", rows)
+
+    def users(self):
+        return self._all("SELECT * FROM stats_users", ())
+
+
+@metrics.timed_methods("supabase.store")
+class SupabaseStatsStore:
+    """Rollup tables in Supabase (see setup.sql)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _one(self, query):
+        data = query.limit(1).execute().data
+        return data[0] if data else None
+
+    def get_days(self, day, user_ids):
+        return self.client.table("stats_user_days").select("*").eq("date", day).in_("user_id", user_ids).execute().data
+
+    def put_days(self, rows):
+        if rows:
+            self.client.table("stats_user_days").upsert(rows, on_conflict="user_id,date").execute()
+
+    def count_missed(self, user_id, after, before):
+        result = (
+            self.client.table("stats_user_days")
+            .select("date", count="exact")
+            .eq("user_id", user_id)
+            .gt("date", after)
+            .lt("date", before)
+            .eq("expected", 1)
+            .eq("reported", 0)
+            .execute()
+        )
+        return result.count or 0
+
+    def days(self, first, last):
+        return self.client.table("stats_user_days").select("*").gte("date", first).lte("date", last).execute().data
+
+    def missed_days(self, after, before):
+        return (
+            self.client.table("stats_user_days")
+            .select("user_id, date")
+            .gt("date", after)
+            .lt("date", before)
+            .eq("expected", 1)
+            .eq("reported", 0)
+            .execute()
+            .data
+        )
+
+    def get_week(self, user_id, week):
+        return self._one(self.client.table("stats_user_weeks").select("*").eq("user_id", user_id).eq("week", week))
+
+    def get_weeks(self, week, user_ids):
+        return self.client.table("stats_user_weeks").select("*").eq("week", week).in_("user_id", user_ids).execute().data
+
+    def put_weeks(self, rows):
+        if rows:
+            self.client.table("stats_user_weeks").upsert(rows, on_conflict="user_id,week").execute()
+
+    def weeks(self, first, last):
+        return self.client.table("stats_user_weeks").select("*").gte("week", first).lte("week", last).execute().data
+
+    def get_user(self, user_id):
+        return self._one(self.client.table("stats_users").select("*").eq("user_id", user_id))
+
+    def get_users(self, user_ids):
+        return self.client.table("stats_users").select("*").in_("user_id", user_ids).execute().data
+
+    def put_users(self, rows):
+        if rows:
+            self.client.table("stats_users").upsert(rows, on_conflict="user_id").execute()
+
+    def users(self):
+        return self.client.table("stats_users").select("*").execute().data
+
+
+class StandupStats:
+    """Participation rollups, updated as reports arrive and reminders run.
+
+    Each (user, day) row records whether the user was expected to report
+    and whether they did. Every change to a day row is applied as a delta
+    to that user's week row and all-time totals, so reading stats never
+    touches `standup_reports`. Day rows are idempotent: recording the same
+    report or reminder run twice changes nothing.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+    def record_report(self, user_id, day, reply_seconds=None):
+        """Count the user's report for `day`; `reply_seconds` is the delay after the thread was posted."""
+        with self._lock:
+            self._apply(day, {user_id: (False, True, reply_seconds)})
+
+    def record_expected(self, day, expected_users, reported_users=()):
+        """Mark who was expected to report on `day` (from a reminder run)."""
+        with self._lock:
+            self._apply(day, {user_id: (True, user_id in reported_users, None) for user_id in expected_users})
+
+    def _apply(self, day, changes):
+        """Apply {user_id: (expected, reported, reply_seconds)} for `day`.
+
+        The whole batch reads and upserts each rollup table once, however
+        many users it covers.
+        """
+        if not changes:
+            return
+        user_ids = list(changes)
+        old_days = {row["user_id"]: row for row in self.store.get_days(day, user_ids)}
+        updates = []
+        for user_id, (expected, reported, reply_seconds) in changes.items():
+            old = old_days.get(user_id) or {
+                "user_id": user_id, "date": day, "expected": 0, "reported": 0, "reply_seconds": None,
+            }
+            new = dict(old)
+            if expected:
+                new["expected"] = 1
+            if reported:
+                new["reported"] = 1
+                if new["reply_seconds"] is None and reply_seconds is not None:
+                    new["reply_seconds"] = max(0.0, reply_seconds)
+            if new != old:
+                updates.append((old, new))
+        if not updates:
+            return
+        changed = [new["user_id"] for _, new in updates]
+
+        week = week_start(day)
+        weeks = {row["user_id"]: row for row in self.store.get_weeks(week, changed)}
+        users = {row["user_id"]: row for row in self.store.get_users(changed)}
+        # Streaks that grow today continue unless a day was missed since their last report
+        ends = [
+            users[new["user_id"]]["streak_end"] for old, new in updates
+            if new["reported"] > old["reported"] and (users.get(new["user_id"]) or {}).get("streak_end")
+        ]
+        last_missed = {}
+        if ends:
+            for row in self.store.missed_days(min(ends), day):
+                last_missed[row["user_id"]] = max(row["date"], last_missed.get(row["user_id"], ""))
+
+        week_rows, user_rows = [], []
+        for old, new in updates:
+            user_id = new["user_id"]
+            reported_delta = new["reported"] - old["reported"]
+            missed_delta = int(bool(new["expected"] and not new["reported"])) - int(bool(old["expected"] and not old["reported"]))
+
+            week_row = weeks.get(user_id) or {
+                "user_id": user_id, "week": week, "expected": 0, "reported": 0, "missed": 0, "reply_histogram": {},
+            }
+            week_row["expected"] += new["expected"] - old["expected"]
+            week_row["reported"] += reported_delta
+            week_row["missed"] += missed_delta
+            if old["reply_seconds"] is None and new["reply_seconds"] is not None:
+                bucket = str(int(new["reply_seconds"] // BUCKET_SECONDS))
+                histogram = dict(week_row["reply_histogram"])
+                histogram[bucket] = histogram.get(bucket, 0) + 1
+                week_row["reply_histogram"] = histogram
+            week_rows.append(week_row)
+
+            user = users.get(user_id) or {
+                "user_id": user_id, "reported_days": 0, "missed_days": 0, "streak": 0, "longest_streak": 0, "streak_end": None,
+            }
+            user["reported_days"] += reported_delta
+            user["missed_days"] += missed_delta
+            if reported_delta > 0 and (user["streak_end"] is None or day > user["streak_end"]):
+                if user["streak_end"] and last_missed.get(user_id, "") <= user["streak_end"]:
+                    user["streak"] += 1
+                else:
+                    user["streak"] = 1
+                user["streak_end"] = day
+                user["longest_streak"] = max(user["longest_streak"], user["streak"])
+            user_rows.append(user)
+
+        self.store.put_days([new for _, new in updates])
+        self.store.put_weeks(week_rows)
+        self.store.put_users(user_rows)
+        metrics.incr("stats.updates", len(updates))
+
+    def current_streak(self, user, today=None, last_missed=None):
+        """The user's streak, or 0 if a day was missed since it last grew (today is not over yet).
+
+        `last_missed` ({user_id: latest missed day before today}, see
+        `current_streaks`) saves the per-user query.
+        """
+        if not user["streak_end"]:
+            return 0
+        if last_missed is not None:
+            missed = last_missed.get(user["user_id"], "") > user["streak_end"]
+        else:
+            missed = self.store.count_missed(user["user_id"], user["streak_end"], today or date.today().isoformat())
+        return 0 if missed else user["streak"]
+
+    def current_streaks(self, users, today=None):
+        """{user_id: current streak} for `users`, with one query for all of their missed days."""
+        today = today or date.today().isoformat()
+        ends = [user["streak_end"] for user in users if user["streak_end"]]
+        last_missed = {}
+        if ends:
+            for row in self.store.missed_days(min(ends), today):
+                last_missed[row["user_id"]] = max(row["date"], last_missed.get(row["user_id"], ""))
+        return {user["user_id"]: self.current_streak(user, today, last_missed) for user in users}
+
+    def _outside_days(self, since, until):
+        """Day rows of the first and last weeks that fall outside `since`..`until`."""
+        rows = []
+        first = week_start(since)
+        last = (date.fromisoformat(week_start(until)) + timedelta(days=6)).isoformat()
+        if first < since:
+            rows += self.store.days(first, (date.fromisoformat(since) - timedelta(days=1)).isoformat())
+        if until < last:
+            rows += self.store.days((date.fromisoformat(until) + timedelta(days=1)).isoformat(), last)
+        return rows
+
+    def summary(self, since, until, user_ids=None, today=None, top=5):
+        """Participation between two dates, read from the rollups.
+
+        Whole weeks come from the week rollups; the days of the first and last
+        weeks outside the range are read from the day rows and taken back out.
+        """
+        rows = [
+            row for row in self.store.weeks(week_start(since), week_start(until))
+            if user_ids is None or row["user_id"] in user_ids
+        ]
+        missed = {}
+        histogram = {}
+        expected = missed_total = 0
+        for row in rows:
+            expected += row["expected"]
+            missed_total += row["missed"]
+            if row["missed"]:
+                missed[row["user_id"]] = missed.get(row["user_id"], 0) + row["missed"]
+            for bucket, count in row["reply_histogram"].items():
+                histogram[bucket] = histogram.get(bucket, 0) + count
+        for day in self._outside_days(since, until):
+            if user_ids is not None and day["user_id"] not in user_ids:
+                continue
+            expected -= day["expected"]
+            if day["expected"] and not day["reported"]:
+                missed_total -= 1
+                missed[day["user_id"]] -= 1
+                if not missed[day["user_id"]]:
+                    del missed[day["user_id"]]
+            if day["reply_seconds"] is not None:
+                histogram[str(int(day["reply_seconds"] // BUCKET_SECONDS))] -= 1
+
+        users = [user for user in self.store.users() if user_ids is None or user["user_id"] in user_ids]
+        current = self.current_streaks(users, today)
+        streaks = [
+            (user["user_id"], current[user["user_id"]], user["longest_streak"])
+            for user in users if current[user["user_id"]]
+        ]
+
+        return {
+            "expected": expected,
+            "missed": missed_total,
+            "participation": (expected - missed_total) / expected if expected else None,
+            "most_missed": sorted(missed.items(), key=lambda item: (-item[1], item[0]))[:top],
+            "median_reply_seconds": histogram_median(histogram),
+            "streaks": sorted(streaks, key=lambda item: (-item[1], item[0]))[:top],
+        }
@@ -4,11 +4,15 @@ Run: python -m pytest test_bot.py -v
 or: python test_bot.py
 """
 
+import json
 import os
+import re
+import signal
 import sys
+import time
 import unittest
 from unittest.mock import MagicMock, patch, call
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 
 # Mock external dependencies before importing main
 sys.modules['slack_bolt'] = MagicMock()
@@ -18,6 +22,8 @@ sys.modules['supabase'] = MagicMock()
 sys.modules['apscheduler'] = MagicMock()
 sys.modules['apscheduler.schedulers'] = MagicMock()
 sys.modules['apscheduler.schedulers.background'] = MagicMock()
+sys.modules['apscheduler.triggers'] = MagicMock()
+sys.modules['apscheduler.triggers.cron'] = MagicMock()
 sys.modules['dotenv'] = MagicMock()
 
 # Mock load_dotenv so it doesn't read .env
@@ -30,6 +36,27 @@ with patch.dict('os.environ', {
 }):
     import importlib
     import main as bot_module
+    import export
+    import slack_import
+    import sections
+    import digest
+    import blockers
+    import deadlines
+    import shutdown
+    import sketch
+    import health
+    import metrics
+    import models
+    import memprofile
+    import config
+
+
+def open_thread(thread_ts=None):
+    """Reset the thread registry, optionally opening today's standup thread"""
+    bot_module.thread_registry = bot_module.ThreadRegistry()
+    if thread_ts:
+        bot_module.thread_registry.register(bot_module.StandupSession(
+            'C08UT7VP2TA', thread_ts, 'all', date.today().isoformat(), '12:00'))
 
 
 # ---------------------------------------------------------
@@ -55,9 +82,9 @@ class TestConfiguration(unittest.TestCase):
         self.assertIsInstance(bot_module.TEAM_USER_IDS, list)
         self.assertGreater(len(bot_module.TEAM_USER_IDS), 0)
 
-    def test_daily_thread_ts_initially_none(self):
-        """TC-01-05: daily_thread_ts is initially None"""
-        self.assertTrue(hasattr(bot_module, 'daily_thread_ts'))
+    def test_thread_registry_is_defined(self):
+        """TC-01-05: thread_registry tracks the open standup threads"""
+        self.assertTrue(hasattr(bot_module, 'thread_registry'))
 
 
 # ---------------------------------------------------------
@@ -80,13 +107,22 @@ class TestSupabaseClient(unittest.TestCase):
     def test_get_supabase_client_calls_create_client(self):
         """TC-02-02: get_supabase_client() calls create_client with correct params"""
         mock_client = MagicMock()
-        with patch('main.create_client', return_value=mock_client) as mock_create:
+        with patch('main.create_client', return_value=mock_client) as mock_create, \
+             patch('main.ClientOptions') as mock_options:
             bot_module.SUPABASE_URL = 'https://test.supabase.co'
             bot_module.SUPABASE_KEY = 'test-key'
             result = bot_module.get_supabase_client()
-            mock_create.assert_called_once_with('https://test.supabase.co', 'test-key')
+            mock_create.assert_called_once_with('https://test.supabase.co', 'test-key', options=mock_options.return_value)
             self.assertEqual(result, mock_client)
 
+    def test_get_supabase_client_sets_request_timeout(self):
+        """TC-02-03: Database requests time out after SUPABASE_TIMEOUT seconds"""
+        with patch('main.create_client'), patch('main.ClientOptions') as mock_options, \
+             patch.object(bot_module, 'SUPABASE_URL', 'https://test.supabase.co'), \
+             patch.object(bot_module, 'SUPABASE_KEY', 'test-key'), patch.object(bot_module, 'SUPABASE_TIMEOUT', 3.0):
+            bot_module.get_supabase_client()
+        mock_options.assert_called_once_with(postgrest_client_timeout=3.0)
+
 
 # ---------------------------------------------------------
 # TC-03: post_daily_thread
@@ -99,7 +135,7 @@ class TestPostDailyThread(unittest.TestCase):
         self.mock_app.client.chat_postMessage.return_value = {"ts": "1234567890.123456"}
         bot_module.app = self.mock_app
         bot_module.CHANNEL_ID = 'C08UT7VP2TA'
-        bot_module.daily_thread_ts = None
+        open_thread(None)
 
     @patch('main.get_vacation_users', return_value=set())
     def test_post_daily_thread_sends_message(self, mock_vacation):
@@ -118,11 +154,11 @@ class TestPostDailyThread(unittest.TestCase):
         self.assertEqual(first_call_kwargs['channel'], 'C08UT7VP2TA')
 
     @patch('main.get_vacation_users', return_value=set())
-    def test_post_daily_thread_sets_daily_thread_ts(self, mock_vacation):
+    def test_post_daily_thread_registers_thread(self, mock_vacation):
         """TC-03-03: post_daily_thread() must save thread ts"""
         bot_module.post_daily_thread()
-        self.assertIsNotNone(bot_module.daily_thread_ts)
-        self.assertEqual(bot_module.daily_thread_ts, "1234567890.123456")
+        self.assertIsNotNone(bot_module.current_thread_ts())
+        self.assertEqual(bot_module.current_thread_ts(), "1234567890.123456")
 
     @patch('main.get_vacation_users', return_value=set())
     def test_post_daily_thread_uses_michael_scott_greeting(self, mock_vacation):
@@ -147,7 +183,7 @@ class TestPostDailyThread(unittest.TestCase):
         """TC-03-05: post_daily_thread() must exit if app is not initialized"""
         bot_module.app = None
         bot_module.post_daily_thread()
-        self.assertIsNone(bot_module.daily_thread_ts)
+        self.assertIsNone(bot_module.current_thread_ts())
 
     def test_post_daily_thread_skips_if_no_channel(self):
         """TC-03-06: post_daily_thread() must exit if CHANNEL_ID is empty"""
@@ -175,13 +211,13 @@ class TestCheckMissingReports(unittest.TestCase):
         self.mock_supabase = MagicMock()
         bot_module.app = self.mock_app
         bot_module.supabase = self.mock_supabase
-        bot_module.daily_thread_ts = "1234567890.123456"
+        open_thread("1234567890.123456")
         bot_module.CHANNEL_ID = 'C08UT7VP2TA'
         bot_module.TEAM_USER_IDS = ["U111", "U222"]
 
     def test_skip_if_no_daily_thread(self):
         """TC-04-01: check_missing_reports() skips if no daily thread"""
-        bot_module.daily_thread_ts = None
+        open_thread(None)
         bot_module.check_missing_reports()
         self.mock_supabase.table.assert_not_called()
 
@@ -242,7 +278,7 @@ class TestHandleMessageEvents(unittest.TestCase):
         self.mock_supabase = MagicMock()
         bot_module.app = self.mock_app
         bot_module.supabase = self.mock_supabase
-        bot_module.daily_thread_ts = "1234567890.123456"
+        open_thread("1234567890.123456")
         bot_module.CHANNEL_ID = 'C08UT7VP2TA'
 
         # Register handler
@@ -254,6 +290,10 @@ class TestHandleMessageEvents(unittest.TestCase):
         # Mock the select->eq->eq chain to return no existing record
         self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
 
+    def tearDown(self):
+        # Injected DB errors must not leave the Supabase breaker open for other tests
+        bot_module.supabase_breaker.reset()
+
     def _call_handler(self, body):
         """Helper method to call the handler"""
         logger = MagicMock()
@@ -314,7 +354,7 @@ class TestHandleMessageEvents(unittest.TestCase):
 
     def test_ignores_if_no_daily_thread(self):
         """TC-05-05: If no active thread, all messages are ignored"""
-        bot_module.daily_thread_ts = None
+        open_thread(None)
         body = {"event": {
             "user": "U999",
             "text": "A message",
@@ -322,7 +362,9 @@ class TestHandleMessageEvents(unittest.TestCase):
             "thread_ts": "1234567890.123456",
         }}
         self._call_handler(body)
-        self.mock_supabase.table.assert_not_called()
+        # Only the thread registry is re-read (another replica may have posted the thread)
+        tables = {c.args[0] for c in self.mock_supabase.table.call_args_list}
+        self.assertLessEqual(tables, {"bot_state"})
 
     def test_handles_supabase_error_gracefully(self):
         """TC-05-06: Supabase error does not crash the handler"""
@@ -385,7 +427,7 @@ class TestPostDailyThreadExtended(unittest.TestCase):
         self.mock_app.client.chat_postMessage.return_value = {"ts": "1234567890.123456"}
         bot_module.app = self.mock_app
         bot_module.CHANNEL_ID = 'C08UT7VP2TA'
-        bot_module.daily_thread_ts = None
+        open_thread(None)
 
     @patch('main.get_vacation_users', return_value=set())
     def test_standup_text_contains_instructions(self, mock_vacation):
@@ -412,8 +454,8 @@ class TestPostDailyThreadExtended(unittest.TestCase):
         bot_module.post_daily_thread()
         mock_supabase.table.assert_called_with("bot_state")
         upsert_data = mock_supabase.table.return_value.upsert.call_args[0][0]
-        self.assertEqual(upsert_data['key'], 'daily_thread_ts')
-        self.assertEqual(upsert_data['value'], '1234567890.123456')
+        self.assertEqual(upsert_data['key'], 'thread_registry')
+        self.assertIn('1234567890.123456', upsert_data['value'])
         bot_module.supabase = None
 
     @patch('main.get_vacation_users', return_value=set())
@@ -427,7 +469,7 @@ class TestPostDailyThreadExtended(unittest.TestCase):
         except Exception:
             self.fail("bot_state error must not crash post_daily_thread")
         # Thread should still be created
-        self.assertEqual(bot_module.daily_thread_ts, "1234567890.123456")
+        self.assertEqual(bot_module.current_thread_ts(), "1234567890.123456")
         bot_module.supabase = None
 
 
@@ -441,10 +483,13 @@ class TestCheckMissingReportsExtended(unittest.TestCase):
         self.mock_supabase = MagicMock()
         bot_module.app = self.mock_app
         bot_module.supabase = self.mock_supabase
-        bot_module.daily_thread_ts = "1234567890.123456"
+        open_thread("1234567890.123456")
         bot_module.CHANNEL_ID = 'C08UT7VP2TA'
         bot_module.TEAM_USER_IDS = ["U111", "U222", "U333"]
 
+    def tearDown(self):
+        bot_module.supabase_breaker.reset()
+
     @patch('main.get_vacation_users', return_value=set())
     def test_reminder_message_contains_emoji(self, mock_vacation):
         """TC-08-01: Reminder contains an emoji"""
@@ -499,7 +544,7 @@ class TestHandleMessageEdgeCases(unittest.TestCase):
         self.mock_supabase = MagicMock()
         bot_module.app = self.mock_app
         bot_module.supabase = self.mock_supabase
-        bot_module.daily_thread_ts = "1234567890.123456"
+        open_thread("1234567890.123456")
         bot_module.CHANNEL_ID = 'C08UT7VP2TA'
 
         bot_module.register_events(self.mock_app)
@@ -509,6 +554,10 @@ class TestHandleMessageEdgeCases(unittest.TestCase):
         # Mock the select->eq->eq chain to return no existing record
         self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
 
+    def tearDown(self):
+        # Injected DB errors must not leave the Supabase breaker open for other tests
+        bot_module.supabase_breaker.reset()
+
     def _call_handler(self, body):
         logger = MagicMock()
         self.handler_func(body=body, logger=logger)
@@ -558,6 +607,42 @@ class TestHandleMessageEdgeCases(unittest.TestCase):
 # ---------------------------------------------------------
 class TestMainFunction(unittest.TestCase):
 
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_journal_dir = bot_module.JOURNAL_DIR
+        bot_module.JOURNAL_DIR = os.path.join(self.tmpdir.name, "journal")
+        self.original_search_path = bot_module.SEARCH_INDEX_PATH
+        bot_module.SEARCH_INDEX_PATH = ""
+        self.original_health_port = bot_module.HEALTH_PORT
+        bot_module.HEALTH_PORT = ""
+        self.original_signals = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+
+    def tearDown(self):
+        # main() starts background workers; don't leak them into other tests
+        if bot_module.outbox:
+            bot_module.outbox.stop()
+        bot_module.outbox = None
+        bot_module.journal = None
+        bot_module.standup_stats = None
+        bot_module.blocker_index = None
+        if bot_module.reminder_timer:
+            bot_module.reminder_timer.stop()
+        bot_module.reminder_timer = None
+        bot_module.shutdown_coordinator = None
+        for signum, handler in self.original_signals.items():
+            signal.signal(signum, handler)
+        bot_module.JOURNAL_DIR = self.original_journal_dir
+        bot_module.SEARCH_INDEX_PATH = self.original_search_path
+        bot_module.HEALTH_PORT = self.original_health_port
+        bot_module.socket_mode = None
+        if bot_module.config_watcher:
+            bot_module.config_watcher.stop()
+        bot_module.config_watcher = None
+        bot_module.scheduler = None
+        bot_module.state_ready.set()
+        self.tmpdir.cleanup()
+
     @patch('main.SocketModeHandler')
     @patch('main.App')
     @patch('main.BackgroundScheduler')
@@ -604,10 +689,28 @@ class TestMainFunction(unittest.TestCase):
         mock_supa.return_value = MagicMock()
         mock_app.client.chat_postMessage.return_value = {"ts": "123"}
         bot_module.main()
-        # Should have 3 jobs: post_daily_thread + 2x check_missing_reports
-        self.assertEqual(mock_sched.add_job.call_count, 3)
+        # Should have 2 jobs: post_daily_thread + daily digest; reminders run on the reminder timer
+        self.assertEqual(mock_sched.add_job.call_count, 2)
+        self.assertIsNotNone(bot_module.reminder_timer)
         mock_sched.start.assert_called_once()
 
+    @patch('main.SocketModeHandler')
+    @patch('main.App')
+    @patch('main.BackgroundScheduler')
+    @patch('main.get_supabase_client')
+    def test_main_schedules_fixed_reminders(self, mock_supa, mock_sched_cls, mock_app_cls, mock_handler):
+        """TC-10-04: With LOCAL_REMINDERS off, both reminders are cron jobs"""
+        bot_module.SLACK_BOT_TOKEN = 'xoxb-test'
+        bot_module.SLACK_APP_TOKEN = 'xapp-test'
+        mock_sched = MagicMock()
+        mock_sched_cls.return_value = mock_sched
+        mock_supa.return_value = MagicMock()
+        with patch.object(bot_module, 'LOCAL_REMINDERS', False):
+            bot_module.main()
+        job_ids = [c.kwargs["id"] for c in mock_sched.add_job.call_args_list]
+        self.assertEqual(job_ids, ["post_daily_thread", "first_reminder", "second_reminder", "daily_digest"])
+        self.assertIsNone(bot_module.reminder_timer)
+
 
 # ---------------------------------------------------------
 # TC-11: get_vacation_users — Vacation Tracker API
@@ -617,6 +720,8 @@ class TestGetVacationUsers(unittest.TestCase):
     def setUp(self):
         self.original_api_key = bot_module.VACATION_TRACKER_API_KEY
         bot_module.VACATION_TRACKER_API_KEY = "test-api-key"
+        bot_module.vacation_breaker.reset()
+        bot_module.last_good_vacations = None
 
     def tearDown(self):
         bot_module.VACATION_TRACKER_API_KEY = self.original_api_key
@@ -791,6 +896,1996 @@ class TestGetVacationUsers(unittest.TestCase):
         self.assertIn("U035U3KTFL5", result)  # Only Anton
 
 
+# ---------------------------------------------------------
+# TC-12: DM reminder fan-out
+# ---------------------------------------------------------
+class TestDMReminders(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        self.mock_app.client.conversations_open.side_effect = lambda users: {"channel": {"id": f"D-{users}"}}
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        open_thread("1234567890.123456")
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        bot_module.TEAM_USER_IDS = ["U111", "U222"]
+        bot_module.dm_reminder = bot_module.DMReminder(max_workers=4, rate_per_sec=1000)
+        mock_response = MagicMock()
+        mock_response.data = []
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+
+    def _dm_calls(self):
+        return [c for c in self.mock_app.client.chat_postMessage.call_args_list
+                if c[1]['channel'].startswith("D-")]
+
+    @patch('main.get_vacation_users', return_value=set())
+    def test_dm_mode_messages_each_missing_user(self, mock_vacation):
+        """TC-12-01: DM mode sends one DM per missing user"""
+        bot_module.check_missing_reports(dm=True)
+        channels = sorted(c[1]['channel'] for c in self._dm_calls())
+        self.assertEqual(channels, ["D-U111", "D-U222"])
+
+    @patch('main.get_vacation_users', return_value=set())
+    def test_dm_mode_still_posts_thread_reminder(self, mock_vacation):
+        """TC-12-02: DM mode keeps the thread reminder"""
+        bot_module.check_missing_reports(dm=True)
+        thread_calls = [c for c in self.mock_app.client.chat_postMessage.call_args_list
+                        if c[1].get('thread_ts') == "1234567890.123456"]
+        self.assertEqual(len(thread_calls), 1)
+
+    @patch('main.get_vacation_users', return_value=set())
+    def test_dm_mode_off_by_default(self, mock_vacation):
+        """TC-12-03: Without DM mode no DMs are sent"""
+        bot_module.DM_REMINDERS_ENABLED = False
+        bot_module.check_missing_reports()
+        self.mock_app.client.conversations_open.assert_not_called()
+
+    def test_dm_channel_cached_between_runs(self):
+        """TC-12-04: Repeat runs reuse the cached DM channel"""
+        reminder = bot_module.DMReminder(max_workers=2, rate_per_sec=1000)
+        reminder.send(self.mock_app.client, ["U111"], lambda uid: "hi")
+        stats = reminder.send(self.mock_app.client, ["U111"], lambda uid: "hi")
+        self.assertEqual(self.mock_app.client.conversations_open.call_count, 1)
+        self.assertEqual(stats["cached"], 1)
+
+    def test_failed_dm_is_counted(self):
+        """TC-12-05: A failing DM is reported in the run stats"""
+        reminder = bot_module.DMReminder(max_workers=2, rate_per_sec=1000)
+        self.mock_app.client.chat_postMessage.side_effect = Exception("channel_not_found")
+        stats = reminder.send(self.mock_app.client, ["U111", "U222"], lambda uid: "hi")
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(stats["sent"], 0)
+        self.assertEqual(sorted(stats["failed_users"]), ["U111", "U222"])
+
+    def test_rate_limited_call_is_retried(self):
+        """TC-12-06: A 429 from Slack is retried after Retry-After"""
+        reminder = bot_module.DMReminder(max_workers=1, rate_per_sec=1000)
+        error = Exception("ratelimited")
+        error.response = MagicMock(status_code=429, headers={"Retry-After": "0"})
+        self.mock_app.client.chat_postMessage.side_effect = [error, {"ok": True}]
+        stats = reminder.send(self.mock_app.client, ["U111"], lambda uid: "hi")
+        self.assertEqual(stats["sent"], 1)
+        self.assertEqual(self.mock_app.client.chat_postMessage.call_count, 2)
+
+
+# ---------------------------------------------------------
+# TC-13: Durable scheduler jobs
+# ---------------------------------------------------------
+class DailyTrigger:
+    """Minimal stand-in for CronTrigger: fires every day at hour:minute UTC"""
+
+    def __init__(self, hour, minute):
+        self.hour = hour
+        self.minute = minute
+
+    def get_next_fire_time(self, previous, now):
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate < now:
+            candidate += timedelta(days=1)
+        return candidate
+
+
+class TestDurableJobs(unittest.TestCase):
+
+    def setUp(self):
+        from jobstore import DurableJobs, SqliteJobStore
+        self.store = SqliteJobStore(":memory:")
+        self.jobs = DurableJobs(self.store, misfire_grace_time=3600)
+        self.func = MagicMock()
+        self.jobs.add(MagicMock(), "post_daily_thread", self.func, DailyTrigger(8, 4))
+
+    def test_catch_up_runs_missed_job_once(self):
+        """TC-13-01: A job missed within the grace period runs exactly once"""
+        now = datetime(2026, 3, 2, 8, 30, tzinfo=timezone.utc)
+        self.jobs.catch_up(now)
+        self.jobs.catch_up(now)
+        self.func.assert_called_once()
+
+    def test_catch_up_skips_job_outside_grace(self):
+        """TC-13-02: A job missed long ago is not run"""
+        now = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+        self.jobs.catch_up(now)
+        self.func.assert_not_called()
+
+    def test_catch_up_skips_job_that_already_ran(self):
+        """TC-13-03: Catch-up does not repeat a run recorded before the restart"""
+        scheduled = datetime(2026, 3, 2, 8, 4, tzinfo=timezone.utc)
+        self.jobs.run("post_daily_thread", scheduled)
+        self.jobs.catch_up(datetime(2026, 3, 2, 8, 10, tzinfo=timezone.utc))
+        self.func.assert_called_once()
+
+    def test_history_records_status_and_duration(self):
+        """TC-13-04: Run history keeps status and duration"""
+        self.func.side_effect = Exception("Slack down")
+        self.jobs.run("post_daily_thread", datetime(2026, 3, 2, 8, 4, tzinfo=timezone.utc))
+        history = self.store.history("post_daily_thread")
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]["status"], "error")
+        self.assertIsNotNone(history[0]["duration"])
+
+    def test_store_error_does_not_skip_job(self):
+        """TC-13-05: If the store is unreachable the job still runs"""
+        self.jobs.store = MagicMock()
+        self.jobs.store.claim.side_effect = Exception("DB down")
+        self.jobs.run("post_daily_thread", datetime(2026, 3, 2, 8, 4, tzinfo=timezone.utc))
+        self.func.assert_called_once()
+
+    def test_supabase_duplicate_claim_returns_false(self):
+        """TC-13-06: Supabase store treats unique violations as already claimed"""
+        from jobstore import SupabaseJobStore
+        client = MagicMock()
+        error = Exception("duplicate key")
+        error.code = "23505"
+        client.table.return_value.insert.return_value.execute.side_effect = error
+        self.assertFalse(SupabaseJobStore(client).claim("post_daily_thread", "2026-03-02T08:04:00+00:00"))
+
+
+# ---------------------------------------------------------
+# TC-14: Leader election and idempotent report writes
+# ---------------------------------------------------------
+class TestLeaderElection(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        from leader import SqliteLeaseStore
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "lease.db")
+        self.store_a = SqliteLeaseStore(self.path)
+        self.store_b = SqliteLeaseStore(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_only_one_replica_holds_lease(self):
+        """TC-14-01: A second replica cannot take a live lease"""
+        self.assertEqual(self.store_a.acquire("scheduler", "a", ttl=30, now=100), 1)
+        self.assertIsNone(self.store_b.acquire("scheduler", "b", ttl=30, now=110))
+
+    def test_expired_lease_bumps_fencing_token(self):
+        """TC-14-02: Taking over an expired lease increments the fencing token"""
+        self.store_a.acquire("scheduler", "a", ttl=30, now=100)
+        self.assertEqual(self.store_b.acquire("scheduler", "b", ttl=30, now=131), 2)
+
+    def test_renewal_keeps_token(self):
+        """TC-14-03: The holder renews without changing the token"""
+        self.store_a.acquire("scheduler", "a", ttl=30, now=100)
+        self.assertEqual(self.store_a.acquire("scheduler", "a", ttl=30, now=120), 1)
+        self.assertEqual(self.store_a.current("scheduler")[2], 150)
+
+    def test_stale_leader_fails_fencing_check(self):
+        """TC-14-04: A replica whose token was superseded stops running jobs"""
+        from leader import LeaderElector
+        elector = LeaderElector(self.store_a, holder="a", ttl=30)
+        self.assertTrue(elector.try_acquire())
+        self.assertTrue(elector.check_fencing())
+        import time as _time
+        self.store_b.acquire("scheduler", "b", ttl=30, now=_time.time() + 60)
+        self.assertFalse(elector.check_fencing())
+
+    def test_follower_picks_up_leaders_thread(self):
+        """TC-14-09: A reply reaching a follower is saved for the thread the leader posted"""
+        bot_state = {}
+        leader_db, follower_db = MagicMock(), MagicMock()
+        leader_db.table.return_value.upsert.side_effect = lambda row: bot_state.update({row["key"]: row["value"]}) or MagicMock()
+        follower_db.table.return_value.select.return_value.in_.return_value.execute.side_effect = \
+            lambda: MagicMock(data=[{"key": k, "value": v} for k, v in bot_state.items()])
+        follower_db.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        thread_ts = f"{time.time():.6f}"
+
+        # Leader: posts today's thread and saves the registry
+        leader_app = MagicMock()
+        leader_app.client.chat_postMessage.return_value = {"ts": thread_ts}
+        with patch.object(bot_module, 'app', leader_app), patch.object(bot_module, 'supabase', leader_db), \
+             patch.object(bot_module, 'thread_registry', bot_module.ThreadRegistry()), \
+             patch.object(bot_module, 'get_vacation_users', return_value=set()):
+            bot_module.post_daily_thread()
+        self.assertIn("thread_registry", bot_state)
+
+        # Follower: started before the post, so its registry is empty
+        follower_app = MagicMock()
+        with patch.object(bot_module, 'app', follower_app), patch.object(bot_module, 'supabase', follower_db), \
+             patch.object(bot_module, 'thread_registry', bot_module.ThreadRegistry()), \
+             patch.object(bot_module, 'registry_refreshed_at', 0.0), patch.object(bot_module, 'outbox', None):
+            bot_module.register_events(follower_app)
+            handler = follower_app.event.return_value.call_args[0][0]
+            handler(body={"event": {
+                "user": "U999", "text": "Yesterday: shipped", "ts": f"{time.time() + 1:.6f}",
+                "thread_ts": thread_ts, "channel": bot_module.CHANNEL_ID,
+            }}, logger=MagicMock())
+        insert_data = follower_db.table.return_value.insert.call_args[0][0]
+        self.assertEqual(insert_data["date"], date.today().isoformat())
+        follower_app.client.reactions_add.assert_called()
+
+    def test_new_leader_plans_reminders_for_open_thread(self):
+        """TC-14-10: A replica that takes over the lease plans reminders for the thread the old leader posted"""
+        thread_ts = f"{time.time():.6f}"
+        registry = bot_module.ThreadRegistry()
+        registry.register(bot_module.StandupSession(bot_module.CHANNEL_ID, thread_ts, "all", date.today().isoformat(), "12:00"))
+        db = MagicMock()
+        db.table.return_value.select.return_value.in_.return_value.execute.return_value = \
+            MagicMock(data=[{"key": "thread_registry", "value": registry.to_json()}])
+        with patch.object(bot_module, 'supabase', db), patch.object(bot_module, 'thread_registry', bot_module.ThreadRegistry()), \
+             patch.object(bot_module, 'durable_jobs', MagicMock()) as jobs, \
+             patch.object(bot_module, 'reminder_timer', MagicMock()), patch.object(bot_module, 'plan_reminders') as plan:
+            bot_module.take_over_scheduling()
+        jobs.catch_up.assert_called_once()
+        plan.assert_called_once_with()
+
+    def test_gate_blocks_jobs_on_follower(self):
+        """TC-14-05: Durable jobs do not run when the gate is closed"""
+        from jobstore import DurableJobs, SqliteJobStore
+        func = MagicMock()
+        jobs = DurableJobs(SqliteJobStore(":memory:"), gate=lambda: False)
+        jobs.add(MagicMock(), "post_daily_thread", func, DailyTrigger(8, 4))
+        jobs.run("post_daily_thread", datetime(2026, 3, 2, 8, 4, tzinfo=timezone.utc))
+        func.assert_not_called()
+
+
+class TestSaveReportIdempotency(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_supabase = MagicMock()
+        bot_module.supabase = self.mock_supabase
+        self.select = self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute
+
+    def test_redelivered_message_is_not_appended(self):
+        """TC-14-06: The same message ts is saved only once"""
+        self.select.return_value = MagicMock(data=[{
+            "raw_text": "Report", "thread_ts": "111.1", "entries": [{"ts": "111.1", "text": "Report"}],
+        }])
+        result, entries = bot_module.save_report("U999", "Report", "111.1", "2026-03-02")
+        self.assertEqual((result, entries), ("duplicate", [{"ts": "111.1", "text": "Report"}]))
+        self.mock_supabase.table.return_value.update.assert_not_called()
+
+    def test_new_message_is_appended(self):
+        """TC-14-07: A new reply is appended with the [Addition:] separator"""
+        self.select.return_value = MagicMock(data=[{"raw_text": "Old", "thread_ts": "111.1", "entries": None}])
+        result, entries = bot_module.save_report("U999", "New", "222.2", "2026-03-02")
+        self.assertEqual(result, "updated")
+        update_data = self.mock_supabase.table.return_value.update.call_args[0][0]
+        self.assertEqual(update_data["raw_text"], "Old\n\n[Addition:]:\nNew")
+        self.assertEqual([e["ts"] for e in update_data["entries"]], ["111.1", "222.2"])
+        self.assertEqual(entries, update_data["entries"])
+
+    def test_concurrent_insert_falls_back_to_append(self):
+        """TC-14-08: A unique violation on insert appends to the other replica's row"""
+        error = Exception("duplicate key")
+        error.code = "23505"
+        self.mock_supabase.table.return_value.insert.return_value.execute.side_effect = error
+        self.select.side_effect = [
+            MagicMock(data=[]),
+            MagicMock(data=[{"raw_text": "First", "thread_ts": "111.1", "entries": [{"ts": "111.1", "text": "First"}]}]),
+        ]
+        self.assertEqual(bot_module.save_report("U999", "Second", "222.2", "2026-03-02")[0], "updated")
+
+
+# ---------------------------------------------------------
+# TC-15: Thread registry
+# ---------------------------------------------------------
+class TestThreadRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        self.yesterday = (date.today() - timedelta(days=1)).isoformat()
+        open_thread("1234567890.123456")
+        bot_module.thread_registry.register(bot_module.StandupSession(
+            'C08UT7VP2TA', "1111111111.000001", 'all', self.yesterday, '12:00'))
+        bot_module.register_events(self.mock_app)
+        self.handler_func = self.mock_app.event.return_value.call_args[0][0]
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+
+    def test_late_reply_saved_for_thread_date(self):
+        """TC-15-01: A reply to yesterday's thread is saved for yesterday"""
+        self.handler_func(body={"event": {
+            "user": "U999", "text": "Late report", "ts": "9999999999.000001",
+            "thread_ts": "1111111111.000001", "channel": "C08UT7VP2TA",
+        }}, logger=MagicMock())
+        insert_data = self.mock_supabase.table.return_value.insert.call_args[0][0]
+        self.assertEqual(insert_data['date'], self.yesterday)
+
+    def test_threads_past_retention_are_closed(self):
+        """TC-15-02: Threads older than the retention window are ignored"""
+        old = (date.today() - timedelta(days=5)).isoformat()
+        registry = bot_module.ThreadRegistry(retention_days=2)
+        registry.register(bot_module.StandupSession('C1', "1.0", 'all', old, '12:00'))
+        self.assertIsNone(registry.lookup('C1', "1.0"))
+
+    def test_registry_round_trips_through_json(self):
+        """TC-15-03: Serialized registry restores the same sessions"""
+        restored = bot_module.ThreadRegistry()
+        restored.load_json(bot_module.thread_registry.to_json())
+        self.assertEqual(
+            sorted(s.thread_ts for s in restored.sessions()),
+            ["1111111111.000001", "1234567890.123456"],
+        )
+
+    def test_reminders_use_todays_thread_only(self):
+        """TC-15-04: Without a thread for today, reminders are skipped"""
+        registry = bot_module.ThreadRegistry()
+        registry.register(bot_module.StandupSession('C08UT7VP2TA', "1111111111.000001", 'all', self.yesterday, '12:00'))
+        bot_module.thread_registry = registry
+        bot_module.check_missing_reports()
+        self.mock_supabase.table.assert_not_called()
+
+    def test_restore_migrates_legacy_daily_thread_ts(self):
+        """TC-15-05: A legacy daily_thread_ts row is restored as a session"""
+        open_thread(None)
+        ts = f"{datetime.now().timestamp():.6f}"
+        self.mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = MagicMock(
+            data=[{"key": "daily_thread_ts", "value": ts}])
+        bot_module.restore_thread_registry()
+        self.assertEqual(bot_module.current_thread_ts(), ts)
+
+
+# ---------------------------------------------------------
+# TC-16: Outbox for Slack side effects
+# ---------------------------------------------------------
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        from outbox import Outbox, SqliteOutboxStore
+        self.client = MagicMock()
+        self.store = SqliteOutboxStore(":memory:")
+        self.outbox = Outbox(self.store, self.client, base_delay=0)
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        bot_module.outbox = self.outbox
+
+    def tearDown(self):
+        bot_module.outbox = None
+
+    def test_same_key_is_enqueued_once(self):
+        """TC-16-01: Enqueueing a key twice delivers it once"""
+        self.outbox.enqueue("reactions_add", "reaction:1", channel="C1", name="blue_heart", timestamp="1.0")
+        self.outbox.enqueue("reactions_add", "reaction:1", channel="C1", name="blue_heart", timestamp="1.0")
+        self.assertEqual(self.outbox.drain_once(), 1)
+        self.client.reactions_add.assert_called_once_with(channel="C1", name="blue_heart", timestamp="1.0")
+
+    def test_failed_call_is_retried(self):
+        """TC-16-02: A failed delivery stays pending and is retried"""
+        self.client.chat_postMessage.side_effect = [Exception("Slack down"), {"ok": True}]
+        self.outbox.enqueue("chat_postMessage", "msg:1", channel="C1", text="hi")
+        self.assertEqual(self.outbox.drain_once(), 0)
+        self.assertEqual(self.store.pending_count(), 1)
+        self.assertEqual(self.outbox.drain_once(), 1)
+        self.assertEqual(self.store.pending_count(), 0)
+
+    def test_already_reacted_counts_as_delivered(self):
+        """TC-16-03: already_reacted is not retried"""
+        error = Exception("already_reacted")
+        error.response = {"error": "already_reacted"}
+        self.client.reactions_add.side_effect = error
+        self.outbox.enqueue("reactions_add", "reaction:1", channel="C1", name="blue_heart", timestamp="1.0")
+        self.outbox.drain_once()
+        self.assertEqual(self.store.pending_count(), 0)
+
+    def test_handler_enqueues_reaction(self):
+        """TC-16-04: The message handler queues the reaction instead of calling Slack"""
+        open_thread("1234567890.123456")
+        bot_module.register_events(self.mock_app)
+        handler_func = self.mock_app.event.return_value.call_args[0][0]
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        handler_func(body={"event": {
+            "user": "U999", "text": "Report", "ts": "9999999999.000001", "thread_ts": "1234567890.123456",
+        }}, logger=MagicMock())
+        self.mock_app.client.reactions_add.assert_not_called()
+        self.assertEqual(self.store.pending_count(), 1)
+
+    @patch('main.get_vacation_users', return_value=set())
+    def test_failed_daily_thread_is_delivered_later(self, mock_vacation):
+        """TC-16-05: A daily thread that fails to post is registered once the outbox delivers it"""
+        open_thread(None)
+        self.outbox.client = self.mock_app.client
+        self.outbox.on_delivered("daily_thread", lambda payload, response: bot_module.on_daily_thread_posted(response["ts"]))
+        self.mock_app.client.chat_postMessage.side_effect = [Exception("Slack down"), {"ts": "1234567890.123456"}]
+        bot_module.post_daily_thread()
+        self.assertIsNone(bot_module.current_thread_ts())
+        self.outbox.drain_once()
+        self.assertEqual(bot_module.current_thread_ts(), "1234567890.123456")
+
+    def test_delivered_rows_are_pruned_after_retention(self):
+        """TC-16-06: Delivered rows are deleted once past the retention window; pending ones stay"""
+        self.client.chat_postMessage.side_effect = [{"ok": True}, Exception("Slack down")]
+        self.outbox.enqueue("chat_postMessage", "msg:1", channel="C1", text="hi")
+        self.outbox.drain_once()
+        self.outbox.enqueue("chat_postMessage", "msg:2", channel="C1", text="hi")
+        self.outbox.drain_once()
+        count = lambda: self.store._conn.execute("SELECT count(*) FROM slack_outbox").fetchone()[0]
+        self.assertEqual(count(), 2)
+        self.assertEqual(self.outbox.prune(now=time.time() + self.outbox.retention + 10), 1)
+        self.assertEqual((count(), self.store.pending_count()), (1, 1))
+        self.assertEqual(self.outbox.prune(now=time.time() + self.outbox.retention + 20), 0)  # rate-limited
+
+
+# ---------------------------------------------------------
+# TC-17: Circuit breakers
+# ---------------------------------------------------------
+class TestCircuitBreakers(unittest.TestCase):
+
+    def setUp(self):
+        self.original_api_key = bot_module.VACATION_TRACKER_API_KEY
+        bot_module.VACATION_TRACKER_API_KEY = "test-api-key"
+        bot_module.vacation_breaker.reset()
+        bot_module.supabase_breaker.reset()
+        bot_module.last_good_vacations = None
+        bot_module.reported_cache.clear()
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        bot_module.TEAM_USER_IDS = ["U111", "U222"]
+        open_thread("1234567890.123456")
+
+    def tearDown(self):
+        bot_module.VACATION_TRACKER_API_KEY = self.original_api_key
+        bot_module.vacation_breaker.reset()
+        bot_module.supabase_breaker.reset()
+
+    def test_breaker_opens_after_threshold(self):
+        """TC-17-01: Consecutive failures open the breaker and calls fail fast"""
+        from breaker import CircuitBreaker, CircuitOpenError
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        failing = MagicMock(side_effect=Exception("down"))
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                breaker.call(failing)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(failing)
+        self.assertEqual(failing.call_count, 2)
+        self.assertEqual(breaker.state, "open")
+
+    def test_half_open_trial_closes_breaker(self):
+        """TC-17-02: A successful trial after the reset timeout closes the breaker"""
+        from breaker import CircuitBreaker
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+        with self.assertRaises(Exception):
+            breaker.call(MagicMock(side_effect=Exception("down")))
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    @patch('main.requests.get')
+    def test_vacations_served_stale_when_open(self, mock_get):
+        """TC-17-03: With the Vacation Tracker breaker open, the last good set is served without a request"""
+        bot_module.last_good_vacations = ("2026-03-01", frozenset({"U035U3KTFL5"}))
+        for _ in range(bot_module.vacation_breaker.failure_threshold):
+            bot_module.vacation_breaker.record_failure()
+        result = bot_module.get_vacation_users()
+        self.assertEqual(result, {"U035U3KTFL5"})
+        mock_get.assert_not_called()
+
+    @patch('main.get_vacation_users', return_value=set())
+    def test_reminders_use_cached_reporters_when_supabase_open(self, mock_vacation):
+        """TC-17-04: With the Supabase breaker open, cached reporters are excluded from reminders"""
+        bot_module.remember_reporters(date.today().isoformat(), ["U111"])
+        for _ in range(bot_module.supabase_breaker.failure_threshold):
+            bot_module.supabase_breaker.record_failure()
+        bot_module.check_missing_reports()
+        self.mock_supabase.table.assert_not_called()
+        text = self.mock_app.client.chat_postMessage.call_args[1]['text']
+        self.assertIn("U222", text)
+        self.assertNotIn("U111", text)
+
+    def test_breaker_state_exported_as_metric(self):
+        """TC-17-05: Breaker state is exported as a gauge"""
+        import metrics
+        for _ in range(bot_module.supabase_breaker.failure_threshold):
+            bot_module.supabase_breaker.record_failure()
+        self.assertEqual(metrics.snapshot()["gauges"]["breaker.supabase.state"], 2)
+        self.assertEqual(bot_module.breaker_states()["supabase"]["state"], "open")
+
+
+# ---------------------------------------------------------
+# TC-18: Local report journal
+# ---------------------------------------------------------
+class TestReportJournal(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        from journal import ReportJournal
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.journal = ReportJournal(self.tmpdir.name, max_segment_bytes=200)
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        bot_module.journal = self.journal
+        open_thread("1234567890.123456")
+        bot_module.register_events(self.mock_app)
+        self.handler_func = self.mock_app.event.return_value.call_args[0][0]
+
+    def tearDown(self):
+        bot_module.journal = None
+        bot_module.supabase_breaker.reset()
+        self.journal.close()
+        self.tmpdir.cleanup()
+
+    def _entry(self, n):
+        return {"user_id": f"U{n}", "date": "2026-03-02", "text": f"Report {n}", "ts": f"{n}.0"}
+
+    def test_db_failure_journals_report_and_reacts(self):
+        """TC-18-01: When the DB write fails the report is journaled and confirmed"""
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.side_effect = Exception("DB down")
+        self.handler_func(body={"event": {
+            "user": "U999", "text": "My report", "ts": "9999999999.000001", "thread_ts": "1234567890.123456",
+        }}, logger=MagicMock())
+        self.assertEqual(self.journal.pending_count(), 1)
+        self.mock_app.client.reactions_add.assert_called_once()
+
+    def test_outage_reply_skips_db_and_reacts_directly(self):
+        """TC-18-06: During an outage a journaled reply touches no DB-backed state and the reaction bypasses the outbox"""
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.side_effect = Exception("DB down")
+        outbox_db = MagicMock()
+        outbox_db.table.return_value.insert.return_value.execute.side_effect = Exception("DB down")
+        stats, blockers_ = MagicMock(), MagicMock()
+        with patch.object(bot_module, 'outbox', bot_module.Outbox(bot_module.SupabaseOutboxStore(outbox_db), self.mock_app.client)), \
+             patch.object(bot_module, 'standup_stats', stats), patch.object(bot_module, 'blocker_index', blockers_):
+            self.handler_func(body={"event": {
+                "user": "U999", "text": "Blockers: waiting on infra", "ts": "9999999999.000001", "thread_ts": "1234567890.123456",
+            }}, logger=MagicMock())
+        self.assertEqual(self.journal.pending_count(), 1)
+        stats.record_report.assert_not_called()
+        blockers_.update.assert_not_called()
+        self.mock_app.client.reactions_add.assert_called_once_with(
+            channel='C08UT7VP2TA', name="blue_heart", timestamp="9999999999.000001")
+
+    def test_slow_db_journals_report_after_timeout(self):
+        """TC-18-07: A database request that times out journals the report and counts against the breaker"""
+        class ReadTimeout(Exception):
+            pass
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.side_effect = ReadTimeout("timed out")
+        self.handler_func(body={"event": {
+            "user": "U999", "text": "My report", "ts": "9999999999.000001", "thread_ts": "1234567890.123456",
+        }}, logger=MagicMock())
+        self.assertEqual(self.journal.pending_count(), 1)
+        self.assertEqual(bot_module.supabase_breaker._failures, 1)
+        self.mock_app.client.reactions_add.assert_called_once()
+
+    def test_segments_rotate_by_size(self):
+        """TC-18-02: The journal rotates to a new segment past the size limit"""
+        for n in range(10):
+            self.journal.append(self._entry(n))
+        self.assertGreater(len(self.journal._segment_numbers()), 1)
+        self.assertEqual(self.journal.pending_count(), 10)
+
+    def test_replay_drains_and_compacts(self):
+        """TC-18-03: Replay saves every entry once and removes drained segments"""
+        for n in range(5):
+            self.journal.append(self._entry(n))
+        self.journal.append(self._entry(0))  # duplicate
+        applied = []
+        self.assertEqual(self.journal.replay(applied.append), 5)
+        self.assertEqual([e["ts"] for e in applied], ["0.0", "1.0", "2.0", "3.0", "4.0"])
+        self.assertEqual(self.journal.pending_count(), 0)
+
+    def test_replay_stops_and_keeps_entries_on_failure(self):
+        """TC-18-04: A failing replay keeps the unsaved entries"""
+        for n in range(3):
+            self.journal.append(self._entry(n))
+        apply = MagicMock(side_effect=[None, Exception("DB down"), None])
+        self.journal.replay(apply)
+        self.assertEqual(self.journal.pending_count(), 2)
+
+    def test_journal_survives_restart(self):
+        """TC-18-05: Entries written before a restart are replayed by the new process"""
+        from journal import ReportJournal
+        self.journal.append(self._entry(1))
+        self.journal.close()
+        reopened = ReportJournal(self.tmpdir.name)
+        applied = []
+        reopened.replay(applied.append)
+        reopened.close()
+        self.assertEqual(len(applied), 1)
+
+
+# ---------------------------------------------------------
+# TC-19: Cold start
+# ---------------------------------------------------------
+class TestColdStart(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        bot_module.durable_jobs = MagicMock()
+        bot_module.leader = None
+
+    def tearDown(self):
+        bot_module.state_ready.set()
+        bot_module.caches_warm.set()
+        bot_module.durable_jobs = None
+
+    def test_heavy_dependencies_loaded_on_demand(self):
+        """TC-19-01: slack_bolt is imported by load_slack(), not at module import"""
+        bot_module.App = None
+        bot_module.SocketModeHandler = None
+        try:
+            bot_module.load_slack()
+            self.assertIs(bot_module.App, sys.modules['slack_bolt'].App)
+        finally:
+            bot_module.App = None
+            bot_module.SocketModeHandler = None
+
+    def test_handler_waits_for_restored_state(self):
+        """TC-19-02: An event arriving during restore is handled once the registry is loaded"""
+        import threading
+        open_thread(None)
+        bot_module.state_ready.clear()
+        bot_module.register_events(self.mock_app)
+        handler_func = self.mock_app.event.return_value.call_args[0][0]
+        self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+
+        def restore():
+            open_thread("1234567890.123456")
+            bot_module.state_ready.set()
+
+        threading.Timer(0.05, restore).start()
+        handler_func(body={"event": {
+            "user": "U999", "text": "Report", "ts": "9999999999.000001", "thread_ts": "1234567890.123456",
+        }}, logger=MagicMock())
+        self.mock_supabase.table.return_value.insert.assert_called_once()
+
+    @patch('main.get_vacation_users', return_value=set())
+    def test_restore_state_marks_ready_and_records_timings(self, mock_vacation):
+        """TC-19-03: restore_state() restores, warms caches and logs a timing breakdown"""
+        bot_module.state_ready.clear()
+        bot_module.restore_state()
+        self.assertTrue(bot_module.state_ready.is_set())
+        for step in ("restore.threads", "warm.vacations", "warm.reporters", "ready"):
+            self.assertIn(step, bot_module.startup_timings)
+        mock_vacation.assert_called_once()
+
+    def test_handlers_released_before_caches_are_warm(self):
+        """TC-19-04: Handlers proceed once threads are restored, while slow warm-ups still run"""
+        import threading
+        release = threading.Event()
+        bot_module.state_ready.clear()
+        bot_module.caches_warm.clear()
+        with patch.object(bot_module, 'get_vacation_users', side_effect=lambda: release.wait(5)):
+            restorer = threading.Thread(target=bot_module.restore_state)
+            restorer.start()
+            try:
+                self.assertTrue(bot_module.state_ready.wait(2))
+                self.assertFalse(bot_module.caches_warm.is_set())
+                self.assertFalse(bot_module.readiness()["caches"])
+            finally:
+                release.set()
+                restorer.join(5)
+        self.assertTrue(bot_module.caches_warm.is_set())
+        bot_module.durable_jobs.catch_up.assert_called_once()
+
+
+# ---------------------------------------------------------
+# TC-20: Multiple Socket Mode connections
+# ---------------------------------------------------------
+class TestSocketModePool(unittest.TestCase):
+
+    def test_duplicate_event_is_dropped(self):
+        """TC-20-01: The same event_id only reaches the listeners once"""
+        bot_module.event_dedup = bot_module.EventDeduplicator()
+        next_call = MagicMock()
+        bot_module.dedupe_events({"event_id": "Ev1"}, next_call)
+        bot_module.dedupe_events({"event_id": "Ev1"}, next_call)
+        next_call.assert_called_once()
+
+    def test_events_without_id_pass_through(self):
+        """TC-20-02: Requests without an event_id (e.g. commands) are not deduplicated"""
+        next_call = MagicMock()
+        bot_module.dedupe_events({"command": "/standup"}, next_call)
+        bot_module.dedupe_events({"command": "/standup"}, next_call)
+        self.assertEqual(next_call.call_count, 2)
+
+    def test_deduplicator_is_bounded(self):
+        """TC-20-03: The deduplicator forgets the oldest IDs past its size"""
+        dedup = bot_module.EventDeduplicator(max_size=2)
+        for event_id in ("a", "b", "c"):
+            dedup.is_duplicate(event_id)
+        self.assertFalse(dedup.is_duplicate("a"))
+        self.assertTrue(dedup.is_duplicate("c"))
+
+    def test_pool_opens_all_connections(self):
+        """TC-20-04: The pool connects the configured number of handlers"""
+        factory = MagicMock()
+        pool = bot_module.SocketModePool(factory, size=3)
+        pool.connect()
+        self.assertEqual(factory.call_count, 3)
+        self.assertEqual(factory.return_value.connect.call_count, 3)
+
+    def test_refresh_is_staggered(self):
+        """TC-20-05: Each refresh reconnects one connection, in turn"""
+        handlers = [MagicMock(), MagicMock()]
+        pool = bot_module.SocketModePool(MagicMock(side_effect=handlers), size=2)
+        pool.connect()
+        pool.refresh_next()
+        handlers[0].client.connect_to_new_endpoint.assert_called_once_with(force=True)
+        handlers[1].client.connect_to_new_endpoint.assert_not_called()
+        pool.refresh_next()
+        handlers[1].client.connect_to_new_endpoint.assert_called_once_with(force=True)
+
+
+# ---------------------------------------------------------
+# TC-21: Streaming export
+# ---------------------------------------------------------
+def paged_client(*pages):
+    """A Supabase client mock whose query returns `pages` one per execute()"""
+    query = MagicMock()
+    for method in ("select", "gte", "lte", "in_", "or_", "order", "limit"):
+        getattr(query, method).return_value = query
+    query.execute.side_effect = [MagicMock(data=list(page)) for page in pages]
+    client = MagicMock()
+    client.table.return_value = query
+    return client, query
+
+
+class TestExport(unittest.TestCase):
+
+    ROWS = [
+        {"id": "a1", "user_id": "U111", "date": "2025-01-02", "thread_ts": "1.1", "raw_text": "did, things", "created_at": "t"},
+        {"id": "b2", "user_id": "U222", "date": "2025-01-02", "thread_ts": "1.2", "raw_text": "more", "created_at": "t"},
+        {"id": "c3", "user_id": "U111", "date": "2025-01-03", "thread_ts": "1.3", "raw_text": "done", "created_at": "t"},
+    ]
+
+    def test_pages_by_keyset(self):
+        """TC-21-01: The next page starts after the last (date, id) seen, not at an offset"""
+        client, query = paged_client(self.ROWS[:2], self.ROWS[2:])
+        rows = list(export.iter_reports(client, page_size=2))
+        self.assertEqual([r["id"] for r in rows], ["a1", "b2", "c3"])
+        query.or_.assert_called_once_with("date.gt.2025-01-02,and(date.eq.2025-01-02,id.gt.b2)")
+        self.assertEqual(query.execute.call_count, 2)
+
+    def test_filters_are_applied(self):
+        """TC-21-02: Date range and user filters go to the query"""
+        client, query = paged_client([])
+        list(export.iter_reports(client, since="2025-01-01", until="2025-01-31", user_ids=["U111"]))
+        query.gte.assert_called_once_with("date", "2025-01-01")
+        query.lte.assert_called_once_with("date", "2025-01-31")
+        query.in_.assert_called_once_with("user_id", ["U111"])
+
+    def test_csv_and_jsonl_output(self):
+        """TC-21-03: CSV and JSONL writers stream every row"""
+        import io
+        import json
+        client, _ = paged_client(self.ROWS)
+        out = io.StringIO()
+        self.assertEqual(export.export_reports(client, "csv", out), 3)
+        self.assertIn('"did, things"', out.getvalue())
+        client, _ = paged_client(self.ROWS)
+        out = io.StringIO()
+        export.export_reports(client, "jsonl", out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[2])["id"], "c3")
+
+    def test_team_filter(self):
+        """TC-21-04: --team expands to the team's user IDs; unknown teams are rejected"""
+        users = export.select_users(bot_module.TEAMS, ["brand-team"], ["U111"])
+        self.assertEqual(set(users), set(bot_module.TEAMS["brand-team"]) | {"U111"})
+        self.assertIsNone(export.select_users(bot_module.TEAMS))
+        with self.assertRaises(ValueError):
+            export.select_users(bot_module.TEAMS, ["nope"])
+
+    def test_cli_teams_come_from_live_config(self):
+        """TC-21-06: The export CLI resolves --team against the bot's external config, not the built-in TEAMS"""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "standup_config.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"teams": {"ops-team": {"U0OPS1": "Ops Person"}}}, f)
+            with patch.object(bot_module, 'CONFIG_SOURCE', "file"), patch.object(bot_module, 'CONFIG_PATH', path), \
+                 patch.object(bot_module, 'get_supabase_client', return_value=MagicMock()), \
+                 patch.object(export, 'export_reports', return_value=0) as export_reports:
+                export.main(["--team", "ops-team", "--output", os.path.join(tmpdir, "out.csv")])
+                self.assertEqual(export_reports.call_args.kwargs["user_ids"], ["U0OPS1"])
+                with self.assertRaises(SystemExit):
+                    export.main(["--team", "brand-team"])
+
+    def test_team_mapping_is_built_from_teams(self):
+        """TC-21-05: TEAM_MAPPING covers every team member"""
+        for members in bot_module.TEAMS.values():
+            for uid, name in members.items():
+                self.assertEqual(bot_module.TEAM_MAPPING[uid], name)
+
+
+# ---------------------------------------------------------
+# TC-22: Slack export importer
+# ---------------------------------------------------------
+class TestSlackImport(unittest.TestCase):
+
+    def setUp(self):
+        import json
+        import tempfile
+        import zipfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "export.zip")
+        days = {
+            "2024-03-04": [
+                {"ts": "100.0", "thread_ts": "100.0", "user": "UBOT", "text": "Standup time! Yesterday / Today / Blockers"},
+                {"ts": "101.0", "thread_ts": "100.0", "user": "U111", "text": "first"},
+                {"ts": "102.0", "thread_ts": "100.0", "bot_id": "B1", "text": "bot noise"},
+                {"ts": "103.0", "thread_ts": "100.0", "user": "U111", "text": "second"},
+                {"ts": "104.0", "user": "U222", "text": "not in a thread"},
+                {"ts": "105.0", "thread_ts": "105.0", "user": "U222", "text": "lunch?"},
+                {"ts": "106.0", "thread_ts": "105.0", "user": "U111", "text": "sure"},
+            ],
+            "2024-03-05": [
+                {"ts": "200.0", "thread_ts": "100.0", "user": "U222", "text": "late reply"},
+            ],
+            "2024-03-09": [
+                {"ts": "300.0", "thread_ts": "100.0", "user": "U333", "text": "way too late"},
+            ],
+        }
+        with zipfile.ZipFile(self.path, "w") as archive:
+            archive.writestr("channels.json", json.dumps([{"id": "C123", "name": "standup"}]))
+            for day, messages in days.items():
+                archive.writestr(f"standup/{day}.json", json.dumps(messages))
+            archive.writestr("random/2024-03-04.json", json.dumps([]))
+
+    def tearDown(self):
+        slack_import._archives.clear()
+        self.tmp.cleanup()
+
+    def client(self, existing=()):
+        client = MagicMock()
+        query = client.table.return_value
+        query.select.return_value.in_.return_value.in_.return_value.execute.return_value = MagicMock(data=list(existing))
+        return client, query
+
+    def upserted(self, query):
+        rows = []
+        for c in query.upsert.call_args_list:
+            rows.extend(c.args[0])
+        return {(r["user_id"], r["date"]): r for r in rows}
+
+    def test_imports_standup_threads(self):
+        """TC-22-01: Replies are grouped per user and thread date; bots, other threads and late replies are skipped"""
+        client, query = self.client()
+        stats = slack_import.import_archive(client, self.path, "C123", pattern="(?i)standup", workers=1)
+        rows = self.upserted(query)
+        self.assertEqual(set(rows), {("U111", "2024-03-04"), ("U222", "2024-03-04")})
+        self.assertEqual(rows[("U111", "2024-03-04")]["raw_text"], "first\n\n[Addition:]:\nsecond")
+        self.assertEqual(rows[("U111", "2024-03-04")]["thread_ts"], "101.0")
+        self.assertEqual(stats["threads"], 1)
+        query.upsert.assert_called_with(unittest.mock.ANY, on_conflict="user_id,date")
+
+    def test_cli_defaults_to_standup_threads(self):
+        """TC-22-05: Without --thread-pattern only threads started by the daily post are imported"""
+        self.assertTrue(re.search(slack_import.STANDUP_THREAD_PATTERN, "Morning! *Daily — status thread* 💥"))
+        with patch.object(slack_import, 'import_archive') as import_archive:
+            slack_import.main([self.path, "--channel", "C123", "--dry-run"])
+        self.assertEqual(import_archive.call_args.kwargs["pattern"], slack_import.STANDUP_THREAD_PATTERN)
+        stats = slack_import.import_archive(None, self.path, "C123", pattern=slack_import.STANDUP_THREAD_PATTERN,
+                                            workers=1, dry_run=True)
+        self.assertEqual(stats["threads"], 0)
+
+    def test_merges_with_existing_reports(self):
+        """TC-22-02: Existing reports keep their entries and already-saved replies are not duplicated"""
+        existing = [{"user_id": "U111", "date": "2024-03-04", "raw_text": "first", "thread_ts": "101.0", "entries": None}]
+        client, query = self.client(existing)
+        slack_import.import_archive(client, self.path, "standup", pattern="(?i)standup", workers=1)
+        row = self.upserted(query)[("U111", "2024-03-04")]
+        self.assertEqual([e["ts"] for e in row["entries"]], ["101.0", "103.0"])
+
+    def test_replies_deleted_in_slack_are_dropped(self):
+        """TC-22-06: Stored replies missing from the thread in the archive are removed; newer or non-text ones stay"""
+        existing = {("U111", "2024-03-04"): {"raw_text": "x", "thread_ts": "101.0", "entries": [
+            {"ts": "101.0", "text": "first"}, {"ts": "102.5", "text": "deleted later"},
+            {"ts": "103.0", "text": "second"}, {"ts": "104.0", "text": "a file"}, {"ts": "900.0", "text": "after the export"},
+        ]}}
+        collected = {("U111", "2024-03-04"): {"101.0": "first", "103.0": "second", "104.0": None}}
+        rows = slack_import.merge_rows(existing, collected, archived_until=300.0)
+        self.assertEqual([e["ts"] for e in rows[0]["entries"]], ["101.0", "103.0", "104.0", "900.0"])
+        self.assertEqual(rows[0]["thread_ts"], "101.0")
+        collected[("U111", "2024-03-04")].pop("101.0")
+        self.assertEqual(slack_import.merge_rows(existing, collected, archived_until=300.0)[0]["thread_ts"], "103.0")
+
+    def test_import_drops_deleted_reply(self):
+        """TC-22-07: Re-importing an archive removes a reply that was deleted from the standup thread"""
+        existing = [{"user_id": "U111", "date": "2024-03-04", "raw_text": "x", "thread_ts": "101.0",
+                     "entries": [{"ts": "101.0", "text": "first"}, {"ts": "102.5", "text": "gone"}, {"ts": "103.0", "text": "second"}]}]
+        client, query = self.client(existing)
+        slack_import.import_archive(client, self.path, "standup", pattern="(?i)standup", workers=1)
+        row = self.upserted(query)[("U111", "2024-03-04")]
+        self.assertEqual([e["ts"] for e in row["entries"]], ["101.0", "103.0"])
+        self.assertNotIn("gone", row["raw_text"])
+
+    def test_dry_run_writes_nothing(self):
+        """TC-22-03: --dry-run parses the archive without touching the database"""
+        stats = slack_import.import_archive(None, self.path, "standup", workers=1, dry_run=True)
+        self.assertEqual(stats["written"], 0)
+        self.assertEqual(stats["threads"], 2)
+
+    def test_unknown_channel(self):
+        """TC-22-04: An unknown channel is reported, not silently imported as empty"""
+        with self.assertRaises(ValueError):
+            slack_import.import_archive(None, self.path, "C999", dry_run=True)
+
+
+# ---------------------------------------------------------
+# TC-23: Participation stats
+# ---------------------------------------------------------
+class TestStandupStats(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stats = bot_module.StandupStats(bot_module.SqliteStatsStore(os.path.join(self.tmpdir.name, "stats.db")))
+
+    def tearDown(self):
+        bot_module.standup_stats = None
+        self.tmpdir.cleanup()
+
+    def test_missed_days_follow_reports(self):
+        """TC-23-01: A reminder marks missing users; a later report un-misses the day"""
+        self.stats.record_expected("2025-01-06", ["U111", "U222"], {"U111"})
+        summary = self.stats.summary("2025-01-06", "2025-01-06", today="2025-01-07")
+        self.assertEqual(summary["most_missed"], [("U222", 1)])
+        self.stats.record_report("U222", "2025-01-06", reply_seconds=3600)
+        summary = self.stats.summary("2025-01-06", "2025-01-06", today="2025-01-07")
+        self.assertEqual(summary["most_missed"], [])
+        self.assertEqual(summary["participation"], 1.0)
+
+    def test_updates_are_idempotent(self):
+        """TC-23-02: Recording the same report or reminder run twice changes nothing"""
+        for _ in range(2):
+            self.stats.record_report("U111", "2025-01-06", reply_seconds=600)
+            self.stats.record_expected("2025-01-06", ["U111"], {"U111"})
+        week = self.stats.store.get_week("U111", "2025-01-06")
+        self.assertEqual((week["expected"], week["reported"], week["missed"]), (1, 1, 0))
+        self.assertEqual(self.stats.store.get_user("U111")["reported_days"], 1)
+
+    def test_median_reply_time(self):
+        """TC-23-03: The median reply delay comes from the merged weekly histograms"""
+        for i, minutes in enumerate([5, 20, 90]):
+            self.stats.record_report(f"U{i}", "2025-01-06", reply_seconds=minutes * 60)
+        median = self.stats.summary("2025-01-06", "2025-01-10")["median_reply_seconds"]
+        self.assertAlmostEqual(median / 60, 22.5)
+
+    def test_streaks(self):
+        """TC-23-04: Streaks grow day by day and reset after a missed day"""
+        for day in ("2025-01-06", "2025-01-07", "2025-01-08"):
+            self.stats.record_expected(day, ["U111"], {"U111"})
+            self.stats.record_report("U111", day)
+        user = self.stats.store.get_user("U111")
+        self.assertEqual(self.stats.current_streak(user, today="2025-01-09"), 3)
+        self.stats.record_expected("2025-01-09", ["U111"])
+        self.assertEqual(self.stats.current_streak(user, today="2025-01-10"), 0)
+        self.stats.record_report("U111", "2025-01-10")
+        user = self.stats.store.get_user("U111")
+        self.assertEqual((user["streak"], user["longest_streak"]), (1, 3))
+
+    def test_summary_clips_partial_weeks(self):
+        """TC-23-09: Days of the first and last weeks outside the period are not counted"""
+        # 2025-10-01 is a Wednesday: Sep 29-30 share its week but not its month
+        self.stats.record_expected("2025-09-30", ["U111", "U222"])
+        self.stats.record_report("U222", "2025-09-30", reply_seconds=60)
+        self.stats.record_expected("2025-10-01", ["U111"], {"U111"})
+        self.stats.record_report("U111", "2025-10-01", reply_seconds=7200)
+        self.stats.record_expected("2025-10-31", ["U222"])
+        self.stats.record_expected("2025-11-01", ["U222"])
+        summary = self.stats.summary("2025-10-01", "2025-10-31", today="2025-11-04")
+        self.assertEqual((summary["expected"], summary["missed"]), (2, 1))
+        self.assertEqual(summary["most_missed"], [("U222", 1)])
+        self.assertAlmostEqual(summary["median_reply_seconds"], 7350)
+
+    def test_summary_reads_streaks_in_one_query(self):
+        """TC-23-08: /standup-stats streaks need one missed-days query, not one per user"""
+        for uid in ("U1", "U2", "U3"):
+            for day in ("2025-01-06", "2025-01-07"):
+                self.stats.record_expected(day, [uid], {uid})
+                self.stats.record_report(uid, day)
+        self.stats.record_expected("2025-01-08", ["U2"])
+        with patch.object(self.stats.store, 'count_missed') as count_missed, \
+             patch.object(self.stats.store, 'missed_days', wraps=self.stats.store.missed_days) as missed_days:
+            summary = self.stats.summary("2025-01-06", "2025-01-10", today="2025-01-10")
+        count_missed.assert_not_called()
+        missed_days.assert_called_once()
+        self.assertEqual(summary["streaks"], [("U1", 2, 2), ("U3", 2, 2)])
+
+    def test_reminder_run_writes_each_table_once(self):
+        """TC-23-10: A reminder run reads and upserts each rollup table once for the whole team"""
+        store = self.stats.store
+        users = [f"U{i}" for i in range(20)]
+        with patch.object(store, 'get_days', wraps=store.get_days) as get_days, \
+             patch.object(store, 'put_days', wraps=store.put_days) as put_days, \
+             patch.object(store, 'put_weeks', wraps=store.put_weeks) as put_weeks, \
+             patch.object(store, 'put_users', wraps=store.put_users) as put_users:
+            self.stats.record_expected("2025-01-06", users, set(users[:5]))
+        for call in (get_days, put_days, put_weeks, put_users):
+            call.assert_called_once()
+        self.assertEqual(len(put_days.call_args[0][0]), 20)
+        summary = self.stats.summary("2025-01-06", "2025-01-06", today="2025-01-07")
+        self.assertEqual((summary["expected"], summary["missed"]), (20, 15))
+
+    def test_reminder_is_posted_before_stats(self):
+        """TC-23-11: check_missing_reports posts the reminder first and updates stats after it"""
+        order = []
+        mock_app, mock_supabase, stats = MagicMock(), MagicMock(), MagicMock()
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        mock_app.client.chat_postMessage.side_effect = lambda **kwargs: order.append("reminder")
+        stats.record_expected.side_effect = lambda *args: order.append("stats")
+        open_thread("1234567890.123456")
+        with patch.object(bot_module, 'app', mock_app), patch.object(bot_module, 'supabase', mock_supabase), \
+             patch.object(bot_module, 'standup_stats', stats), patch.object(bot_module, 'outbox', None), \
+             patch.object(bot_module, 'TEAM_USER_IDS', ["U111"]), patch.object(bot_module, 'send_alert'), \
+             patch.object(bot_module, 'get_vacation_users', return_value=set()):
+            bot_module.check_missing_reports(dm=False)
+        self.assertEqual(order, ["reminder", "stats"])
+
+    def test_stats_command(self):
+        """TC-23-05: /standup-stats answers from the rollups, filtered by team"""
+        bot_module.standup_stats = self.stats
+        today = date.today()
+        since, _ = bot_module.stats_period("week", today)
+        self.stats.record_expected(since, ["U07SR89J8NA"])
+        ack, respond = MagicMock(), MagicMock()
+        bot_module.handle_stats_command(ack, {"text": "week brand-team"}, respond)
+        ack.assert_called_once()
+        text = respond.call_args[0][0]
+        self.assertIn("brand-team", text)
+        self.assertIn("<@U07SR89J8NA> 1", text)
+
+    def test_stats_command_rejects_unknown_team(self):
+        """TC-23-06: Unknown team names are answered with the list of teams"""
+        bot_module.standup_stats = self.stats
+        respond = MagicMock()
+        bot_module.handle_stats_command(MagicMock(), {"text": "nope"}, respond)
+        self.assertIn("Unknown team", respond.call_args[0][0])
+
+    def test_stats_period(self):
+        """TC-23-07: Periods start on Monday, the 1st, the quarter start or Jan 1"""
+        today = date(2025, 5, 15)
+        self.assertEqual(bot_module.stats_period("week", today)[0], "2025-05-12")
+        self.assertEqual(bot_module.stats_period("month", today)[0], "2025-05-01")
+        self.assertEqual(bot_module.stats_period("quarter", today)[0], "2025-04-01")
+        self.assertEqual(bot_module.stats_period("year", today)[0], "2025-01-01")
+
+
+# ---------------------------------------------------------
+# TC-24: Full-text search
+# ---------------------------------------------------------
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = bot_module.SearchIndex(os.path.join(self.tmpdir.name, "search.db"))
+        bot_module.search_index = self.index
+
+    def tearDown(self):
+        bot_module.search_index = None
+        self.tmpdir.cleanup()
+
+    def test_ranked_search(self):
+        """TC-24-01: Matches are ranked, and the last word matches as a prefix"""
+        self.index.index("U111", "2025-01-06", "1.1", "Yesterday: payments migration dry run")
+        self.index.index("U222", "2025-01-07", "1.2", "Today: payments migration, payments dashboards")
+        self.index.index("U333", "2025-01-08", "1.3", "Today: onboarding flow")
+        results, has_more = self.index.search("payments migr")
+        self.assertEqual({r["user_id"] for r in results}, {"U111", "U222"})
+        self.assertFalse(has_more)
+        self.assertIn("*payments*", results[0]["snippet"])
+
+    def test_reindex_replaces_document(self):
+        """TC-24-02: Indexing the same reply twice keeps one document with the new text"""
+        self.index.index("U111", "2025-01-06", "1.1", "old words")
+        self.index.index("U111", "2025-01-06", "1.1", "new words")
+        self.assertEqual(self.index.count(), 1)
+        self.assertEqual(self.index.search("old")[0], [])
+        self.assertEqual(len(self.index.search("new")[0]), 1)
+
+    def test_query_syntax_is_escaped(self):
+        """TC-24-03: FTS operators in user input are searched as plain words"""
+        self.index.index("U111", "2025-01-06", "1.1", "NOT blocked AND done")
+        self.assertEqual(len(self.index.search('NOT "blocked" (AND')[0]), 1)
+        self.assertEqual(self.index.search("***")[0], [])
+
+    def test_report_save_updates_index(self):
+        """TC-24-04: after_report_saved indexes the reply incrementally"""
+        bot_module.after_report_saved("U111", "2025-01-06", "1.1", "shipped the exporter")
+        self.assertEqual(self.index.search("exporter")[0][0]["ts"], "1.1")
+
+    def test_bulk_build_from_history(self):
+        """TC-24-05: The index is built from every entry of every saved report"""
+        rows = [{"id": "a", "user_id": "U111", "date": "2025-01-06", "raw_text": "x", "thread_ts": "1.1",
+                 "entries": [{"ts": "1.1", "text": "alpha"}, {"ts": "1.2", "text": "beta"}]},
+                {"id": "b", "user_id": "U222", "date": "2025-01-06", "raw_text": "legacy gamma", "thread_ts": "1.3", "entries": None}]
+        client, _ = paged_client(rows)
+        with patch.object(bot_module, 'supabase', client):
+            self.assertEqual(bot_module.build_search_index(), 3)
+        self.assertEqual(self.index.search("gamma")[0][0]["user_id"], "U222")
+
+    def test_search_command_paginates(self):
+        """TC-24-06: /standup-search pages through results"""
+        self.index.index_many([("U111", "2025-01-%02d" % d, f"{d}.0", "release notes") for d in range(1, 13)])
+        respond = MagicMock()
+        bot_module.handle_search_command(MagicMock(), {"text": "release"}, respond)
+        self.assertIn("page:2", respond.call_args[0][0])
+        bot_module.handle_search_command(MagicMock(), {"text": "release page:2"}, respond)
+        text = respond.call_args[0][0]
+        self.assertEqual(text.count("•"), 2)
+        self.assertNotIn("page:3", text)
+
+
+# ---------------------------------------------------------
+# TC-25: Report sections
+# ---------------------------------------------------------
+class TestReportSections(unittest.TestCase):
+
+    def test_parses_thread_prompt_format(self):
+        """TC-25-01: The headers from the thread prompt are recognised with Slack formatting"""
+        text = ("*Yesterday:* merged the exporter\n"
+                "*Today (by EOD or days remaining):* importer, 2 days left\n"
+                "*Blockers / Risks:* waiting on DB access")
+        self.assertEqual(sections.parse_sections(text), {
+            "yesterday": "merged the exporter",
+            "today": "importer, 2 days left",
+            "blockers": "waiting on DB access",
+        })
+
+    def test_multiline_sections_and_additions(self):
+        """TC-25-02: Sections span lines, and appended replies extend them"""
+        text = "Yesterday:\n- a\n- b\nToday: c\n\n[Addition:]:\nToday: d\n- Blockers: none"
+        parsed = sections.parse_sections(text)
+        self.assertEqual(parsed["yesterday"], "- a\n- b")
+        self.assertEqual(parsed["today"], "c\nd")
+        self.assertEqual(parsed["blockers"], "none")
+
+    def test_free_text_has_no_sections(self):
+        """TC-25-03: Prose that merely mentions today is not a header"""
+        parsed = sections.parse_sections("Today I fixed the bug: it was a typo")
+        self.assertEqual(parsed, {"yesterday": None, "today": None, "blockers": None})
+
+    def test_quoted_previous_status_is_ignored(self):
+        """TC-25-06: The quoted old status pasted under an update does not leak into its sections"""
+        text = ("*Yesterday:* shipped the importer\n*Today:* digest\n*Blockers:* none\n"
+                "&gt; *Yesterday:* reviews\n&gt; *Today:* shipped the importer\n&gt; *Blockers:* waiting on R&amp;D")
+        self.assertEqual(sections.parse_sections(text), {
+            "yesterday": "shipped the importer", "today": "digest", "blockers": "none",
+        })
+
+    def test_save_report_stores_sections(self):
+        """TC-25-04: save_report writes the parsed sections with the report"""
+        mock_supabase = MagicMock()
+        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        with patch.object(bot_module, 'supabase', mock_supabase):
+            bot_module.save_report("U111", "Today: ship it\nBlockers: none", "1.1", "2025-01-06")
+        data = mock_supabase.table.return_value.insert.call_args[0][0]
+        self.assertEqual((data["today"], data["blockers"], data["yesterday"]), ("ship it", "none", None))
+
+    def test_reparse_writes_every_batch(self):
+        """TC-25-05: The bulk reparse parses in a process pool and upserts each batch by id"""
+        rows = [{"id": str(i), "user_id": "U111", "date": "2025-01-06", "raw_text": f"Today: task {i}", "thread_ts": "1.1"}
+                for i in range(5)]
+        client, query = paged_client(rows[:2], rows[2:4], rows[4:])
+        self.assertEqual(sections.reparse_reports(client, batch_size=2, workers=1), 5)
+        written = [row for c in query.upsert.call_args_list for row in c.args[0]]
+        self.assertEqual([row["today"] for row in written], [f"task {i}" for i in range(5)])
+        query.upsert.assert_called_with(unittest.mock.ANY, on_conflict="id")
+
+
+# ---------------------------------------------------------
+# TC-26: Near-duplicate reports
+# ---------------------------------------------------------
+class TestNearDuplicates(unittest.TestCase):
+
+    STATUS = ("Yesterday: finished the payments migration dry run and fixed flaky tests in CI. "
+              "Today: cut over the payments service and monitor dashboards. Blockers: none")
+
+    def setUp(self):
+        self.index = bot_module.NearDuplicateIndex()
+
+    def test_repeated_status_is_detected(self):
+        """TC-26-01: A status pasted again on a later day is matched to the original"""
+        self.assertIsNone(self.index.add("U111", "2025-01-06", "1.0", self.STATUS))
+        repeat = self.index.add("U111", "2025-01-07", "2.0", self.STATUS + " really")
+        self.assertEqual(repeat[:2], ("1.0", "2025-01-06"))
+        self.assertGreaterEqual(repeat[2], 0.8)
+
+    def test_different_status_or_user_is_not_flagged(self):
+        """TC-26-02: New content, other users and same-day additions are not flagged"""
+        self.index.add("U111", "2025-01-06", "1.0", self.STATUS)
+        self.assertIsNone(self.index.add("U222", "2025-01-07", "2.0", self.STATUS))
+        self.assertIsNone(self.index.add("U111", "2025-01-06", "1.5", self.STATUS))
+        self.assertIsNone(self.index.add("U111", "2025-01-07", "3.0",
+            "Yesterday: onboarding redesign review. Today: write docs for the importer. Blockers: design sign-off"))
+
+    def test_quoted_previous_status_is_ignored(self):
+        """TC-26-03: Quoting yesterday's status, as the prompt asks, is not a repeat"""
+        self.index.add("U111", "2025-01-06", "1.0", self.STATUS)
+        quoted = "\n".join("&gt; " + line for line in self.STATUS.split(". ")) + \
+            "\nYesterday: cut over done. Today: drop the old tables and write a postmortem. Blockers: none"
+        self.assertIsNone(self.index.add("U111", "2025-01-07", "2.0", quoted))
+
+    def test_old_reports_expire(self):
+        """TC-26-04: Reports older than the retention window leave the index"""
+        index = bot_module.NearDuplicateIndex(retention_days=3)
+        index.add("U111", "2025-01-01", "1.0", self.STATUS)
+        self.assertIsNone(index.add("U111", "2025-01-10", "2.0", self.STATUS))
+        self.assertEqual(index.size(), 1)
+
+    def test_handler_reacts_to_repeat(self):
+        """TC-26-05: handle_message_events adds the repeat reaction to a pasted status"""
+        mock_app, mock_supabase = MagicMock(), MagicMock()
+        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        with patch.object(bot_module, 'supabase', mock_supabase), patch.object(bot_module, 'near_duplicates', self.index):
+            self.index.add("U111", yesterday, "1.0", self.STATUS)
+            open_thread("1234567890.123456")
+            bot_module.register_events(mock_app)
+            handler = mock_app.event.return_value.call_args[0][0]
+            handler(body={"event": {"user": "U111", "text": self.STATUS, "ts": "2.0",
+                                    "thread_ts": "1234567890.123456", "channel": "C08UT7VP2TA"}}, logger=MagicMock())
+        names = [c.kwargs["name"] for c in mock_app.client.reactions_add.call_args_list]
+        self.assertEqual(names, ["blue_heart", "repeat"])
+
+    def test_warm_pages_through_window(self):
+        """TC-26-06: Warming the index pages through the window by keyset, not one unbounded select"""
+        today = date.today().isoformat()
+        rows = [{"id": f"r{i:04d}", "user_id": "U111", "date": today, "raw_text": f"status {i}", "thread_ts": f"{i}.0",
+                 "entries": [{"ts": f"{i}.0", "text": f"status {i}"}]} for i in range(1001)]
+        client, query = paged_client(rows[:1000], rows[1000:])
+        index = MagicMock()
+        with patch.object(bot_module, 'supabase', client), patch.object(bot_module, 'near_duplicates', index), \
+             patch.object(bot_module, 'NEAR_DUPLICATE_REACTION', "repeat"):
+            bot_module.warm_near_duplicates()
+        self.assertEqual(index.add.call_count, 1001)
+        self.assertEqual(query.limit.call_args_list, [call(1000), call(1000)])
+        query.or_.assert_called_once_with(f"date.gt.{today},and(date.eq.{today},id.gt.r0999)")
+
+
+# ---------------------------------------------------------
+# TC-27: End-of-day digest
+# ---------------------------------------------------------
+class TestDailyDigest(unittest.TestCase):
+
+    ROWS = [
+        {"user_id": "U111", "raw_text": "", "yesterday": "payments migration dry run",
+         "today": "payments cutover and ledger reconciliation", "blockers": "waiting on DB access"},
+        {"user_id": "U222", "raw_text": "", "yesterday": "onboarding flow copy",
+         "today": "onboarding analytics events", "blockers": "none"},
+    ]
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.corpus = digest.CorpusFrequencies(os.path.join(self.tmpdir.name, "corpus.json"))
+
+    def tearDown(self):
+        bot_module.digest_corpus = None
+        self.tmpdir.cleanup()
+
+    def test_digest_lists_topics_blockers_and_people(self):
+        """TC-27-01: The digest names top terms per person and only real blockers"""
+        text = digest.build_digest(self.ROWS, self.corpus)
+        self.assertIn("• <@U111>: waiting on DB access", text)
+        self.assertNotIn("<@U222>: none", text)
+        self.assertIn("• <@U111>: payments", text)
+        self.assertIn("• <@U222>: onboarding", text)
+
+    def test_common_terms_are_down_weighted(self):
+        """TC-27-02: Terms frequent across the corpus rank below rare ones"""
+        self.corpus.add("2025-01-01", [["payments", "deploy"]] * 50)
+        per_doc, _ = digest.top_terms([["payments", "payments", "ledger"]], self.corpus, per_document=1)
+        self.assertEqual(per_doc, [["ledger"]])
+
+    def test_numpy_and_fallback_agree(self):
+        """TC-27-03: The pure-Python path ranks terms like the vectorized one"""
+        documents = [digest.tokenize(r["yesterday"] + " " + r["today"]) for r in self.ROWS]
+        self.corpus.add("2025-01-01", [["payments"], ["flow"]])
+        expected = digest.top_terms(documents, self.corpus)
+        with patch.object(digest, 'load_numpy', return_value=None):
+            self.assertEqual(digest.top_terms(documents, self.corpus), expected)
+
+    def test_corpus_counts_each_day_once(self):
+        """TC-27-04: The corpus cache persists and ignores days already counted"""
+        self.assertTrue(self.corpus.add("2025-01-06", [["alpha"], ["alpha", "beta"]]))
+        self.assertFalse(self.corpus.add("2025-01-06", [["alpha"]]))
+        self.corpus.save()
+        reloaded = digest.CorpusFrequencies(self.corpus.path)
+        self.assertEqual((reloaded.docs, reloaded.df["alpha"], reloaded.through), (2, 2, "2025-01-06"))
+
+    def test_digest_posted_in_todays_thread(self):
+        """TC-27-05: post_daily_digest loads the day in one query and posts once in the thread"""
+        mock_app, mock_supabase = MagicMock(), MagicMock()
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(data=[dict(r) for r in self.ROWS])
+        open_thread("1234567890.123456")
+        with patch.object(bot_module, 'app', mock_app), patch.object(bot_module, 'supabase', mock_supabase), \
+                patch.object(bot_module, 'digest_corpus', self.corpus):
+            bot_module.post_daily_digest()
+        kwargs = mock_app.client.chat_postMessage.call_args.kwargs
+        self.assertEqual(kwargs["thread_ts"], "1234567890.123456")
+        self.assertIn("End-of-day digest", kwargs["text"])
+        self.assertEqual(self.corpus.through, date.today().isoformat())
+
+
+# ---------------------------------------------------------
+# TC-28: Last status
+# ---------------------------------------------------------
+class TestLastStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = bot_module.LastStatusCache()
+        self.today = date.today().isoformat()
+        self.yesterday = (date.today() - timedelta(days=1)).isoformat()
+
+    def test_keeps_latest_reports_per_user(self):
+        """TC-28-01: Replies merge per date and only the latest dates are kept"""
+        self.cache.record("U111", "2025-01-06", "1.0", "old")
+        self.cache.record("U111", "2025-01-07", "2.0", "first")
+        self.cache.record("U111", "2025-01-07", "2.5", "second")
+        self.cache.record("U111", "2025-01-08", "3.0", "newest")
+        self.assertEqual(self.cache.last("U111")[0], "2025-01-08")
+        day, entries = self.cache.last("U111", before="2025-01-08")
+        self.assertEqual((day, [e["text"] for e in entries]), ("2025-01-07", ["first", "second"]))
+        self.assertIsNone(self.cache.last("U111", before="2025-01-07"))
+
+    def test_handler_updates_cache(self):
+        """TC-28-02: after_report_saved keeps the cache current"""
+        with patch.object(bot_module, 'last_status', self.cache):
+            bot_module.after_report_saved("U111", self.today, "5.0", "Today: ship")
+        self.assertEqual(self.cache.last("U111")[1][0]["text"], "Today: ship")
+
+    def test_warm_from_view_by_pages(self):
+        """TC-28-03: Startup loads every user's recent reports from the view, one keyset page at a time"""
+        rows = [{"id": f"r{i:04d}", "user_id": f"U{i}", "date": self.yesterday, "raw_text": "x", "thread_ts": f"{i}.0",
+                 "entries": [{"ts": f"{i}.0", "text": "x"}]} for i in range(1000)]
+        rows.append({"id": "r1000", "user_id": "U9999", "date": self.yesterday, "raw_text": "legacy", "thread_ts": "1.0", "entries": None})
+        mock_supabase, query = paged_client(rows[:1000], rows[1000:])
+        with patch.object(bot_module, 'supabase', mock_supabase), patch.object(bot_module, 'last_status', self.cache):
+            bot_module.warm_last_status()
+        self.assertEqual({c.args for c in mock_supabase.table.call_args_list}, {("recent_standup_reports",)})
+        self.assertEqual(query.execute.call_count, 2)
+        query.or_.assert_called_once_with(f"date.gt.{self.yesterday},and(date.eq.{self.yesterday},id.gt.r0999)")
+        self.assertEqual(len(self.cache), 1001)
+
+    def test_command_returns_previous_report_quoted(self):
+        """TC-28-04: /laststatus shows the caller's report before today, quoted"""
+        self.cache.record("U111", self.yesterday, "1.0", "Yesterday: a\nToday: b")
+        self.cache.record("U111", self.today, "2.0", "Today: c")
+        respond = MagicMock()
+        with patch.object(bot_module, 'last_status', self.cache):
+            bot_module.handle_laststatus_command(MagicMock(), {"text": "", "user_id": "U111"}, respond)
+        text = respond.call_args[0][0]
+        self.assertIn(f"— {self.yesterday}", text)
+        self.assertIn("> Yesterday: a\n> Today: b", text)
+
+    def test_command_for_teammates_and_teams(self):
+        """TC-28-05: Mentions and team names select whose reports to show"""
+        self.cache.record("U222", self.yesterday, "1.0", "mine")
+        self.cache.record("U07SR89J8NA", self.yesterday, "1.1", "brand")
+        respond = MagicMock()
+        with patch.object(bot_module, 'last_status', self.cache):
+            bot_module.handle_laststatus_command(MagicMock(), {"text": "<@U222|bob> brand-team", "user_id": "U111"}, respond)
+        text = respond.call_args[0][0]
+        self.assertIn("<@U222>", text)
+        self.assertIn("<@U07SR89J8NA>", text)
+        self.assertNotIn("<@U111>", text)
+
+
+# ---------------------------------------------------------
+# TC-29: Edits and deletions
+# ---------------------------------------------------------
+class TestReportChanges(unittest.TestCase):
+
+    THREAD = "1234567890.123456"
+
+    def setUp(self):
+        self.mock_app = MagicMock()
+        self.mock_supabase = MagicMock()
+        bot_module.app = self.mock_app
+        bot_module.supabase = self.mock_supabase
+        bot_module.CHANNEL_ID = 'C08UT7VP2TA'
+        bot_module.supabase_breaker.reset()
+        self.today = date.today().isoformat()
+        open_thread(self.THREAD)
+        self.select = self.mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute
+        self.select.return_value = MagicMock(data=[{
+            "id": "r1", "date": self.today, "raw_text": "first\n\n[Addition:]:\nsecond", "thread_ts": "10.0",
+            "entries": [{"ts": "10.0", "text": "first"}, {"ts": "11.0", "text": "second"}],
+        }])
+        bot_module.register_events(self.mock_app)
+        self.handler = self.mock_app.event.return_value.call_args[0][0]
+
+    def send(self, event):
+        self.handler(body={"event": dict(event, channel='C08UT7VP2TA')}, logger=MagicMock())
+
+    def test_edit_replaces_entry_in_place(self):
+        """TC-29-01: An edit rewrites only the entry with the original ts, in one update"""
+        self.send({"subtype": "message_changed",
+                   "message": {"user": "U111", "ts": "11.0", "thread_ts": self.THREAD, "text": "Today: second, edited"},
+                   "previous_message": {"user": "U111", "ts": "11.0", "thread_ts": self.THREAD, "text": "second"}})
+        table = self.mock_supabase.table.return_value
+        table.insert.assert_not_called()
+        update = table.update.call_args[0][0]
+        self.assertEqual(update["raw_text"], "first\n\n[Addition:]:\nToday: second, edited")
+        self.assertEqual(update["today"], "second, edited")
+        table.update.return_value.eq.assert_called_once_with("id", "r1")
+
+    def test_delete_removes_entry(self):
+        """TC-29-02: Deleting a reply drops its entry; the report keeps the rest"""
+        self.send({"subtype": "message_deleted", "deleted_ts": "10.0",
+                   "previous_message": {"user": "U111", "ts": "10.0", "thread_ts": self.THREAD, "text": "first"}})
+        update = self.mock_supabase.table.return_value.update.call_args[0][0]
+        self.assertEqual(update["entries"], [{"ts": "11.0", "text": "second"}])
+        self.assertEqual(update["thread_ts"], "11.0")
+
+    def test_deleting_last_entry_deletes_report(self):
+        """TC-29-03: A report whose only reply is deleted is removed"""
+        self.select.return_value = MagicMock(data=[{
+            "id": "r1", "date": self.today, "raw_text": "only", "thread_ts": "10.0", "entries": [{"ts": "10.0", "text": "only"}],
+        }])
+        self.send({"subtype": "message_deleted", "deleted_ts": "10.0",
+                   "previous_message": {"user": "U111", "ts": "10.0", "thread_ts": self.THREAD, "text": "only"}})
+        self.mock_supabase.table.return_value.delete.return_value.eq.assert_called_once_with("id", "r1")
+
+    def test_edit_is_not_saved_as_new_report(self):
+        """TC-29-04: Edits never reach the new-report path, and unfurl-only changes are ignored"""
+        self.send({"subtype": "message_changed",
+                   "message": {"user": "U111", "ts": "11.0", "thread_ts": self.THREAD, "text": "second"},
+                   "previous_message": {"user": "U111", "ts": "11.0", "thread_ts": self.THREAD, "text": "second"}})
+        self.mock_supabase.table.assert_not_called()
+        self.mock_app.client.reactions_add.assert_not_called()
+
+    def test_edit_of_closed_thread_is_found_by_entry(self):
+        """TC-29-05: Edits to replies in closed threads look the entry up by its ts"""
+        query = self.mock_supabase.table.return_value.select.return_value.eq.return_value.contains
+        query.return_value.execute.return_value = MagicMock(data=[{
+            "id": "r9", "date": "2024-01-02", "raw_text": "old", "thread_ts": "5.0", "entries": [{"ts": "5.0", "text": "old"}],
+        }])
+        result = bot_module.apply_report_change("U111", "5.0", "new")
+        self.assertEqual(result, ("updated", "2024-01-02", [{"ts": "5.0", "text": "new"}]))
+        query.assert_called_once_with("entries", '[{"ts": "5.0"}]')
+
+    def test_import_applies_edits(self):
+        """TC-29-06: Backfill replaces edited replies instead of skipping known ts"""
+        existing = {("U111", "2024-03-04"): {"raw_text": "a", "thread_ts": "1.0", "entries": [{"ts": "1.0", "text": "a"}]}}
+        rows = slack_import.merge_rows(existing, {("U111", "2024-03-04"): {"1.0": "a, edited"}})
+        self.assertEqual(rows[0]["entries"], [{"ts": "1.0", "text": "a, edited"}])
+        self.assertEqual(slack_import.merge_rows(existing, {("U111", "2024-03-04"): {"1.0": "a"}}), [])
+
+
+# ---------------------------------------------------------
+# TC-30: Open blockers
+# ---------------------------------------------------------
+class TestOpenBlockers(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = bot_module.BlockerIndex(bot_module.SqliteBlockerStore(os.path.join(self.tmpdir.name, "blockers.db")))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_blocker_items(self):
+        """TC-30-01: Blocker sections split into bullet items; "none" is not a blocker"""
+        items = blockers.blocker_items("- Waiting on *API keys*\n• review from @ann; staging down\nnone")
+        self.assertEqual(list(items), ["waiting on api keys", "review from ann", "staging down"])
+        self.assertEqual(items["waiting on api keys"], "Waiting on *API keys*")
+        self.assertEqual(blockers.blocker_items("No blockers"), {})
+
+    def test_blocker_items_decode_slack_text(self):
+        """TC-30-08: Slack entities are decoded before splitting and quoted lines are not blockers"""
+        self.assertEqual(blockers.blocker_items("Waiting on R&amp;D sign-off"),
+                         {"waiting on r d sign off": "Waiting on R&D sign-off"})
+        items = blockers.blocker_items("staging down\n&gt; API keys (yesterday's status)\nreview from <@U111|ann>")
+        self.assertEqual(list(items.values()), ["staging down", "review from ann"])
+
+    def test_blockers_open_and_resolve(self):
+        """TC-30-02: A blocker stays open while reported and resolves when it stops appearing"""
+        self.assertEqual(self.index.update("U111", "2025-01-06", "API keys\nstaging down"), (2, 0))
+        self.assertEqual(self.index.update("U111", "2025-01-07", "api keys"), (0, 1))
+        rows = self.index.open_blockers()
+        self.assertEqual([(r["text"], r["since"], r["last_seen"]) for r in rows], [("api keys", "2025-01-06", "2025-01-07")])
+        self.assertEqual(self.index.update("U111", "2025-01-08", "No blockers"), (0, 1))
+        self.assertEqual(self.index.open_blockers(), [])
+
+    def test_report_without_blockers_section_keeps_them_open(self):
+        """TC-30-07: A reply with no Blockers section neither resolves nor re-dates open blockers"""
+        cache = bot_module.LastStatusCache()
+        with patch.object(bot_module, 'blocker_index', self.index), patch.object(bot_module, 'last_status', cache):
+            for report_date, ts, text in [("2025-01-06", "1.0", "Today: ship\nBlockers: API keys"),
+                                          ("2025-01-07", "2.0", "Today: more shipping")]:
+                bot_module.after_report_saved("U111", report_date, ts, text, entries=[{"ts": ts, "text": text}])
+            self.assertEqual([(r["text"], r["since"]) for r in self.index.open_blockers()], [("API keys", "2025-01-06")])
+            bot_module.after_report_saved("U111", "2025-01-08", "3.0", "Blockers: API keys",
+                                          entries=[{"ts": "3.0", "text": "Blockers: API keys"}])
+        self.assertEqual([r["since"] for r in self.index.open_blockers()], ["2025-01-06"])
+
+    def test_older_reports_are_ignored(self):
+        """TC-30-03: Editing an older report does not reopen or resolve blockers"""
+        self.index.update("U111", "2025-01-07", "API keys")
+        self.assertEqual(self.index.update("U111", "2025-01-06", "something else"), (0, 0))
+        self.assertEqual([r["key"] for r in self.index.open_blockers()], ["api keys"])
+
+    def test_saved_reports_update_index(self):
+        """TC-30-04: Blockers come from the whole stored report, including replies another replica saved"""
+        cache = bot_module.LastStatusCache()
+        stored = [{"ts": "1.0", "text": "Today: ship\nBlockers: API keys"}, {"ts": "2.0", "text": "Also: docs"}]
+        with patch.object(bot_module, 'blocker_index', self.index), patch.object(bot_module, 'last_status', cache):
+            bot_module.after_report_saved("U111", "2025-01-06", "2.0", "Also: docs", entries=stored)
+        self.assertEqual([r["text"] for r in self.index.open_blockers()], ["API keys"])
+
+    def test_morning_post_lists_carried_over_blockers(self):
+        """TC-30-05: The daily thread lists open blockers with the day they appeared"""
+        self.index.update("U111", "2025-01-06", "API keys")
+        mock_app = MagicMock()
+        mock_app.client.chat_postMessage.return_value = {"ts": "1.0"}
+        with patch.object(bot_module, 'app', mock_app), patch.object(bot_module, 'CHANNEL_ID', "C123"), \
+                patch.object(bot_module, 'blocker_index', self.index), patch.object(bot_module, 'on_daily_thread_posted'):
+            bot_module.post_daily_thread()
+        text = mock_app.client.chat_postMessage.call_args.kwargs["text"]
+        self.assertIn("*Carried-over blockers:*\n• <@U111>: API keys (since 2025-01-06)", text)
+
+    def test_blockers_command_filters_by_team(self):
+        """TC-30-06: /blockers [team] lists only that team's open blockers"""
+        eng = next(iter(bot_module.TEAMS["eng-team"]))
+        self.index.update(eng, "2025-01-06", "API keys")
+        self.index.update("UOTHER", "2025-01-06", "staging down")
+        respond = MagicMock()
+        with patch.object(bot_module, 'blocker_index', self.index):
+            bot_module.handle_blockers_command(MagicMock(), {"text": "eng-team", "user_id": "U1"}, respond)
+        text = respond.call_args.args[0]
+        self.assertIn("API keys", text)
+        self.assertNotIn("staging down", text)
+
+
+# ---------------------------------------------------------
+# TC-31: Reminders at local deadlines
+# ---------------------------------------------------------
+class TestLocalReminders(unittest.TestCase):
+
+    def setUp(self):
+        self.fired = []
+        self.timer = deadlines.DeadlineTimer(lambda due, items: self.fired.append((due, sorted(items))))
+
+    def tearDown(self):
+        self.timer.stop()
+
+    def test_local_times_follow_dst(self):
+        """TC-31-01: The same local time maps to different UTC times across a DST change"""
+        before = deadlines.local_due_times(date(2025, 3, 28), "Europe/Berlin", [(11, 30)])[0]
+        after = deadlines.local_due_times(date(2025, 3, 31), "Europe/Berlin", [(11, 30)])[0]
+        self.assertEqual(datetime.fromtimestamp(before, timezone.utc).strftime("%H:%M"), "10:30")
+        self.assertEqual(datetime.fromtimestamp(after, timezone.utc).strftime("%H:%M"), "09:30")
+
+    def test_due_items_fire_in_one_batch_per_due_time(self):
+        """TC-31-02: Items sharing a due time fire together; each due time is one heap entry"""
+        for i in range(1000):
+            self.timer.schedule(100.0 + i % 3, f"U{i}")
+        self.timer.schedule(100.0, "U0")
+        self.assertEqual(len(self.timer._heap), 3)
+        self.assertEqual(self.timer.pending(), 1000)
+        self.timer.tick(now=101.0)
+        self.assertEqual([(due, len(items)) for due, items in self.fired], [(100.0, 334), (101.0, 333)])
+        self.assertEqual(self.timer.next_due(), 102.0)
+
+    def test_timer_thread_wakes_for_new_earliest_item(self):
+        """TC-31-03: The loop wakes up for an item due earlier than everything queued"""
+        import threading
+        fired = threading.Event()
+        timer = deadlines.DeadlineTimer(lambda due, items: fired.set())
+        timer.start()
+        try:
+            timer.schedule(time.time() + 3600, "later")
+            timer.schedule(time.time() + 0.05, "soon")
+            self.assertTrue(fired.wait(2))
+            self.assertEqual(timer.pending(), 1)
+        finally:
+            timer.stop()
+
+    def test_timezones_are_cached(self):
+        """TC-31-04: users_info is called once per user while the cache is fresh"""
+        cache = deadlines.TimezoneCache(default="Europe/Berlin")
+        client = MagicMock()
+        client.users_info.return_value = {"user": {"tz": "America/New_York"}}
+        self.assertEqual(cache.get(client, "U111"), "America/New_York")
+        self.assertEqual(cache.get(client, "U111"), "America/New_York")
+        client.users_info.assert_called_once_with(user="U111")
+
+    def test_plan_reminders_per_timezone(self):
+        """TC-31-05: Each user gets their own local times; times long past are skipped"""
+        users = ["U111", "U222"]
+        cache = deadlines.TimezoneCache(default="Europe/Berlin")
+        cache._zones = {"U111": ("Europe/Berlin", time.monotonic()), "U222": ("America/New_York", time.monotonic())}
+        day = date(2025, 1, 6)
+        now = deadlines.local_due_times(day, "Europe/Berlin", [(12, 0)])[0]
+        with patch.object(bot_module, 'reminder_timer', self.timer), patch.object(bot_module, 'TEAM_USER_IDS', users), \
+                patch.object(bot_module, 'user_timezones', cache), patch.object(bot_module, 'app', MagicMock()), \
+                patch.object(bot_module, 'REMINDER_TIMES', [(11, 30), (17, 0)]), patch.object(bot_module, 'MISFIRE_GRACE_SECONDS', 600):
+            self.assertEqual(bot_module.plan_reminders(day, now=now), 3)
+        self.timer.tick(now=now + 86400)
+        utc = [(datetime.fromtimestamp(due, timezone.utc).strftime("%H:%M"), items) for due, items in self.fired]
+        self.assertEqual(utc, [("16:00", ["U111"]), ("16:30", ["U222"]), ("22:00", ["U222"])])
+
+    def test_due_reminder_runs_once(self):
+        """TC-31-06: A due batch reminds only its users, once across restarts"""
+        from jobstore import DurableJobs, SqliteJobStore
+        jobs = DurableJobs(SqliteJobStore(":memory:"))
+        with patch.object(bot_module, 'durable_jobs', jobs), patch.object(bot_module, 'check_missing_reports') as check:
+            bot_module.remind_due(1736159400.0, {"U222", "U111"})
+            bot_module.remind_due(1736159400.0, {"U222", "U111"})
+        check.assert_called_once_with(user_ids=["U111", "U222"], due=1736159400.0)
+
+
+# ---------------------------------------------------------
+# TC-32: Graceful shutdown
+# ---------------------------------------------------------
+class TestShutdown(unittest.TestCase):
+
+    def test_steps_run_in_order_within_deadline(self):
+        """TC-32-01: A step that overruns its cap is abandoned and later steps still run"""
+        import threading
+        calls = []
+        release = threading.Event()
+        coordinator = shutdown.ShutdownCoordinator(timeout=5)
+        coordinator.add("first", lambda left: calls.append("first"))
+        coordinator.add("stuck", lambda left: release.wait(), timeout=0.1)
+        coordinator.add("last", lambda left: calls.append(("last", left > 4)))
+        results = coordinator.shutdown("test")
+        release.set()
+        self.assertEqual(results, {"first": "ok", "stuck": "timeout", "last": "ok"})
+        self.assertEqual(calls, ["first", ("last", True)])
+        self.assertIsNone(coordinator.shutdown("again"))
+
+    def test_in_flight_wait(self):
+        """TC-32-02: wait() returns once running handlers finish, or False at the timeout"""
+        import threading
+        in_flight = shutdown.InFlight()
+        entered, release = threading.Event(), threading.Event()
+
+        def handler():
+            with in_flight.track():
+                entered.set()
+                release.wait()
+
+        thread = threading.Thread(target=handler)
+        thread.start()
+        entered.wait()
+        self.assertFalse(in_flight.wait(0.05))
+        release.set()
+        self.assertTrue(in_flight.wait(2))
+        thread.join()
+
+    def test_message_handler_is_tracked(self):
+        """TC-32-03: A message event counts as in flight while it is handled"""
+        mock_app = MagicMock()
+        bot_module.register_events(mock_app)
+        handler = mock_app.event.return_value.call_args[0][0]
+        seen = []
+        with patch.object(bot_module, 'handle_report_change', side_effect=lambda event: seen.append(len(bot_module.in_flight))):
+            handler(body={"event": {"subtype": "message_deleted"}}, logger=MagicMock())
+        self.assertEqual(seen, [1])
+        self.assertEqual(len(bot_module.in_flight), 0)
+
+    def test_shutdown_order(self):
+        """TC-32-04: Events stop first, then work drains, queues flush and the lease is released"""
+        steps = MagicMock()
+        steps.outbox.gate = None
+        with patch.object(bot_module, 'outbox', steps.outbox), patch.object(bot_module, 'journal', steps.journal), \
+                patch.object(bot_module, 'leader', steps.leader), patch.object(bot_module, 'reminder_timer', None), \
+                patch.object(bot_module, 'search_index', None):
+            coordinator = bot_module.build_shutdown(steps.socket_mode, steps.scheduler, steps.replayer)
+            results = coordinator.shutdown("test")
+        self.assertTrue(all(status == "ok" for status in results.values()))
+        self.assertEqual(
+            [c[0] for c in steps.mock_calls if not c[0].endswith("__bool__")],
+            ["socket_mode.close", "scheduler.shutdown", "outbox.stop", "outbox.drain_once",
+             "replayer.stop", "journal.close", "leader.stop"],
+        )
+
+
+# ---------------------------------------------------------
+# TC-33: Health endpoint and latency quantiles
+# ---------------------------------------------------------
+class TestHealth(unittest.TestCase):
+
+    def test_sketch_quantiles_within_accuracy(self):
+        """TC-33-01: p50/p99 are within the sketch's relative accuracy"""
+        sk = sketch.QuantileSketch(accuracy=0.01)
+        for ms in range(1, 10001):
+            sk.add(ms / 1000)
+        self.assertAlmostEqual(sk.quantile(0.5), 5.0, delta=5.0 * 0.01)
+        self.assertAlmostEqual(sk.quantile(0.99), 9.9, delta=9.9 * 0.01)
+        self.assertLess(len(sk.buckets), 700)
+
+    def test_sketch_memory_is_bounded(self):
+        """TC-33-02: Past max_buckets the lowest buckets collapse; high quantiles stay accurate"""
+        sk = sketch.QuantileSketch(accuracy=0.01, max_buckets=32)
+        for i in range(1, 100001):
+            sk.add(i * 0.001)
+        self.assertLessEqual(len(sk.buckets), 32)
+        self.assertEqual(sk.count, 100000)
+        self.assertAlmostEqual(sk.quantile(0.99), 99.0, delta=99.0 * 0.01)
+
+    def test_rolling_window_forgets_old_samples(self):
+        """TC-33-03: Samples older than the window drop out of the quantiles"""
+        now = [0.0]
+        rolling = sketch.RollingQuantiles(window=60, slots=6, clock=lambda: now[0])
+        for _ in range(100):
+            rolling.add(10.0)
+        now[0] = 30.0
+        rolling.add(0.1)
+        self.assertEqual(rolling.quantiles()["count"], 101)
+        self.assertAlmostEqual(rolling.quantiles()["p99"], 10.0, delta=0.1)
+        now[0] = 65.0
+        result = rolling.quantiles()
+        self.assertEqual(result["count"], 1)
+        self.assertAlmostEqual(result["p50"], 0.1, delta=0.001)
+
+    def test_http_endpoints(self):
+        """TC-33-04: /healthz is always up; /readyz is 503 until every check passes"""
+        import urllib.error
+        import urllib.request
+        checks = {"socket_mode": True, "caches": False}
+        server = health.HealthServer(0, lambda: dict(checks), lambda: {"jobs": {}}, host="127.0.0.1")
+        server.start()
+        base = f"http://127.0.0.1:{server.port}"
+        try:
+            self.assertEqual(urllib.request.urlopen(base + "/healthz").status, 200)
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(base + "/readyz")
+            self.assertEqual(ctx.exception.code, 503)
+            checks["caches"] = True
+            self.assertEqual(urllib.request.urlopen(base + "/readyz").status, 200)
+            self.assertEqual(json.loads(urllib.request.urlopen(base + "/status").read()), {"jobs": {}})
+        finally:
+            server.close()
+
+    def test_readiness_checks(self):
+        """TC-33-05: Ready needs a live connection, a reachable DB and restored state"""
+        connection = MagicMock()
+        connection.client.is_connected.return_value = True
+        with patch.object(bot_module, 'socket_mode', connection), patch.object(bot_module, 'supabase', MagicMock()):
+            bot_module.state_ready.set()
+            bot_module.caches_warm.set()
+            self.assertTrue(all(bot_module.readiness().values()))
+            try:
+                for _ in range(bot_module.supabase_breaker.failure_threshold):
+                    bot_module.supabase_breaker.record_failure()
+                self.assertFalse(bot_module.readiness()["database"])
+            finally:
+                bot_module.supabase_breaker.reset()
+            connection.client.is_connected.return_value = False
+            self.assertFalse(bot_module.readiness()["socket_mode"])
+
+    def test_status_reports_jobs_and_latencies(self):
+        """TC-33-06: /status shows each job's last run and rolling latencies"""
+        from jobstore import DurableJobs, SqliteJobStore
+        metrics.reset()
+        jobs = DurableJobs(SqliteJobStore(":memory:"))
+        jobs.run_once("reminder", datetime(2025, 1, 6, 10, 30, tzinfo=timezone.utc), lambda: None)
+        metrics.observe("slack.call", 0.2)
+        with patch.object(bot_module, 'durable_jobs', jobs):
+            status = bot_module.health_status()
+        self.assertEqual(status["jobs"]["reminder"]["status"], "success")
+        self.assertEqual(status["jobs"]["reminder"]["scheduled_for"], "2025-01-06T10:30:00+00:00")
+        self.assertEqual(status["latencies"]["slack.call"]["count"], 1)
+
+    def test_outbound_calls_are_timed(self):
+        """TC-33-07: Vacation Tracker, Supabase store and direct Slack calls each record a latency sample"""
+        metrics.reset()
+        response = MagicMock()
+        response.json.return_value = {"data": [], "nextToken": None}
+        with patch('main.requests.get', return_value=response), \
+             patch.object(bot_module, 'VACATION_TRACKER_API_KEY', "test-api-key"):
+            bot_module.vacation_breaker.reset()
+            bot_module.get_vacation_users()
+        bot_module.SupabaseStatsStore(MagicMock()).put_days([])
+        with patch.object(bot_module, 'app', MagicMock()), patch.object(bot_module, 'ALERT_CHANNEL_ID', "C999"):
+            bot_module.send_alert("hello")
+        latencies = metrics.latencies()
+        for name in ("vacation_tracker.call", "supabase.store", "slack.call"):
+            self.assertEqual(latencies[name]["count"], 1, name)
+
+
+# ---------------------------------------------------------
+# TC-34: Memory bounds and profiling
+# ---------------------------------------------------------
+class TestMemoryBounds(unittest.TestCase):
+
+    def test_models_have_no_instance_dict(self):
+        """TC-34-01: Long-lived records are tuples without a per-instance __dict__"""
+        for record in (models.ReportEntry("1.0", "x"), models.RosterEntry("U1", "Ann", "eng-team"),
+                       models.Leave("U1", "Ann", "2025-01-06", "2025-01-07")):
+            self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(len(bot_module.ROSTER), len(bot_module.TEAM_MAPPING))
+
+    def test_last_status_evicts_least_recent_user(self):
+        """TC-34-02: The last-status cache keeps at most max_users users"""
+        cache = bot_module.LastStatusCache(max_users=2)
+        cache.record("U1", "2025-01-06", "1.0", "a")
+        cache.record("U2", "2025-01-06", "2.0", "b")
+        cache.record("U1", "2025-01-07", "3.0", "c")
+        cache.record("U3", "2025-01-07", "4.0", "d")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.last("U2"))
+        self.assertEqual(cache.last("U1"), ("2025-01-07", [{"ts": "3.0", "text": "c"}]))
+
+    def test_near_duplicates_evict_oldest_reports(self):
+        """TC-34-03: Past max_docs the oldest reports leave the index, users included"""
+        index = bot_module.NearDuplicateIndex(max_docs=3)
+        text = "finished the payments migration and reviewed the ledger changes"
+        for i in range(5):
+            index.add(f"U{i}", "2025-01-06", f"{i}.0", text)
+        self.assertEqual(index.size(), 3)
+        self.assertEqual(set(index._by_user), {"U2", "U3", "U4"})
+        self.assertIsNotNone(index.add("U4", "2025-01-07", "9.0", text))
+
+    def test_small_caches_are_bounded(self):
+        """TC-34-04: Timezone, DM channel and term caches stay within their limits"""
+        client = MagicMock()
+        client.users_info.return_value = {"user": {"tz": "Europe/Berlin"}}
+        client.conversations_open.side_effect = lambda users: {"channel": {"id": f"D{users}"}}
+        timezones = deadlines.TimezoneCache(max_size=2)
+        dms = bot_module.DMReminder(max_channels=2, rate_per_sec=1000)
+        for uid in ("U1", "U2", "U3"):
+            timezones.get(client, uid)
+            dms.send(client, [uid], lambda u: "hi")
+        self.assertEqual((len(timezones), dms.cached_channels()), (2, 2))
+        corpus = digest.CorpusFrequencies(None, max_terms=10)
+        corpus.add("2025-01-06", [[f"term{i}" for i in range(8)], ["term0", "term1", "other1", "other2", "other3"]])
+        self.assertLessEqual(len(corpus.df), 10)
+        self.assertIn("term0", corpus.df)
+
+    def test_profiler_diff_shows_growth(self):
+        """TC-34-05: A diff after a snapshot names the line that allocated"""
+        profiler = memprofile.MemoryProfiler()
+        try:
+            self.assertIsNone(profiler.diff())
+            profiler.snapshot()
+            hoard = [bytearray(1024) for _ in range(2000)]
+            lines = profiler.diff()
+            self.assertIn("test_bot.py", "\n".join(lines[1:4]))
+            del hoard
+        finally:
+            profiler.stop()
+        self.assertFalse(profiler.tracing)
+
+    def test_memory_command_is_admin_only(self):
+        """TC-34-06: /standup-memory is limited to ADMIN_USER_IDS and refused when none are set"""
+        respond = MagicMock()
+        with patch.object(bot_module, 'ADMIN_USER_IDS', {"UADMIN"}):
+            bot_module.handle_memory_command(MagicMock(), {"user_id": "U1", "text": ""}, respond)
+            self.assertIn("Only bot admins", respond.call_args.args[0])
+            bot_module.handle_memory_command(MagicMock(), {"user_id": "UADMIN", "text": "diff"}, respond)
+            self.assertIn("snapshot", respond.call_args.args[0])
+        with patch.object(bot_module, 'ADMIN_USER_IDS', set()), patch.object(bot_module, 'memory_profiler') as profiler:
+            bot_module.handle_memory_command(MagicMock(), {"user_id": "U1", "text": "snapshot"}, respond)
+            self.assertIn("set ADMIN_USER_IDS", respond.call_args.args[0])
+            profiler.snapshot.assert_not_called()
+
+
+# ---------------------------------------------------------
+# TC-35: External config, hot reload
+# ---------------------------------------------------------
+class TestConfigReload(unittest.TestCase):
+
+    RELOADED = ("TEAMS", "ROSTER", "TEAM_MAPPING", "EXCLUDED_USER_IDS", "TEAM_USER_IDS", "NAME_TO_UID",
+                "GREETINGS", "MEMES", "STANDUP_TIMEZONE", "DAILY_THREAD_TIME",
+                "REMINDER_TIMES", "DIGEST_TIME", "scheduler", "durable_jobs", "reminder_timer")
+
+    def setUp(self):
+        self.saved = {name: getattr(bot_module, name) for name in self.RELOADED}
+        self.saved_default_tz = bot_module.user_timezones.default
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(bot_module, name, value)
+        bot_module.user_timezones.default = self.saved_default_tz
+
+    class Source:
+        def __init__(self, data=None):
+            self.raw = json.dumps(data) if data is not None else None
+
+        def read(self):
+            return self.raw
+
+    def test_defaults_match_the_code(self):
+        """TC-35-01: An empty config reproduces the built-in teams, schedule and phrases"""
+        defaults = bot_module.DEFAULT_CONFIG
+        cfg = config.parse_config({}, defaults)
+        self.assertEqual(len(cfg.roster), sum(len(members) for members in defaults["teams"].values()))
+        self.assertNotIn("U068KKKNP9R", cfg.team_user_ids)
+        self.assertEqual(cfg.name_to_uid["boris romanov"], "UEXNGPDTR")
+        self.assertEqual((cfg.daily_thread, cfg.digest), ((9, 4), (17, 30)))
+        self.assertEqual(cfg.reminders, ((11, 30), (17, 0)))
+        self.assertEqual(list(cfg.greetings), defaults["greetings"])
+
+    def test_every_problem_is_reported(self):
+        """TC-35-02: Validation lists each invalid field in one error"""
+        bad = {
+            "teams": {"eng-team": {"not-an-id": "Ann", "U1AAA": "Bo"}, "brand-team": {"U1AAA": "Bo"}},
+            "schedule": {"daily_thread": "25:00", "timezone": "Mars/Olympus"},
+            "memes": [],
+            "colour": "blue",
+        }
+        with self.assertRaises(config.ConfigError) as ctx:
+            config.parse_config(bad, bot_module.DEFAULT_CONFIG)
+        message = str(ctx.exception)
+        for fragment in ("unknown keys: colour", "'not-an-id'", "U1AAA is in both", "schedule.daily_thread",
+                         "Mars/Olympus", "memes"):
+            self.assertIn(fragment, message)
+
+    def test_watcher_applies_valid_changes_only(self):
+        """TC-35-03: The watcher applies a change once and keeps the running config on invalid input"""
+        applied = []
+        source = self.Source({"memes": ["one"]})
+        watcher = config.ConfigWatcher(source, bot_module.DEFAULT_CONFIG, applied.append)
+        self.assertTrue(watcher.check())
+        self.assertFalse(watcher.check())
+        source.raw = '{"memes": ["two"], "schedule": {"digest": "noon"}}'
+        self.assertFalse(watcher.check())
+        source.raw = "{not json"
+        self.assertFalse(watcher.check())
+        self.assertEqual([cfg.memes for cfg in applied], [("one",)])
+
+    def test_apply_rebuilds_indexes_and_moves_jobs(self):
+        """TC-35-04: Applying a config swaps the team indexes and reschedules jobs in place"""
+        jobs = bot_module.DurableJobs(MagicMock())
+        scheduler = MagicMock()
+        with patch.object(bot_module, 'CronTrigger', side_effect=lambda **kw: kw), \
+             patch.object(bot_module, 'LOCAL_REMINDERS', True), patch.object(bot_module, 'DIGEST_ENABLED', True):
+            for job_id, trigger in bot_module.job_triggers().items():
+                jobs.add(scheduler, job_id, MagicMock(), trigger)
+            bot_module.durable_jobs, bot_module.scheduler, bot_module.reminder_timer = jobs, scheduler, None
+            cfg = config.parse_config({
+                "teams": {"eng-team": {"U1AAA": "Ann Lee", "U2BBB": "Bo"}},
+                "exclude_from_reports": ["U2BBB"],
+                "schedule": {"daily_thread": "08:45"},
+            }, bot_module.DEFAULT_CONFIG)
+            bot_module.apply_config(cfg)
+        self.assertEqual(bot_module.TEAM_USER_IDS, ["U1AAA"])
+        self.assertEqual(bot_module.NAME_TO_UID, {"ann lee": "U1AAA", "bo": "U2BBB"})
+        self.assertEqual(bot_module.DAILY_THREAD_TIME, (8, 45))
+        scheduler.reschedule_job.assert_any_call("post_daily_thread", trigger=unittest.mock.ANY)
+        self.assertEqual(jobs.jobs["post_daily_thread"][1]["minute"], 45)
+        scheduler.remove_job.assert_not_called()
+
+    def test_reminders_are_replanned(self):
+        """TC-35-05: New reminder times replace today's planned reminders"""
+        timer = deadlines.DeadlineTimer(MagicMock())
+        timer.schedule(1000.0, "U1")
+        bot_module.reminder_timer, bot_module.scheduler = timer, None
+        cfg = config.parse_config({"schedule": {"reminders": ["10:00"]}}, bot_module.DEFAULT_CONFIG)
+        with patch.object(bot_module, 'current_thread_ts', return_value="111.222"), \
+             patch.object(bot_module, 'plan_reminders') as plan:
+            bot_module.apply_config(cfg)
+        self.assertEqual(timer.pending(), 0)
+        plan.assert_called_once()
+        self.assertEqual(bot_module.REMINDER_TIMES, ((10, 0),))
+
+
 # ---------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------
@@ -809,6 +2904,31 @@ if __name__ == '__main__':
     suite.addTests(loader.loadTestsFromTestCase(TestHandleMessageEdgeCases))
     suite.addTests(loader.loadTestsFromTestCase(TestMainFunction))
     suite.addTests(loader.loadTestsFromTestCase(TestGetVacationUsers))
+    suite.addTests(loader.loadTestsFromTestCase(TestDMReminders))
+    suite.addTests(loader.loadTestsFromTestCase(TestDurableJobs))
+    suite.addTests(loader.loadTestsFromTestCase(TestLeaderElection))
+    suite.addTests(loader.loadTestsFromTestCase(TestSaveReportIdempotency))
+    suite.addTests(loader.loadTestsFromTestCase(TestThreadRegistry))
+    suite.addTests(loader.loadTestsFromTestCase(TestOutbox))
+    suite.addTests(loader.loadTestsFromTestCase(TestCircuitBreakers))
+    suite.addTests(loader.loadTestsFromTestCase(TestReportJournal))
+    suite.addTests(loader.loadTestsFromTestCase(TestColdStart))
+    suite.addTests(loader.loadTestsFromTestCase(TestSocketModePool))
+    suite.addTests(loader.loadTestsFromTestCase(TestExport))
+    suite.addTests(loader.loadTestsFromTestCase(TestSlackImport))
+    suite.addTests(loader.loadTestsFromTestCase(TestStandupStats))
+    suite.addTests(loader.loadTestsFromTestCase(TestSearchIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestReportSections))
+    suite.addTests(loader.loadTestsFromTestCase(TestNearDuplicates))
+    suite.addTests(loader.loadTestsFromTestCase(TestDailyDigest))
+    suite.addTests(loader.loadTestsFromTestCase(TestLastStatus))
+    suite.addTests(loader.loadTestsFromTestCase(TestReportChanges))
+    suite.addTests(loader.loadTestsFromTestCase(TestOpenBlockers))
+    suite.addTests(loader.loadTestsFromTestCase(TestLocalReminders))
+    suite.addTests(loader.loadTestsFromTestCase(TestShutdown))
+    suite.addTests(loader.loadTestsFromTestCase(TestHealth))
+    suite.addTests(loader.loadTestsFromTestCase(TestMemoryBounds))
+    suite.addTests(loader.loadTestsFromTestCase(TestConfigReload))
 
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
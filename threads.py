@@ -0,0 +1,73 @@
+import json
+import threading
+from collections import namedtuple
+from datetime import date
+
+# One standup thread: replies to it count towards `date`'s reports
+StandupSession = namedtuple("StandupSession", ["channel", "thread_ts", "team", "date", "deadline"])
+
+
+class ThreadRegistry:
+    """Maps (channel, thread_ts) to its standup session.
+
+    Writers build a new dict and swap it in, so the event handler can look
+    sessions up without taking a lock.
+    """
+
+    def __init__(self, retention_days=2):
+        self.retention_days = retention_days
+        self._sessions = {}
+        self._write_lock = threading.Lock()
+
+    def _is_open(self, session, today):
+        return (date.fromisoformat(today) - date.fromisoformat(session.date)).days < self.retention_days
+
+    def register(self, session, today=None):
+        """Add a session and drop the ones older than the retention window."""
+        today = today or date.today().isoformat()
+        with self._write_lock:
+            sessions = {key: s for key, s in self._sessions.items() if self._is_open(s, today)}
+            sessions[(session.channel, session.thread_ts)] = session
+            self._sessions = sessions
+
+    def lookup(self, channel, thread_ts, today=None):
+        """Return the open session for a thread, or None."""
+        session = self._sessions.get((channel, thread_ts))
+        if session is None:
+            return None
+        if not self._is_open(session, today or date.today().isoformat()):
+            return None
+        return session
+
+    def for_date(self, day, channel=None):
+        """Return the session posted for `day` (optionally in `channel`), or None."""
+        matches = [s for s in self._sessions.values() if s.date == day and (channel is None or s.channel == channel)]
+        return max(matches, key=lambda s: float(s.thread_ts)) if matches else None
+
+    def latest(self):
+        sessions = list(self._sessions.values())
+        return max(sessions, key=lambda s: float(s.thread_ts)) if sessions else None
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def to_json(self):
+        return json.dumps([s._asdict() for s in self._sessions.values()])
+
+    def load_json(self, value, today=None, merge=False):
+        """Replace the registry with sessions from `to_json()` output.
+
+        With `merge`, sessions already registered here are kept as well.
+        """
+        today = today or date.today().isoformat()
+        sessions = {}
+        for item in json.loads(value):
+            session = StandupSession(**item)
+            if self._is_open(session, today):
+                sessions[(session.channel, session.thread_ts)] = session
+        with self._write_lock:
+            if merge:
+                kept = {key: s for key, s in self._sessions.items() if self._is_open(s, today)}
+                kept.update(sessions)
+                sessions = kept
+            self._sessions = sessions